@@ -0,0 +1,36 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlalchemy.orm import Session
+
+from backend.database import get_db
+from backend.schemas import OptimizationJobResponse
+from backend.services import OptimizationJobRunner, OptimizationJobService, get_job_runner
+
+router = APIRouter(prefix="/api/optimization-jobs", tags=["optimization-jobs"])
+
+
+@router.get("/{job_id}", response_model=OptimizationJobResponse)
+def get_optimization_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    runner: OptimizationJobRunner = Depends(get_job_runner),
+):
+    service = OptimizationJobService(db, runner)
+    job = service.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Optimization job not found")
+    return job
+
+
+@router.delete("/{job_id}", response_model=OptimizationJobResponse)
+def cancel_optimization_job(
+    job_id: int,
+    db: Session = Depends(get_db),
+    runner: OptimizationJobRunner = Depends(get_job_runner),
+):
+    service = OptimizationJobService(db, runner)
+    job = service.cancel(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Optimization job not found")
+    if job.status != "cancelled":
+        raise HTTPException(status_code=409, detail=f"Optimization job already {job.status}")
+    return job
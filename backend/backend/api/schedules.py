@@ -1,17 +1,30 @@
-from fastapi import APIRouter, Depends, HTTPException
+import json
+import math
+
+from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
 
 from backend.database import get_db
 from backend.schemas import (
-    DiagnosticItemSchema,
+    OptimizationJobResponse,
+    OptimizeMode,
     OptimizeResponse,
+    ScenarioBatchRequest,
     ScheduleAssignmentResponse,
     ScheduleAssignmentUpdate,
     SchedulePeriodCreate,
     SchedulePeriodResponse,
     ScheduleResponse,
+    WeightSweepRequest,
+)
+from backend.services import (
+    OptimizationJobRunner,
+    OptimizationJobService,
+    ScheduleService,
+    get_job_runner,
 )
-from backend.services import ScheduleService
+from backend.services.schedule import to_optimize_response
 
 router = APIRouter(prefix="/api/schedules", tags=["schedules"])
 
@@ -65,23 +78,144 @@ def publish_schedule(period_id: int, db: Session = Depends(get_db)):
     return result
 
 
+def _check_window(window_days: int, commit_days: int) -> None:
+    if commit_days > window_days:
+        raise HTTPException(
+            status_code=422, detail="commit_days must not exceed window_days"
+        )
+
+
 @router.post("/{period_id}/optimize", response_model=OptimizeResponse)
-def optimize_schedule(period_id: int, db: Session = Depends(get_db)):
+def optimize_schedule(
+    period_id: int,
+    mode: OptimizeMode = Query("mip"),
+    window_days: int = Query(14, ge=1),
+    commit_days: int = Query(7, ge=1),
+    db: Session = Depends(get_db),
+):
+    """シフトを最適化して保存する
+
+    mode=draft は MIP を使わない即時の下書き、mode=lns は大規模向けの近傍探索。
+    mode=rolling は window_days 日のウィンドウを commit_days 日ずつ確定して解く。
+    """
+    _check_window(window_days, commit_days)
     service = ScheduleService(db)
-    result = service.optimize(period_id)
+    result = service.optimize(period_id, mode, window_days, commit_days)
     if result is None:
         raise HTTPException(status_code=404, detail="Schedule period not found")
-    return OptimizeResponse(
-        status=result.status,
-        message=result.message,
-        assignments=result.assignments,
-        diagnostics=[
-            DiagnosticItemSchema(
-                constraint=d.constraint,
-                severity=d.severity,
-                message=d.message,
-                details=d.details,
-            )
-            for d in result.diagnostics
-        ],
+    return to_optimize_response(result)
+
+
+@router.post(
+    "/{period_id}/scenarios",
+    response_model=OptimizationJobResponse,
+    status_code=202,
+)
+def compare_scenarios(
+    period_id: int,
+    data: ScenarioBatchRequest,
+    db: Session = Depends(get_db),
+    runner: OptimizationJobRunner = Depends(get_job_runner),
+):
+    """設定や必要人数を差し替えた what-if シナリオを並列に解いて比較するジョブを登録する
+
+    求解はバックグラウンドジョブで行い、比較表は GET /api/optimization-jobs/{id} の
+    result（ScenarioComparisonResponse）に入る。保存済みの設定・割り当ては変更しない。
+    """
+    scenarios = [
+        {
+            "name": s.name,
+            "config": s.config.model_dump(exclude_unset=True),
+            "requirements": [r.model_dump() for r in s.requirements],
+            "role_requirements": [r.model_dump() for r in s.role_requirements],
+        }
+        for s in data.scenarios
+    ]
+    service = OptimizationJobService(db, runner)
+    job = service.submit(period_id, "scenarios", {"scenarios": scenarios})
+    if job is None:
+        raise HTTPException(status_code=404, detail="Schedule period not found")
+    return job
+
+
+# 重みスイープで一度に解く点の上限
+_MAX_SWEEP_POINTS = 64
+
+
+@router.post(
+    "/{period_id}/weight-sweep",
+    response_model=OptimizationJobResponse,
+    status_code=202,
+)
+def sweep_weights(
+    period_id: int,
+    data: WeightSweepRequest,
+    db: Session = Depends(get_db),
+    runner: OptimizationJobRunner = Depends(get_job_runner),
+):
+    """目的関数の重みの組（直積かランダム抽出）を並列に解くジョブを登録する
+
+    求解はバックグラウンドジョブで行い、GET /api/optimization-jobs/{id} の result
+    （WeightSweepResponse）に、各点のかなえた希望・勤務日数の差・必要人数の不足と
+    非劣解かどうかが入る。保存済みの設定・割り当ては変更しない。
+    """
+    if any(not values for values in data.grid.values()):
+        raise HTTPException(status_code=422, detail="grid values must not be empty")
+    points = data.random_samples or math.prod(len(v) for v in data.grid.values())
+    if points > _MAX_SWEEP_POINTS:
+        raise HTTPException(
+            status_code=422, detail=f"at most {_MAX_SWEEP_POINTS} weight points per sweep"
+        )
+    service = OptimizationJobService(db, runner)
+    job = service.submit(period_id, "weight_sweep", data.model_dump())
+    if job is None:
+        raise HTTPException(status_code=404, detail="Schedule period not found")
+    return job
+
+
+@router.get("/{period_id}/optimize/stream")
+def stream_optimize_schedule(period_id: int, db: Session = Depends(get_db)):
+    """最適化を実行し、進捗（暫定解・境界・ギャップ）を Server-Sent Events で配信する
+
+    event: progress を暫定解の改善ごとに送り、最後に event: result で
+    POST /optimize と同じ応答を送る。接続を切ると求解を中断する。
+    """
+    service = ScheduleService(db)
+    solve_kwargs = service.prepare_optimization(period_id)
+    if solve_kwargs is None:
+        raise HTTPException(status_code=404, detail="Schedule period not found")
+
+    def event_stream():
+        for event, data in service.stream_optimization(period_id, solve_kwargs):
+            yield f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.post(
+    "/{period_id}/optimize/jobs",
+    response_model=OptimizationJobResponse,
+    status_code=202,
+)
+def submit_optimization_job(
+    period_id: int,
+    mode: OptimizeMode = Query("mip"),
+    window_days: int = Query(14, ge=1),
+    commit_days: int = Query(7, ge=1),
+    db: Session = Depends(get_db),
+    runner: OptimizationJobRunner = Depends(get_job_runner),
+):
+    """POST /optimize と同じ mode で解くジョブを登録する（長い lns・rolling 向け）"""
+    _check_window(window_days, commit_days)
+    service = OptimizationJobService(db, runner)
+    job = service.submit(
+        period_id, "optimize",
+        {"mode": mode, "window_days": window_days, "commit_days": commit_days},
     )
+    if job is None:
+        raise HTTPException(status_code=404, detail="Schedule period not found")
+    return job
@@ -0,0 +1,14 @@
+from backend.benchmarks.generator import Instance, generate_instance
+from backend.benchmarks.runner import (
+    compare_with_baseline,
+    run_benchmarks,
+    toggle_combinations,
+)
+
+__all__ = [
+    "Instance",
+    "compare_with_baseline",
+    "generate_instance",
+    "run_benchmarks",
+    "toggle_combinations",
+]
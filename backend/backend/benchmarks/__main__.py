@@ -0,0 +1,89 @@
+"""合成インスタンスでソルバーのベンチマークを取る
+
+使い方:
+    uv run python -m backend.benchmarks --staff 20 100 --days 28 --slots 3 \
+        --toggles enable_fairness,enable_shift_interval --output results.json \
+        --baseline baseline.json
+
+--baseline を指定すると同じケースの基準結果と比べ、劣化があれば終了コード 1 で終わる。
+--toggles を省略すると DEFAULT_TOGGLES（公平性・インターバル・希望）の組み合わせを解く。
+それ以外のトグルを組み合わせるときは --toggles で明示する（2^トグル数 通りを解く）。
+--no-memory を付けるとピークメモリを測る2回目の求解を省く。
+"""
+
+import argparse
+import json
+import sys
+
+from backend.benchmarks.generator import generate_instance
+from backend.benchmarks.runner import (
+    DEFAULT_MIN_SECONDS,
+    DEFAULT_TIME_TOLERANCE,
+    DEFAULT_TOGGLES,
+    compare_with_baseline,
+    run_benchmarks,
+)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m backend.benchmarks")
+    parser.add_argument("--staff", type=int, nargs="+", default=[20])
+    parser.add_argument("--days", type=int, nargs="+", default=[28])
+    parser.add_argument("--slots", type=int, nargs="+", default=[3])
+    parser.add_argument("--density", type=float, nargs="+", default=[0.05])
+    parser.add_argument("--seeds", type=int, nargs="+", default=[0])
+    parser.add_argument(
+        "--toggles", help=f"カンマ区切りのトグル名（省略時は {','.join(DEFAULT_TOGGLES)}）",
+    )
+    parser.add_argument("--time-limit", type=int, default=30)
+    parser.add_argument("--output", help="結果を書き出す JSON ファイル")
+    parser.add_argument("--baseline", help="比較する基準の JSON ファイル")
+    parser.add_argument("--time-tolerance", type=float, default=DEFAULT_TIME_TOLERANCE)
+    parser.add_argument("--min-seconds", type=float, default=DEFAULT_MIN_SECONDS)
+    parser.add_argument("--no-memory", action="store_true", help="ピークメモリを測らない")
+    args = parser.parse_args(argv)
+
+    instances = [
+        generate_instance(staff, days, slots, density, seed)
+        for staff in args.staff
+        for days in args.days
+        for slots in args.slots
+        for density in args.density
+        for seed in args.seeds
+    ]
+    toggles = args.toggles.split(",") if args.toggles else None
+
+    def progress(record: dict) -> None:
+        on = [name for name, value in record["toggles"].items() if value]
+        memory = record["peak_memory_mb"]
+        print(
+            f"{record['instance']} {','.join(on) or '-'}: {record['status']} "
+            f"obj={record['objective']} build={record['build_seconds']}s "
+            f"solve={record['solve_seconds']}s diagnostics={record['diagnostics_seconds']}s"
+            + (f" mem={memory}MB" if memory is not None else ""),
+            file=sys.stderr,
+        )
+
+    report = run_benchmarks(
+        instances, toggles, args.time_limit, progress, memory=not args.no_memory,
+    )
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+    else:
+        json.dump(report, sys.stdout, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            regressions = compare_with_baseline(
+                report, json.load(f), args.time_tolerance, args.min_seconds,
+            )
+        for r in regressions:
+            print(f"REGRESSION {r['instance']} {r['toggles']}: {'; '.join(r['reasons'])}",
+                  file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,169 @@
+from dataclasses import dataclass
+from datetime import date, time, timedelta
+
+import numpy as np
+
+from backend.domain import (
+    RoleStaffingRequirement,
+    SchedulePeriod,
+    ShiftSlot,
+    SkillRequirement,
+    Staff,
+    StaffingRequirement,
+    StaffRequest,
+    StaffSkill,
+)
+
+# 生成できる規模の範囲
+STAFF_RANGE = (10, 1000)
+DAYS_RANGE = (7, 120)
+SLOTS_RANGE = (2, 8)
+
+_LEADER = "リーダー"
+_GENERAL = "一般"
+_SKILL = "救急"
+# 需要はスタッフの勤務可能日数の合計に対するこの割合に合わせる
+_DEMAND_SHARE = 0.6
+
+
+@dataclass
+class Instance:
+    """solve_schedule にそのまま渡せる合成インスタンス"""
+    params: dict  # 生成に使ったパラメータ（ベンチマーク結果の照合キーになる）
+    period: SchedulePeriod
+    staff: list[Staff]
+    slots: list[ShiftSlot]
+    requirements: list[StaffingRequirement]
+    requests: list[StaffRequest]
+    role_requirements: list[RoleStaffingRequirement]
+    staff_skills: list[StaffSkill]
+    skill_requirements: list[SkillRequirement]
+
+    @property
+    def dates(self) -> list[date]:
+        n = (self.period.end_date - self.period.start_date).days + 1
+        return [self.period.start_date + timedelta(days=i) for i in range(n)]
+
+    def solve_kwargs(self) -> dict:
+        """solve_schedule のキーワード引数（config 以外）"""
+        return {
+            "period": self.period,
+            "staff_list": self.staff,
+            "slots": self.slots,
+            "requirements": self.requirements,
+            "requests": self.requests,
+            "role_requirements": self.role_requirements,
+            "staff_skills": self.staff_skills,
+            "skill_requirements": self.skill_requirements,
+        }
+
+
+def _check_range(name: str, value: int, bounds: tuple[int, int]) -> None:
+    if not bounds[0] <= value <= bounds[1]:
+        raise ValueError(f"{name} must be between {bounds[0]} and {bounds[1]}")
+
+
+def generate_instance(
+    num_staff: int = 20,
+    num_days: int = 28,
+    num_slots: int = 3,
+    request_density: float = 0.05,
+    seed: int = 0,
+    start_date: date = date(2026, 3, 2),
+) -> Instance:
+    """シードから決まる合成インスタンスを作る
+
+    - スタッフ: 2 割がリーダー、3 割が「救急」スキル持ち、2 割が週 3〜4 日のパート
+    - シフト枠: 6 時〜16 時の間に開始をずらした 8 時間枠（日をまたがない）
+    - 必要人数: 勤務可能な延べ日数の 6 割を枠に均等に割り振る（週末は 8 割）
+    - 希望: (スタッフ, 日) のうち request_density の割合。7 割が不可日、残りが希望シフト
+    - ロール・スキル要件: 各枠に平日リーダー 1 人、先頭の枠に救急 1 人
+    """
+    _check_range("num_staff", num_staff, STAFF_RANGE)
+    _check_range("num_days", num_days, DAYS_RANGE)
+    _check_range("num_slots", num_slots, SLOTS_RANGE)
+    if not 0.0 <= request_density <= 1.0:
+        raise ValueError("request_density must be between 0 and 1")
+    rng = np.random.default_rng(seed)
+
+    roles = np.where(rng.random(num_staff) < 0.2, _LEADER, _GENERAL)
+    part_time = rng.random(num_staff) < 0.2
+    max_days = np.where(part_time, rng.integers(3, 5, num_staff), 5)
+    min_days = np.where(part_time, 0, rng.integers(0, 3, num_staff))
+    staff = [
+        Staff(
+            id=i + 1, name=f"スタッフ{i + 1}", role=str(roles[i]),
+            max_days_per_week=int(max_days[i]), min_days_per_week=int(min_days[i]),
+        )
+        for i in range(num_staff)
+    ]
+    skilled = np.nonzero(rng.random(num_staff) < 0.3)[0]
+    staff_skills = [
+        StaffSkill(id=n + 1, staff_id=int(i) + 1, skill=_SKILL) for n, i in enumerate(skilled)
+    ]
+
+    slots = []
+    for k in range(num_slots):
+        hour = 6 + (k * 10) // num_slots
+        slots.append(ShiftSlot(
+            id=k + 1, name=f"枠{k + 1}", start_time=time(hour, 0), end_time=time(hour + 8, 0),
+        ))
+
+    per_slot = max_days.sum() / 7 * _DEMAND_SHARE / num_slots
+    requirements = [
+        StaffingRequirement(
+            id=n + 1, shift_slot_id=t.id, day_type=day_type,
+            min_count=max(1, int(per_slot * share)),
+        )
+        for n, (t, day_type, share) in enumerate(
+            (t, day_type, share) for t in slots
+            for day_type, share in (("weekday", 1.0), ("weekend", 0.8))
+        )
+    ]
+
+    period = SchedulePeriod(
+        id=1, start_date=start_date, end_date=start_date + timedelta(days=num_days - 1),
+    )
+    cells = np.argwhere(rng.random((num_staff, num_days)) < request_density)
+    kinds = rng.random(len(cells))
+    chosen_slot = rng.integers(0, num_slots + 1, len(cells))  # num_slots は「枠指定なし」
+    requests = []
+    for n, ((i, d), kind, k) in enumerate(zip(cells, kinds, chosen_slot)):
+        preferred = kind >= 0.7
+        requests.append(StaffRequest(
+            id=n + 1, staff_id=int(i) + 1, date=start_date + timedelta(days=int(d)),
+            type="preferred" if preferred else "unavailable",
+            shift_slot_id=int(k) + 1 if preferred and k < num_slots else None,
+        ))
+
+    role_requirements = []
+    if (roles == _LEADER).any():
+        role_requirements = [
+            RoleStaffingRequirement(
+                id=k + 1, shift_slot_id=t.id, day_type="weekday", role=_LEADER, min_count=1,
+            )
+            for k, t in enumerate(slots)
+        ]
+    skill_requirements = []
+    if len(skilled):
+        skill_requirements = [SkillRequirement(
+            id=1, shift_slot_id=slots[0].id, day_type="weekday", skill=_SKILL, min_count=1,
+        )]
+
+    return Instance(
+        params={
+            "num_staff": num_staff,
+            "num_days": num_days,
+            "num_slots": num_slots,
+            "request_density": request_density,
+            "seed": seed,
+        },
+        period=period,
+        staff=staff,
+        slots=slots,
+        requirements=requirements,
+        requests=requests,
+        role_requirements=role_requirements,
+        staff_skills=staff_skills,
+        skill_requirements=skill_requirements,
+    )
@@ -0,0 +1,164 @@
+import itertools
+import platform
+import tracemalloc
+from dataclasses import fields
+from datetime import datetime, timezone
+from importlib.metadata import PackageNotFoundError, version
+
+from backend.benchmarks.generator import Instance
+from backend.domain import SolverConfig
+from backend.optimizer.metrics import Metrics, collect
+from backend.optimizer.solver import solve_schedule
+
+# 組み合わせを作れるトグル（SolverConfig の enable_* フィールドすべて）
+TOGGLES = [f.name for f in fields(SolverConfig) if f.name.startswith("enable_")]
+# トグルを指定しないときに組み合わせるトグル。全トグルだと 2^12 通りになるので、
+# モデルの大きさと求解時間への影響が大きいものに絞る
+DEFAULT_TOGGLES = ["enable_fairness", "enable_shift_interval", "enable_preferred_shift"]
+
+# 基準より求解時間がこの割合を超えて遅くなったら劣化とみなす
+DEFAULT_TIME_TOLERANCE = 0.25
+# 短い求解の揺らぎを無視するための下限（秒）
+DEFAULT_MIN_SECONDS = 0.5
+
+
+def toggle_combinations(names: list[str] | None = None) -> list[dict[str, bool]]:
+    """指定トグル（既定は DEFAULT_TOGGLES）のオン・オフの全組み合わせ"""
+    names = DEFAULT_TOGGLES if names is None else names
+    unknown = sorted(set(names) - set(TOGGLES))
+    if unknown:
+        raise ValueError(f"unknown toggles: {', '.join(unknown)}")
+    return [
+        dict(zip(names, values))
+        for values in itertools.product([False, True], repeat=len(names))
+    ]
+
+
+def _package_version(name: str) -> str | None:
+    try:
+        return version(name)
+    except PackageNotFoundError:
+        return None
+
+
+def _measure(instance: Instance, config: SolverConfig, memory: bool = True) -> dict:
+    """1ケースを解き、モデル構築・求解・診断の時間と Python 側のピークメモリを測る
+
+    時間は solve_schedule が記録するフェーズごとのスパン（build_model / solve /
+    diagnostics）から取る。tracemalloc はメモリ確保のたびに記録して遅くなるので、
+    ピークメモリは memory=True のときだけ別にもう1回解いて測る（NumPy 配列を含み、
+    ソルバー内部は含まない）。
+    """
+    with collect(Metrics()) as metrics:
+        result = solve_schedule(config=config, **instance.solve_kwargs())
+    seconds = {s["name"]: s["seconds"] for s in metrics.report()["spans"]}
+
+    peak = None
+    if memory:
+        tracemalloc.start()
+        try:
+            solve_schedule(config=config, **instance.solve_kwargs())
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    stats = result.get("model_stats") or {}
+    return {
+        "status": result["status"],
+        "objective": result.get("objective"),
+        "build_seconds": seconds.get("build_model", 0.0),
+        "solve_seconds": seconds.get("solve", 0.0),
+        "diagnostics_seconds": seconds.get("diagnostics", 0.0),
+        "peak_memory_mb": round(peak / 2**20, 2) if peak is not None else None,
+        "rows": stats.get("constraints"),
+        "cols": stats.get("variables"),
+        "nonzeros": stats.get("nonzeros"),
+    }
+
+
+def run_benchmarks(
+    instances: list[Instance],
+    toggles: list[str] | None = None,
+    time_limit: int = 30,
+    progress=None,
+    memory: bool = True,
+) -> dict:
+    """各インスタンスをトグルの全組み合わせで解き、JSON にできる結果をまとめる
+
+    toggles を省略すると DEFAULT_TOGGLES の組み合わせを解く。progress には各ケースの
+    記録（dict）が終わるたびに渡される。memory=False ならピークメモリを測らない。
+    """
+    combos = toggle_combinations(toggles)
+    results = []
+    for instance in instances:
+        for combo in combos:
+            config = SolverConfig(id=0, time_limit=time_limit, **combo)
+            record = {"instance": instance.params, "toggles": combo, **_measure(instance, config, memory)}
+            results.append(record)
+            if progress is not None:
+                progress(record)
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": _package_version("numpy"),
+            "highspy": _package_version("highspy"),
+            "pulp": _package_version("pulp"),
+        },
+        "time_limit": time_limit,
+        "results": results,
+    }
+
+
+def _case_key(record: dict) -> tuple:
+    return (
+        tuple(sorted(record["instance"].items())),
+        tuple(sorted(record["toggles"].items())),
+    )
+
+
+def compare_with_baseline(
+    report: dict,
+    baseline: dict,
+    time_tolerance: float = DEFAULT_TIME_TOLERANCE,
+    min_seconds: float = DEFAULT_MIN_SECONDS,
+) -> list[dict]:
+    """基準の結果と同じケース（インスタンス・トグル）を比べ、劣化したものを返す
+
+    劣化とみなすのは次のいずれか:
+    - 基準で最適・実行可能だったケースが解けなくなった
+    - 目的値が悪化した（最小化なので増えた）
+    - 求解時間が基準の (1 + time_tolerance) 倍かつ min_seconds 以上遅くなった
+    基準にないケースは比較しない。
+    """
+    base = {_case_key(r): r for r in baseline.get("results", [])}
+    regressions = []
+    for record in report["results"]:
+        before = base.get(_case_key(record))
+        if before is None:
+            continue
+        reasons = []
+        solved = ("optimal", "feasible")
+        if before["status"] in solved and record["status"] not in solved:
+            reasons.append(f"status {before['status']} -> {record['status']}")
+        if (
+            before.get("objective") is not None
+            and record.get("objective") is not None
+            and record["objective"] > before["objective"] + 1e-6
+        ):
+            reasons.append(f"objective {before['objective']:g} -> {record['objective']:g}")
+        slower = record["solve_seconds"] - before["solve_seconds"]
+        if (
+            record["solve_seconds"] > before["solve_seconds"] * (1 + time_tolerance)
+            and slower >= min_seconds
+        ):
+            reasons.append(
+                f"solve_seconds {before['solve_seconds']:g} -> {record['solve_seconds']:g}"
+            )
+        if reasons:
+            regressions.append({
+                "instance": record["instance"],
+                "toggles": record["toggles"],
+                "reasons": reasons,
+            })
+    return regressions
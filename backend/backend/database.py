@@ -64,3 +64,31 @@ def _run_migrations(engine_instance):
                 )
             )
             conn.commit()
+
+        # solver_config にソルバーパラメータのカラムがなければ追加
+        result = conn.execute(text("PRAGMA table_info(solver_config)"))
+        columns = {row[1] for row in result}
+        for column, ddl in [
+            ("solver_profile", "VARCHAR NOT NULL DEFAULT 'balanced'"),
+            ("mip_rel_gap", "FLOAT"),
+            ("solver_threads", "INTEGER NOT NULL DEFAULT 0"),
+            ("random_seed", "INTEGER NOT NULL DEFAULT 0"),
+            ("enable_solver_race", "BOOLEAN NOT NULL DEFAULT 0"),
+            ("enable_symmetry_breaking", "BOOLEAN NOT NULL DEFAULT 0"),
+            ("enable_lazy_constraints", "BOOLEAN NOT NULL DEFAULT 0"),
+            ("enable_decomposition", "BOOLEAN NOT NULL DEFAULT 0"),
+        ]:
+            if column not in columns:
+                conn.execute(text(f"ALTER TABLE solver_config ADD COLUMN {column} {ddl}"))
+                conn.commit()
+
+        # optimization_jobs にジョブの種類とリクエスト内容のカラムがなければ追加
+        result = conn.execute(text("PRAGMA table_info(optimization_jobs)"))
+        columns = {row[1] for row in result}
+        for column, ddl in [
+            ("kind", "VARCHAR NOT NULL DEFAULT 'optimize'"),
+            ("params", "TEXT"),
+        ]:
+            if columns and column not in columns:
+                conn.execute(text(f"ALTER TABLE optimization_jobs ADD COLUMN {column} {ddl}"))
+                conn.commit()
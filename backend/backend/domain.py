@@ -1,5 +1,5 @@
 from dataclasses import dataclass
-from datetime import date, time
+from datetime import date, datetime, time
 
 
 @dataclass
@@ -75,6 +75,15 @@ class SolverConfig:
     weight_fairness: float = 2.0
     weight_weekend_fairness: float = 2.0
     weight_soft_staffing: float = 10.0
+    # ソルバーパラメータ
+    solver_profile: str = "balanced"  # "fast_draft" | "balanced" | "prove_optimal"
+    mip_rel_gap: float | None = None  # None ならプロファイルの既定値
+    solver_threads: int = 0  # 0 = ソルバーに任せる
+    random_seed: int = 0
+    enable_solver_race: bool = False  # HiGHS/SCIP/CBC を別プロセスで同時に解く
+    enable_symmetry_breaking: bool = False  # 入れ替え可能なスタッフに順序制約を加える
+    enable_lazy_constraints: bool = False  # インターバル・逆循環の行を違反時だけ加える
+    enable_decomposition: bool = False  # 独立な部分問題に分けて並列に解く
 
 
 @dataclass
@@ -108,3 +117,17 @@ class DiagnosticItem:
     severity: str      # "error" | "warning"
     message: str       # 日本語の具体的メッセージ
     details: list[str] | None = None
+
+
+@dataclass
+class OptimizationJob:
+    id: int
+    period_id: int
+    status: str  # "queued" | "running" | "completed" | "failed" | "cancelled"
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    result: dict | None = None  # kind に応じたレスポンスの JSON
+    error: str | None = None
+    kind: str = "optimize"  # "optimize" | "scenarios" | "weight_sweep"
+    params: dict | None = None  # scenarios / weight_sweep のリクエスト内容
@@ -1,9 +1,11 @@
 import os
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 
 from backend import models  # noqa: F401
+from backend.api.optimization_jobs import router as optimization_jobs_router
 from backend.api.requests import router as requests_router
 from backend.api.role_staffing_requirements import router as role_staffing_requirements_router
 from backend.api.schedules import router as schedules_router
@@ -14,11 +16,20 @@ from backend.api.solver_config import router as solver_config_router
 from backend.api.staff import router as staff_router
 from backend.api.staffing_requirements import router as staffing_requirements_router
 from backend.database import Base, _run_migrations, engine
+from backend.services import shutdown_job_runner
 
 Base.metadata.create_all(bind=engine)
 _run_migrations(engine)
 
-app = FastAPI(title="Shift Scheduling API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # 停止・リロード時に求解の子プロセス（daemon ではない）を残さない
+    shutdown_job_runner()
+
+
+app = FastAPI(title="Shift Scheduling API", lifespan=lifespan)
 
 _raw_origins = os.environ.get("ALLOWED_ORIGINS", "http://localhost:3000")
 _allow_origins = [o.strip() for o in _raw_origins.split(",")]
@@ -41,6 +52,7 @@ app.include_router(solver_config_router)
 app.include_router(role_staffing_requirements_router)
 app.include_router(skills_router)
 app.include_router(skill_requirements_router)
+app.include_router(optimization_jobs_router)
 
 
 @app.get("/api/health")
@@ -1,6 +1,6 @@
-from datetime import date, time
+from datetime import date, datetime, time
 
-from sqlalchemy import Boolean, Date, Float, ForeignKey, Integer, String, Time
+from sqlalchemy import Boolean, Date, DateTime, Float, ForeignKey, Integer, String, Text, Time
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from backend.database import Base
@@ -116,6 +116,19 @@ class SolverConfigModel(Base):
     weight_fairness: Mapped[float] = mapped_column(Float, nullable=False, default=2.0)
     weight_weekend_fairness: Mapped[float] = mapped_column(Float, nullable=False, default=2.0)
     weight_soft_staffing: Mapped[float] = mapped_column(Float, nullable=False, default=10.0)
+    # ソルバーパラメータ
+    solver_profile: Mapped[str] = mapped_column(String, nullable=False, default="balanced")
+    mip_rel_gap: Mapped[float | None] = mapped_column(Float, nullable=True)
+    solver_threads: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    random_seed: Mapped[int] = mapped_column(Integer, nullable=False, default=0)
+    enable_solver_race: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
+    enable_symmetry_breaking: Mapped[bool] = mapped_column(
+        Boolean, nullable=False, default=False
+    )
+    enable_lazy_constraints: Mapped[bool] = mapped_column(
+        Boolean, nullable=False, default=False
+    )
+    enable_decomposition: Mapped[bool] = mapped_column(Boolean, nullable=False, default=False)
 
 
 class RoleStaffingRequirementModel(Base):
@@ -148,3 +161,20 @@ class SkillRequirementModel(Base):
     day_type: Mapped[str] = mapped_column(String, nullable=False)
     skill: Mapped[str] = mapped_column(String, nullable=False)
     min_count: Mapped[int] = mapped_column(Integer, nullable=False)
+
+
+class OptimizationJobModel(Base):
+    __tablename__ = "optimization_jobs"
+
+    id: Mapped[int] = mapped_column(Integer, primary_key=True)
+    period_id: Mapped[int] = mapped_column(
+        ForeignKey("schedule_periods.id"), nullable=False
+    )
+    status: Mapped[str] = mapped_column(String, nullable=False, default="queued")
+    created_at: Mapped[datetime] = mapped_column(DateTime, nullable=False)
+    started_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    finished_at: Mapped[datetime | None] = mapped_column(DateTime, nullable=True)
+    result: Mapped[str | None] = mapped_column(Text, nullable=True)  # JSON
+    error: Mapped[str | None] = mapped_column(String, nullable=True)
+    kind: Mapped[str] = mapped_column(String, nullable=False, default="optimize")
+    params: Mapped[str | None] = mapped_column(Text, nullable=True)  # JSON
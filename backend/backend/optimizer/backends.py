@@ -0,0 +1,479 @@
+import math
+import multiprocessing
+import os
+import signal
+import threading
+import time
+from dataclasses import dataclass
+from multiprocessing.connection import wait
+from typing import Any, Callable
+
+import numpy as np
+
+from backend.optimizer.model import MipModel
+
+
+@dataclass
+class SolveOutcome:
+    status: str  # "optimal" | "feasible" | "infeasible" | "timeout" | "error"
+    backend: str  # "highs" | "scip" | "cbc"
+    col_values: np.ndarray | None = None
+    objective: float | None = None
+    solve_seconds: float = 0.0
+    solver_model: Any = None  # HiGHS の場合は highspy.Highs（IIS 取得用）
+    mip_gap: float | None = None  # 相対ギャップ（不明な場合は None）
+    bound: float | None = None  # 双対境界（目的値の下界）
+
+
+# 初期解: (列番号配列, 値配列)。値を与えない列はソルバーが補完する
+MipStart = tuple[np.ndarray, np.ndarray]
+
+
+@dataclass
+class SolverParams:
+    """ソルバーに渡す求解パラメータ（既定値は HiGHS の既定値）"""
+    profile: str = "balanced"
+    mip_rel_gap: float = 1e-4
+    threads: int = 0  # 0 = ソルバーに任せる
+    random_seed: int = 0
+    heuristic_effort: float = 0.05  # HiGHS の mip_heuristic_effort（CBC では無視）
+
+
+# パラメータプロファイルごとの既定値。mip_rel_gap は SolverConfig で上書きできる
+SOLVER_PROFILES: dict[str, dict[str, float]] = {
+    # 数 % の差は許容し、ヒューリスティックを増やして早く良い解を出す
+    "fast_draft": {"mip_rel_gap": 0.05, "heuristic_effort": 0.3},
+    "balanced": {"mip_rel_gap": 1e-4, "heuristic_effort": 0.05},
+    # 最適性の証明まで探索する
+    "prove_optimal": {"mip_rel_gap": 0.0, "heuristic_effort": 0.05},
+}
+
+# HiGHS のスレッド数はプロセス共通のスケジューラで決まる。作り直してよいのは
+# 1度に1つしか解かないソルバー専用の子プロセスだけ（own_highs_scheduler で宣言する）
+_owns_highs_scheduler = False
+_highs_threads = 0
+
+
+def own_highs_scheduler() -> None:
+    """このプロセスは1度に1つしか解かないので、スレッド数に合わせてスケジューラを作り直してよい
+
+    spawn した求解用の子プロセスの先頭（プロセスプールの initializer）で呼ぶ。
+    API のプロセスでは呼ばない。並行する求解が使っているスケジューラを壊さないよう、
+    スレッド数はスケジューラを最初に作るときの値（既定は HiGHS の自動）で固定になる。
+    """
+    global _owns_highs_scheduler
+    _owns_highs_scheduler = True
+
+
+def _configure_highs_threads(highspy, threads: int) -> int:
+    """求解用の子プロセスでは threads が前回と異なる場合だけスケジューラを作り直す
+
+    0（自動）に戻した場合も作り直し、HiGHS の既定のスレッド数に戻す。
+    戻り値は HiGHS の threads オプションに設定する値。スケジューラと異なる
+    スレッド数を渡すと HiGHS は求解を拒否するため、API のプロセスでは
+    設定を無視して 0（既存のスケジューラに従う）を返す。
+    """
+    global _highs_threads
+    if not _owns_highs_scheduler:
+        return 0
+    if threads != _highs_threads:
+        highspy.Highs.resetGlobalScheduler(True)
+        _highs_threads = threads
+    return threads
+
+# 求解中の進捗通知。{"elapsed", "objective", "bound", "gap"} の dict を受け取る
+ProgressCallback = Callable[[dict], None]
+
+# 暫定解が変わらないときに双対境界の更新を通知する最短間隔（秒）
+_PROGRESS_BOUND_INTERVAL = 0.5
+
+
+def _progress_event(out) -> dict:
+    """HiGHS のコールバック出力を JSON にできる進捗イベントにする（inf は None）"""
+    return {
+        "elapsed": round(out.running_time, 3),
+        "objective": _finite(out.mip_primal_bound),
+        "bound": _finite(out.mip_dual_bound),
+        "gap": _finite(out.mip_gap),
+    }
+
+
+def _subscribe_progress(
+    h, progress: ProgressCallback | None, stop: threading.Event | None
+) -> None:
+    """暫定解の改善ごと（と一定間隔の境界更新）に progress を呼び、stop で中断させる"""
+    last = {"time": 0.0, "bound": None}
+
+    def emit(event: dict) -> None:
+        last["time"] = event["elapsed"]
+        last["bound"] = event["bound"]
+        progress(event)
+
+    def on_improving(e) -> None:
+        emit(_progress_event(e.data_out))
+
+    def on_interrupt(e) -> None:
+        if stop is not None and stop.is_set():
+            e.interrupt()
+            return
+        if progress is None:
+            return
+        event = _progress_event(e.data_out)
+        if (
+            event["objective"] is not None
+            and event["bound"] != last["bound"]
+            and event["elapsed"] - last["time"] >= _PROGRESS_BOUND_INTERVAL
+        ):
+            emit(event)
+
+    if progress is not None:
+        h.cbMipImprovingSolution.subscribe(on_improving)
+    h.cbMipInterrupt.subscribe(on_interrupt)
+
+
+def solve_with_highs(
+    model: MipModel,
+    time_limit: float,
+    start: MipStart | None = None,
+    progress: ProgressCallback | None = None,
+    stop: threading.Event | None = None,
+    params: SolverParams | None = None,
+) -> SolveOutcome:
+    """CSR 配列を highspy.Highs.passModel に一括で渡して求解する
+
+    progress を渡すと暫定解が改善するたびに進捗を通知し、stop がセットされると
+    求解を中断する（中断時のステータスは時間切れと同じ扱い）。
+    """
+    import highspy
+
+    params = params or SolverParams()
+    h = highspy.Highs()
+    h.setOptionValue("output_flag", False)
+    h.setOptionValue("time_limit", float(time_limit))
+    h.setOptionValue("mip_rel_gap", float(params.mip_rel_gap))
+    h.setOptionValue("random_seed", int(params.random_seed))
+    h.setOptionValue("mip_heuristic_effort", float(params.heuristic_effort))
+    threads = _configure_highs_threads(highspy, params.threads)
+    if threads > 0:
+        h.setOptionValue("threads", int(threads))
+    h.setOptionValue(
+        "iis_strategy", int(highspy.IisStrategy.kIisStrategyIrreducible)
+    )
+    h.passModel(
+        model.num_col,
+        model.num_row,
+        model.num_nz,
+        int(highspy.MatrixFormat.kRowwise),
+        int(highspy.ObjSense.kMinimize),
+        model.offset,
+        model.col_cost,
+        model.col_lower,
+        model.col_upper,
+        model.row_lower,
+        model.row_upper,
+        model.a_start,
+        model.a_index,
+        model.a_value,
+        model.integrality,
+    )
+    if start is not None:
+        index, values = start
+        h.setSolution(len(index), index.astype(np.int32), values.astype(np.float64))
+    if progress is not None or stop is not None:
+        _subscribe_progress(h, progress, stop)
+    started = time.perf_counter()
+    run_status = h.run()
+    elapsed = time.perf_counter() - started
+    if run_status == highspy.HighsStatus.kError:
+        # オプションの不整合などで HiGHS が求解しなかった。時間切れとは区別する
+        return SolveOutcome(
+            status="error", backend="highs", solve_seconds=elapsed, solver_model=h,
+        )
+
+    model_status = h.getModelStatus()
+    status_enum = highspy.HighsModelStatus
+    info = h.getInfo()
+    if model_status == status_enum.kOptimal:
+        status = "optimal"
+    elif model_status in (status_enum.kInfeasible, status_enum.kUnboundedOrInfeasible):
+        status = "infeasible"
+    elif info.primal_solution_status == int(highspy.SolutionStatus.kSolutionStatusFeasible):
+        # 時間切れ・中断でも暫定解があれば返す
+        status = "feasible"
+    else:
+        status = "timeout"
+
+    outcome = SolveOutcome(
+        status=status, backend="highs", solve_seconds=elapsed, solver_model=h,
+    )
+    if status in ("optimal", "feasible"):
+        outcome.col_values = np.asarray(h.getSolution().col_value)
+        outcome.objective = info.objective_function_value
+        outcome.mip_gap = _finite(info.mip_gap)
+        outcome.bound = _finite(info.mip_dual_bound)
+    return outcome
+
+
+def _finite(value: float) -> float | None:
+    return float(value) if math.isfinite(value) else None
+
+
+def to_pulp_problem(model: MipModel):
+    """行列モデルを PuLP の LpProblem に変換する（CBC/SCIP フォールバック用）"""
+    from pulp import LpAffineExpression, LpConstraint, LpMinimize, LpProblem, LpVariable
+    from pulp import LpConstraintEQ, LpConstraintGE, LpConstraintLE
+
+    prob = LpProblem("ShiftScheduling", LpMinimize)
+    variables = []
+    for j in range(model.num_col):
+        lower = model.col_lower[j]
+        upper = model.col_upper[j]
+        if model.integrality[j]:
+            cat = "Binary" if lower == 0 and upper == 1 else "Integer"
+        else:
+            cat = "Continuous"
+        variables.append(LpVariable(
+            f"c{j}",
+            lowBound=None if np.isinf(lower) else float(lower),
+            upBound=None if np.isinf(upper) else float(upper),
+            cat=cat,
+        ))
+
+    nz = np.nonzero(model.col_cost)[0]
+    prob += LpAffineExpression(
+        [(variables[j], float(model.col_cost[j])) for j in nz],
+        constant=model.offset,
+    )
+
+    for r in range(model.num_row):
+        start, end = model.a_start[r], model.a_start[r + 1]
+        expr = LpAffineExpression([
+            (variables[j], float(v))
+            for j, v in zip(model.a_index[start:end], model.a_value[start:end])
+        ])
+        lower, upper = model.row_lower[r], model.row_upper[r]
+        if lower == upper:
+            prob += LpConstraint(expr, LpConstraintEQ, f"r{r}", float(lower))
+            continue
+        if not np.isinf(lower):
+            prob += LpConstraint(expr, LpConstraintGE, f"r{r}", float(lower))
+        if not np.isinf(upper):
+            name = f"r{r}" if np.isinf(lower) else f"r{r}_ub"
+            prob += LpConstraint(expr, LpConstraintLE, name, float(upper))
+    return prob, variables
+
+
+def solve_with_pulp(
+    model: MipModel,
+    time_limit: float,
+    start: MipStart | None = None,
+    params: SolverParams | None = None,
+    solver: str | None = None,
+) -> SolveOutcome:
+    """PuLP 経由で SCIP（なければ CBC）を使って求解する
+
+    solver に "scip" / "cbc" を指定するとそのソルバーだけを使う。
+    初期解は CBC の warmStart として渡す（SCIP_CMD は初期解を受け付けない）。
+    ギャップは両方に、スレッド数と乱数シードは CBC にだけ渡す。
+    """
+    if solver not in (None, "scip", "cbc"):
+        raise ValueError(f"unknown PuLP solver: {solver}")
+    params = params or SolverParams()
+    prob, variables = to_pulp_problem(model)
+    if start is not None:
+        for j, v in zip(*start):
+            variables[j].setInitialValue(float(v))
+    started = time.perf_counter()
+    backend = solver
+    if backend in (None, "scip"):
+        try:
+            from pulp import SCIP_CMD
+            prob.solve(SCIP_CMD(msg=0, timeLimit=time_limit, gapRel=params.mip_rel_gap))
+            backend = "scip"
+        except Exception:
+            if solver == "scip":
+                raise
+            backend = None
+    if backend is None or backend == "cbc":
+        from pulp import PULP_CBC_CMD
+        prob.solve(PULP_CBC_CMD(
+            msg=0,
+            timeLimit=time_limit,
+            warmStart=start is not None,
+            gapRel=params.mip_rel_gap,
+            threads=params.threads or None,
+            options=[f"randomCbcSeed {params.random_seed}"] if params.random_seed else [],
+        ))
+        backend = "cbc"
+    elapsed = time.perf_counter() - started
+
+    # status 1 = Optimal, 0 = Not Solved (timeout), -1 = Infeasible
+    # 時間切れでも整数解があれば status 1 / sol_status 2 (IntegerFeasible) になる
+    if prob.status == 1:
+        col_values = np.array([v.varValue or 0.0 for v in variables])
+        return SolveOutcome(
+            status="feasible" if prob.sol_status == 2 else "optimal",
+            backend=backend,
+            col_values=col_values,
+            objective=float(prob.objective.value()),
+            solve_seconds=elapsed,
+        )
+    status = "timeout" if prob.status == 0 else "infeasible"
+    return SolveOutcome(status=status, backend=backend, solve_seconds=elapsed)
+
+
+def solve_model(
+    model: MipModel,
+    time_limit: float,
+    start: MipStart | None = None,
+    progress: ProgressCallback | None = None,
+    stop: threading.Event | None = None,
+    params: SolverParams | None = None,
+) -> SolveOutcome:
+    """HiGHS を優先し、利用できなければ PuLP 経由の SCIP/CBC で求解する
+
+    進捗通知と中断は HiGHS のときだけ効く（PuLP 経由では最後まで解く）。
+    """
+    try:
+        return solve_with_highs(model, time_limit, start, progress, stop, params)
+    except ImportError:
+        return solve_with_pulp(model, time_limit, start, params)
+
+
+# レースで各ソルバーの時間制限を過ぎてからプロセスを止めるまでの猶予（秒）
+_RACE_GRACE_SECONDS = 5.0
+
+
+def available_backends() -> list[str]:
+    """このプロセスから使えるソルバーの一覧（HiGHS, SCIP, CBC の順）"""
+    names = []
+    try:
+        import highspy  # noqa: F401
+        names.append("highs")
+    except ImportError:
+        pass
+    try:
+        from pulp import PULP_CBC_CMD, SCIP_CMD
+    except ImportError:
+        return names
+    if SCIP_CMD(msg=0).available():
+        names.append("scip")
+    if PULP_CBC_CMD(msg=0).available():
+        names.append("cbc")
+    return names
+
+
+def _race_worker(
+    backend: str,
+    model: MipModel,
+    time_limit: float,
+    start: MipStart | None,
+    params: SolverParams | None,
+    conn,
+) -> None:
+    """子プロセス側: 指定したソルバーで求解して結果をパイプで返す"""
+    if hasattr(os, "setpgrp"):
+        os.setpgrp()  # CBC/SCIP の実行ファイルごとまとめて止められるようにする
+    own_highs_scheduler()
+    try:
+        if backend == "highs":
+            outcome = solve_with_highs(model, time_limit, start, params=params)
+            outcome.solver_model = None  # highspy.Highs はプロセス間で受け渡せない
+        else:
+            outcome = solve_with_pulp(model, time_limit, start, params, solver=backend)
+    except Exception:
+        outcome = SolveOutcome(status="error", backend=backend)
+    conn.send(outcome)
+    conn.close()
+
+
+def _kill_process_group(process) -> None:
+    if hasattr(os, "killpg"):
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            pass  # setpgrp 前（起動直後）はグループがない
+    if process.is_alive():
+        process.kill()
+    process.join()
+
+
+def race_model(
+    model: MipModel,
+    time_limit: float,
+    start: MipStart | None = None,
+    params: SolverParams | None = None,
+    stop: threading.Event | None = None,
+    backends: list[str] | None = None,
+) -> tuple[SolveOutcome, dict]:
+    """同じモデルを使えるすべてのソルバーで別プロセスで同時に解き、勝者の結果を返す
+
+    最初に最適解（または実行不能の証明）を返したソルバーを勝者とし、残りの
+    プロセスは止める。全員が時間切れになった場合は暫定解のうち目的値が最良のものを返す。
+    戻り値は (結果, {"winner", "backends": [ソルバーごとの状態・所要秒・目的値]})。
+    """
+    names = backends or available_backends()
+    mp = multiprocessing.get_context("spawn")
+    started = time.perf_counter()
+    deadline = started + time_limit + _RACE_GRACE_SECONDS
+
+    running = {}
+    for name in names:
+        parent_conn, child_conn = mp.Pipe(duplex=False)
+        process = mp.Process(
+            target=_race_worker,
+            args=(name, model, time_limit, start, params, child_conn),
+            daemon=True,
+        )
+        process.start()
+        child_conn.close()
+        running[parent_conn] = (name, process)
+
+    finished: dict[str, tuple[SolveOutcome, float]] = {}
+    winner = None
+    try:
+        while running and winner is None:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0 or (stop is not None and stop.is_set()):
+                break
+            for conn in wait(list(running), timeout=min(remaining, 0.2)):
+                name, process = running.pop(conn)
+                try:
+                    outcome = conn.recv()
+                except EOFError:
+                    outcome = SolveOutcome(status="error", backend=name)
+                conn.close()
+                process.join()
+                finished[name] = (outcome, time.perf_counter() - started)
+                if outcome.status in ("optimal", "infeasible"):
+                    winner = name
+                    break
+    finally:
+        killed_at = time.perf_counter() - started
+        for conn, (name, process) in running.items():
+            _kill_process_group(process)
+            conn.close()
+
+    if winner is None:
+        feasible = [
+            name for name, (outcome, _) in finished.items() if outcome.status == "feasible"
+        ]
+        if feasible:
+            winner = min(feasible, key=lambda n: finished[n][0].objective)
+
+    report = {
+        "winner": winner,
+        "backends": [
+            {
+                "backend": name,
+                "status": finished[name][0].status if name in finished else "killed",
+                "seconds": round(finished[name][1] if name in finished else killed_at, 3),
+                "objective": finished[name][0].objective if name in finished else None,
+            }
+            for name in names
+        ],
+    }
+    if winner is not None:
+        return finished[winner][0], report
+    status = "timeout" if any(o.status == "timeout" for o, _ in finished.values()) or running else "error"
+    return SolveOutcome(status=status, backend="race", solve_seconds=killed_at), report
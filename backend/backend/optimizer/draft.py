@@ -0,0 +1,238 @@
+from datetime import timedelta
+
+import numpy as np
+
+from backend.domain import (
+    DiagnosticItem,
+    RoleStaffingRequirement,
+    ScheduleAssignment,
+    SchedulePeriod,
+    ShiftSlot,
+    SkillRequirement,
+    SolverConfig,
+    Staff,
+    StaffingRequirement,
+    StaffRequest,
+    StaffSkill,
+)
+from backend.optimizer.solver import (
+    _build_preferred_map,
+    _default_config,
+    _forbidden_pairs,
+    _get_day_type,
+    _pinned_cells,
+    _prefix_runs,
+    _week_matrix,
+)
+
+_UNCOVERED_LABELS = {
+    "C2_staffing": "必要人数",
+    "B5_role_staffing": "ロール別必要人数",
+    "B8_skill_staffing": "スキル別必要人数",
+}
+
+
+def draft_schedule(
+    period: SchedulePeriod,
+    staff_list: list[Staff],
+    slots: list[ShiftSlot],
+    requirements: list[StaffingRequirement],
+    requests: list[StaffRequest],
+    config: SolverConfig | None = None,
+    role_requirements: list[RoleStaffingRequirement] | None = None,
+    prefix_assignments: dict[int, list] | None = None,
+    staff_skills: list[StaffSkill] | None = None,
+    skill_requirements: list[SkillRequirement] | None = None,
+    fixed_assignments: list[ScheduleAssignment] | None = None,
+) -> dict:
+    """MIP を使わずに貪欲法でシフトの下書きを作る
+
+    日付順に各 (日付, シフト枠) の必要人数を、ロール・スキルの最低人数から先に
+    勤務可能なスタッフで埋める。不可日・週勤務上限・連勤上限・インターバル・
+    逆循環の各制約は破らず、埋められなかった需要は失敗にせず uncovered で返す。
+    スタッフの選び方は「希望シフト → 週の最低勤務日数の不足 → 勤務日数の少なさ」の順。
+    """
+    if config is None:
+        config = _default_config()
+    role_requirements = role_requirements or []
+
+    num_days = (period.end_date - period.start_date).days + 1
+    dates = [period.start_date + timedelta(days=i) for i in range(num_days)]
+    S, D, T = len(staff_list), len(dates), len(slots)
+    staff_pos = {s.id: i for i, s in enumerate(staff_list)}
+    date_pos = {d: i for i, d in enumerate(dates)}
+    slot_pos = {t.id: k for k, t in enumerate(slots)}
+    day_types = [_get_day_type(d) for d in dates]
+
+    req_map = {(r.shift_slot_id, r.day_type): r.min_count for r in requirements}
+    demand = np.array(
+        [[req_map.get((t.id, dt), 0) for t in slots] for dt in day_types], dtype=np.int64,
+    ).reshape(D, T)
+
+    unavailable = np.zeros((S, D), dtype=bool)
+    for req in requests:
+        if req.type == "unavailable" and req.staff_id in staff_pos and req.date in date_pos:
+            unavailable[staff_pos[req.staff_id], date_pos[req.date]] = True
+
+    preferred = np.zeros((S, D, T), dtype=bool)
+    if config.enable_preferred_shift:
+        for (staff_id, d, slot_id) in _build_preferred_map(requests):
+            if staff_id not in staff_pos or d not in date_pos:
+                continue
+            if slot_id is None:
+                preferred[staff_pos[staff_id], date_pos[d], :] = True
+            elif slot_id in slot_pos:
+                preferred[staff_pos[staff_id], date_pos[d], slot_pos[slot_id]] = True
+
+    # 各 (日付, 枠) で先に満たす最低人数: (対象スタッフのマスク, 人数, 制約名, 表示名)
+    needs: dict[tuple[int, int], list[tuple[np.ndarray, int, str, str]]] = {}
+    if config.enable_role_staffing:
+        for rr in role_requirements:
+            if rr.shift_slot_id not in slot_pos:
+                continue
+            mask = np.array([s.role == rr.role for s in staff_list], dtype=bool)
+            for d_idx, dt in enumerate(day_types):
+                if dt == rr.day_type:
+                    needs.setdefault((d_idx, slot_pos[rr.shift_slot_id]), []).append(
+                        (mask, rr.min_count, "B5_role_staffing", rr.role)
+                    )
+    if config.enable_skill_staffing and skill_requirements:
+        skills_map: dict[int, set[str]] = {}
+        for ss in staff_skills or []:
+            skills_map.setdefault(ss.staff_id, set()).add(ss.skill)
+        for sr in skill_requirements:
+            if sr.shift_slot_id not in slot_pos:
+                continue
+            mask = np.array([sr.skill in skills_map.get(s.id, set()) for s in staff_list])
+            if not mask.any():
+                continue  # 有資格者がいない場合は MIP と同じく制約を課さない
+            for d_idx, dt in enumerate(day_types):
+                if dt == sr.day_type:
+                    needs.setdefault((d_idx, slot_pos[sr.shift_slot_id]), []).append(
+                        (mask, sr.min_count, "B8_skill_staffing", sr.skill)
+                    )
+
+    # 手動確定セルはそのまま使い、以降の判定に含める
+    pinned_on, pinned_days = _pinned_cells(fixed_assignments, staff_list, dates, slots)
+    slot_of = np.full((S, D), -1, dtype=np.int64)
+    pin_s, pin_d, pin_t = np.nonzero(pinned_on)
+    slot_of[pin_s, pin_d] = pin_t
+    blocked = unavailable | pinned_days
+
+    max_days = np.array([s.max_days_per_week for s in staff_list], dtype=np.int64)
+    min_days = np.array(
+        [s.min_days_per_week if config.enable_min_days_per_week else 0 for s in staff_list],
+        dtype=np.int64,
+    )
+    _, day_mat = _week_matrix(dates)
+    week_of = np.zeros(D, dtype=np.int64)
+    for w, days in enumerate(day_mat):
+        week_of[days[days >= 0]] = w
+    week_count = np.zeros((S, len(day_mat)), dtype=np.int64)
+    np.add.at(week_count, (pin_s, week_of[pin_d]), 1)
+
+    W = config.max_consecutive_days
+    # 後ろ側の連勤は手動確定日だけで決まるので、末尾から一度だけ数えておく
+    right_run = np.zeros((S, D + 1), dtype=np.int64)
+    for d in range(D - 1, -1, -1):
+        right_run[:, d] = np.where(slot_of[:, d] >= 0, right_run[:, d + 1] + 1, 0)
+    left_run = _prefix_runs(prefix_assignments, staff_list, dates[0])
+    forbid = _forbidden_pairs(slots, config)
+    total = (slot_of >= 0).sum(axis=1)
+
+    uncovered: list[dict] = []
+    for d in range(D):
+        if d > 0:
+            left_run = np.where(slot_of[:, d - 1] >= 0, left_run + 1, 0)
+        w = week_of[d]
+        day_ok = (
+            ~blocked[:, d]
+            & (slot_of[:, d] < 0)
+            & (week_count[:, w] < max_days)
+            & (left_run + 1 + right_run[:, d + 1] <= W)
+        )
+        # 前日・翌日の枠との組み合わせで禁止される枠 (S, T)
+        banned = np.zeros((S, T), dtype=bool)
+        if d > 0:
+            has_prev = slot_of[:, d - 1] >= 0
+            banned[has_prev] |= forbid[slot_of[has_prev, d - 1], :]
+        if d + 1 < D:
+            has_next = slot_of[:, d + 1] >= 0
+            banned[has_next] |= forbid[:, slot_of[has_next, d + 1]].T
+
+        # 候補の少ない枠から埋める
+        open_slots = [t for t in range(T) if demand[d, t] > 0 or (d, t) in needs]
+        open_slots.sort(
+            key=lambda t: (int((day_ok & ~banned[:, t]).sum()) - int(demand[d, t]), t)
+        )
+        for t in open_slots:
+            in_slot = slot_of[:, d] == t
+            ok = day_ok & ~banned[:, t]
+            targets = needs.get((d, t), []) + [
+                (np.ones(S, dtype=bool), int(demand[d, t]), "C2_staffing", None)
+            ]
+            for mask, required, constraint, label in targets:
+                have = int((in_slot & mask).sum())
+                if have >= required:
+                    continue
+                cand = np.nonzero(ok & mask & ~in_slot)[0]
+                deficit = np.maximum(min_days[cand] - week_count[cand, w], 0)
+                order = np.lexsort((
+                    cand, left_run[cand], total[cand], -deficit, ~preferred[cand, d, t],
+                ))
+                chosen = cand[order[: required - have]]
+                slot_of[chosen, d] = t
+                in_slot[chosen] = True
+                week_count[chosen, w] += 1
+                total[chosen] += 1
+                day_ok[chosen] = False
+                if have + len(chosen) < required:
+                    uncovered.append({
+                        "date": dates[d].isoformat(),
+                        "shift_slot_id": slots[t].id,
+                        "constraint": constraint,
+                        "label": label,
+                        "required": required,
+                        "assigned": have + len(chosen),
+                    })
+
+    s_idx, d_idx = np.nonzero((slot_of >= 0) & ~pinned_days)
+    assignments = [
+        {
+            "staff_id": staff_list[i].id,
+            "date": dates[j].isoformat(),
+            "shift_slot_id": slots[slot_of[i, j]].id,
+        }
+        for i, j in zip(s_idx, d_idx)
+    ]
+
+    diagnostics = []
+    slot_names = {t.id: t.name for t in slots}
+    for constraint, title in _UNCOVERED_LABELS.items():
+        items = [u for u in uncovered if u["constraint"] == constraint]
+        if not items:
+            continue
+        diagnostics.append(DiagnosticItem(
+            constraint=constraint,
+            severity="warning",
+            message=f"下書きで{title}を満たせなかった枠が {len(items)} 件あります。",
+            details=[
+                f"{u['date']} {slot_names[u['shift_slot_id']]}"
+                + (f"（{u['label']}）" if u["label"] else "")
+                + f": {u['assigned']}/{u['required']}人"
+                for u in items
+            ],
+        ))
+
+    message = (
+        "下書きシフトを作成しました。"
+        if not uncovered
+        else f"下書きシフトを作成しました（不足している枠が {len(uncovered)} 件あります）。"
+    )
+    return {
+        "status": "draft",
+        "message": message,
+        "assignments": assignments,
+        "diagnostics": diagnostics,
+        "uncovered": uncovered,
+    }
@@ -0,0 +1,239 @@
+import threading
+import time
+from dataclasses import asdict, replace
+from datetime import date, timedelta
+
+import numpy as np
+
+from backend.domain import (
+    RoleStaffingRequirement,
+    ScheduleAssignment,
+    SchedulePeriod,
+    ShiftSlot,
+    SkillRequirement,
+    SolverConfig,
+    Staff,
+    StaffingRequirement,
+    StaffRequest,
+    StaffSkill,
+)
+from backend.optimizer.backends import ProgressCallback, solve_with_highs
+from backend.optimizer.draft import draft_schedule
+from backend.optimizer.metrics import span
+from backend.optimizer.solver import (
+    ScheduleModel,
+    _assignment_cells,
+    _build_model,
+    _default_config,
+    _solver_params,
+)
+
+# 1回の部分問題に使う秒数の上限
+_LNS_ITERATION_SECONDS = 5.0
+# 改善しない反復がこの回数続いたら打ち切る
+_LNS_PATIENCE = 30
+# 初期解が作れなかったときに、全体の MIP で初期解を探すのに使う時間の割合
+_LNS_BOOTSTRAP_SHARE = 0.3
+# 週ウィンドウ近傍の日数
+_LNS_WINDOW_DAYS = 7
+# ランダムなスタッフ部分集合近傍の人数（全体に対する割合と上限）
+_LNS_STAFF_SHARE = 0.1
+_LNS_STAFF_MAX = 50
+
+
+def _pick_neighborhood(
+    kind: str, rng: np.random.Generator, staff_list: list[Staff], num_days: int,
+) -> tuple[np.ndarray, str]:
+    """(S, D) の解放セルと、近傍の説明を返す"""
+    S = len(staff_list)
+    free = np.zeros((S, num_days), dtype=bool)
+    if kind == "week":
+        first = int(rng.integers(0, max(num_days - _LNS_WINDOW_DAYS, 0) + 1))
+        free[:, first:first + _LNS_WINDOW_DAYS] = True
+        return free, f"week:{first}"
+    if kind == "role":
+        roles = sorted({s.role for s in staff_list})
+        role = roles[int(rng.integers(0, len(roles)))]
+        free[[i for i, s in enumerate(staff_list) if s.role == role], :] = True
+        return free, f"role:{role}"
+    k = min(max(2, int(S * _LNS_STAFF_SHARE)), _LNS_STAFF_MAX, S)
+    free[rng.choice(S, size=k, replace=False), :] = True
+    return free, f"staff:{k}"
+
+
+def _complete_start(
+    built: ScheduleModel, cells: np.ndarray, time_limit: float, params,
+) -> np.ndarray | None:
+    """x をすべて cells に固定して残りの連続変数を決め、全列の初期解にする"""
+    model = built.model
+    exists = built.x >= 0
+    lower, upper = model.col_lower.copy(), model.col_upper.copy()
+    lower[built.x[exists]] = upper[built.x[exists]] = cells[exists]
+    outcome = solve_with_highs(
+        replace(model, col_lower=lower, col_upper=upper), time_limit, params=params,
+    )
+    if outcome.status not in ("optimal", "feasible"):
+        return None
+    return outcome.col_values
+
+
+def improve_schedule(
+    period: SchedulePeriod,
+    staff_list: list[Staff],
+    slots: list[ShiftSlot],
+    requirements: list[StaffingRequirement],
+    requests: list[StaffRequest],
+    config: SolverConfig | None = None,
+    role_requirements: list[RoleStaffingRequirement] | None = None,
+    prefix_assignments: dict[int, list] | None = None,
+    staff_skills: list[StaffSkill] | None = None,
+    skill_requirements: list[SkillRequirement] | None = None,
+    initial_assignments: list[ScheduleAssignment] | None = None,
+    fixed_assignments: list[ScheduleAssignment] | None = None,
+    progress_callback: ProgressCallback | None = None,
+    stop_event: threading.Event | None = None,
+    max_iterations: int | None = None,
+) -> dict:
+    """大規模近傍探索（LNS）で実行可能なシフトを改善する
+
+    solve_schedule と同じ行列モデルを1度だけ組み立て、近傍（1週間のウィンドウ・
+    1ロール・ランダムなスタッフ集合）の外側の x を現在の解に固定した部分問題を
+    HiGHS で繰り返し解く。目的値は厳密解と同じモデルのものなので比較できる。
+    初期解は initial_assignments、なければ貪欲法の下書きを使い、どちらも制約を
+    満たさない場合は全体の MIP で最初の実行可能解を探す。
+    最適性は証明しないため、解が得られたときの status は "feasible" になる。
+    """
+    started = time.perf_counter()
+    if config is None:
+        config = _default_config()
+    role_requirements = role_requirements or []
+    # 順序制約は近傍の外を固定すると初期解と矛盾しやすいので LNS では使わない
+    config = replace(config, enable_symmetry_breaking=False)
+    num_days = (period.end_date - period.start_date).days + 1
+    dates = [period.start_date + timedelta(days=i) for i in range(num_days)]
+    req_map = {(r.shift_slot_id, r.day_type): r.min_count for r in requirements}
+    with span("build_model"):
+        built = _build_model(
+            dates, staff_list, slots, req_map, requests, config, role_requirements,
+            prefix_assignments, staff_skills, skill_requirements, fixed_assignments,
+        )
+    model = built.model
+    params = _solver_params(config)
+    rng = np.random.default_rng(config.random_seed)
+
+    def remaining() -> float:
+        return config.time_limit - (time.perf_counter() - started)
+
+    # --- 初期解 ---
+    start_source = "initial_assignments"
+    if initial_assignments:
+        seeds = initial_assignments
+    else:
+        start_source = "draft"
+        draft = draft_schedule(
+            period, staff_list, slots, requirements, requests, config,
+            role_requirements, prefix_assignments, staff_skills, skill_requirements,
+            fixed_assignments,
+        )
+        seeds = [
+            ScheduleAssignment(
+                id=0, period_id=period.id, staff_id=a["staff_id"],
+                date=date.fromisoformat(a["date"]), shift_slot_id=a["shift_slot_id"],
+            )
+            for a in draft["assignments"]
+        ]
+    cells = _assignment_cells(seeds, staff_list, dates, slots)
+    incumbent = None
+    if model.start_is_feasible(*built.start_from(cells)):
+        incumbent = _complete_start(built, cells, max(remaining(), 1.0), params)
+    if incumbent is None:
+        start_source = "mip"
+        outcome = solve_with_highs(
+            model, max(config.time_limit * _LNS_BOOTSTRAP_SHARE, 1.0),
+            stop=stop_event, params=params,
+        )
+        if outcome.status not in ("optimal", "feasible"):
+            return {
+                "status": outcome.status,
+                "message": "改善の起点になる実行可能なシフトが見つかりませんでした。通常の最適化で原因を診断してください。",
+                "assignments": [],
+                "diagnostics": [],
+                "model_stats": built.stats(),
+                "solver_params": asdict(params),
+            }
+        incumbent = outcome.col_values
+    best = float(model.col_cost @ incumbent + model.offset)
+    initial_objective = best
+
+    # --- 近傍を解放して部分問題を解き直す ---
+    kinds = ["week", "staff"]
+    if len({s.role for s in staff_list}) > 1:
+        kinds.insert(1, "role")
+    exists = built.x >= 0
+    history = [{
+        "elapsed": round(time.perf_counter() - started, 3),
+        "objective": best, "neighborhood": start_source, "improved": True,
+    }]
+    iterations = stale = 0
+    with span("improve"):
+        while (
+            remaining() > 0
+            and stale < _LNS_PATIENCE
+            and (max_iterations is None or iterations < max_iterations)
+            and not (stop_event is not None and stop_event.is_set())
+        ):
+            free, label = _pick_neighborhood(
+                kinds[iterations % len(kinds)], rng, staff_list, num_days,
+            )
+            fixed_cols = built.x[exists & ~free[:, :, None]]
+            lower, upper = model.col_lower.copy(), model.col_upper.copy()
+            lower[fixed_cols] = upper[fixed_cols] = np.round(incumbent[fixed_cols])
+            outcome = solve_with_highs(
+                replace(model, col_lower=lower, col_upper=upper),
+                min(_LNS_ITERATION_SECONDS, max(remaining(), 0.1)),
+                start=(np.arange(model.num_col), incumbent), stop=stop_event, params=params,
+            )
+            iterations += 1
+            improved = (
+                outcome.status in ("optimal", "feasible")
+                and outcome.objective < best - 1e-6
+            )
+            if improved:
+                incumbent, best, stale = outcome.col_values, outcome.objective, 0
+            else:
+                stale += 1
+            history.append({
+                "elapsed": round(time.perf_counter() - started, 3),
+                "objective": best, "neighborhood": label, "improved": improved,
+            })
+            if improved and progress_callback is not None:
+                progress_callback({
+                    "elapsed": history[-1]["elapsed"], "objective": best,
+                    "bound": None, "gap": None,
+                })
+
+    s_idx, d_idx, t_idx = np.nonzero(built.selected(incumbent))
+    assignments = [
+        {
+            "staff_id": staff_list[i].id,
+            "date": dates[j].isoformat(),
+            "shift_slot_id": slots[k].id,
+        }
+        for i, j, k in zip(s_idx, d_idx, t_idx)
+    ]
+    return {
+        "status": "feasible",
+        "message": f"近傍探索でシフトを改善しました（目的値 {initial_objective:g} → {best:g}）。",
+        "assignments": assignments,
+        "diagnostics": [],
+        "objective": best,
+        "model_stats": built.stats(),
+        "solver_params": asdict(params),
+        "lns": {
+            "start": start_source,
+            "iterations": iterations,
+            "improvements": sum(h["improved"] for h in history[1:]),
+            "initial_objective": initial_objective,
+            "history": history,
+        },
+    }
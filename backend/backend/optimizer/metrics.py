@@ -0,0 +1,75 @@
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+
+
+@dataclass
+class Metrics:
+    """処理フェーズごとの経過時間を集計する軽量なスパン記録
+
+    スパンは入れ子の名前を "/" でつないだパス（例: "optimize/build_model"）で集計し、
+    同じパスが繰り返されたら（ローリングホライズンのウィンドウなど）秒数と回数を足す。
+    """
+    _spans: dict[str, list] = field(default_factory=dict)  # パス → [秒数, 回数]
+    _stack: list[str] = field(default_factory=list)
+
+    @contextmanager
+    def span(self, name: str) -> Iterator[None]:
+        path = "/".join([*self._stack, name])
+        self._stack.append(name)
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            self._add(path, time.perf_counter() - started, 1)
+
+    def merge(self, spans: list[dict], prefix: str | None = None) -> None:
+        """別プロセスで記録したスパン（report()["spans"]）を prefix の下に取り込む"""
+        for s in spans:
+            path = f"{prefix}/{s['name']}" if prefix else s["name"]
+            self._add(path, s["seconds"], s["count"])
+
+    def report(self) -> dict:
+        """記録順のスパン一覧と、最上位スパンの合計秒数"""
+        spans = [
+            {"name": name, "seconds": round(seconds, 4), "count": count}
+            for name, (seconds, count) in self._spans.items()
+        ]
+        total = sum(s["seconds"] for s in spans if "/" not in s["name"])
+        return {"total_seconds": round(total, 4), "spans": spans}
+
+    def _add(self, path: str, seconds: float, count: int) -> None:
+        entry = self._spans.setdefault(path, [0.0, 0])
+        entry[0] += seconds
+        entry[1] += count
+
+
+_active: ContextVar[Metrics | None] = ContextVar("optimizer_metrics", default=None)
+
+
+@contextmanager
+def collect(metrics: Metrics) -> Iterator[Metrics]:
+    """この文脈の中の span() を metrics に記録する"""
+    token = _active.set(metrics)
+    try:
+        yield metrics
+    finally:
+        _active.reset(token)
+
+
+def current_metrics() -> Metrics | None:
+    return _active.get()
+
+
+@contextmanager
+def span(name: str) -> Iterator[None]:
+    """記録中の Metrics があればスパンを測る（なければ何もしない）"""
+    metrics = _active.get()
+    if metrics is None:
+        yield
+        return
+    with metrics.span(name):
+        yield
@@ -0,0 +1,367 @@
+from bisect import bisect_right
+from dataclasses import dataclass, field, replace
+
+import numpy as np
+
+INF = float("inf")
+
+# add_rows の cols で使う番兵値
+ABSENT = -1  # 項なし（変数を作らなかったセル）
+FIXED_ONE = -2  # 値 1 に固定済みのセル。変数は作らず行の上下限から差し引く
+
+
+@dataclass
+class RowBlock:
+    """同じ制約ファミリー（staffing, consec など）に属する連続した行の集まり"""
+    family: str
+    start: int
+    keys: np.ndarray  # (行数, k) の整数キー。診断時に日付・スタッフへ逆引きする
+
+
+@dataclass
+class MipModel:
+    """HiGHS の passModel にそのまま渡せる行方向 CSR 形式の MIP モデル"""
+    col_cost: np.ndarray
+    col_lower: np.ndarray
+    col_upper: np.ndarray
+    integrality: np.ndarray
+    row_lower: np.ndarray
+    row_upper: np.ndarray
+    a_start: np.ndarray
+    a_index: np.ndarray
+    a_value: np.ndarray
+    offset: float = 0.0
+    blocks: list[RowBlock] = field(default_factory=list)
+    redundant_rows: int = 0  # 列の上下限だけで常に満たされるため追加しなかった行数
+
+    @property
+    def num_col(self) -> int:
+        return len(self.col_cost)
+
+    @property
+    def num_row(self) -> int:
+        return len(self.row_lower)
+
+    @property
+    def num_nz(self) -> int:
+        return len(self.a_index)
+
+    def row_block(self, row: int) -> tuple[RowBlock, int]:
+        """行番号から所属ブロックとブロック内の位置を返す"""
+        starts = [b.start for b in self.blocks]
+        block = self.blocks[bisect_right(starts, row) - 1]
+        return block, row - block.start
+
+    def start_is_feasible(
+        self, index: np.ndarray, values: np.ndarray, tol: float = 1e-6
+    ) -> bool:
+        """部分的な初期解が、値を与えた列だけから成る行をすべて満たすか判定する
+
+        値を与えていない列を含む行（公平性の z やスラックなど連続変数の行）は
+        ソルバー側で補完できるものとして判定対象外とする。
+        """
+        known = np.zeros(self.num_col, dtype=bool)
+        known[index] = True
+        full = np.zeros(self.num_col)
+        full[index] = values
+        if np.any(values < self.col_lower[index] - tol) or np.any(values > self.col_upper[index] + tol):
+            return False
+        row_of_nz = np.repeat(np.arange(self.num_row), np.diff(self.a_start))
+        unknown_rows = np.zeros(self.num_row, dtype=bool)
+        unknown_rows[row_of_nz[~known[self.a_index]]] = True
+        activity = np.bincount(
+            row_of_nz, weights=self.a_value * full[self.a_index], minlength=self.num_row
+        )
+        violated = (activity < self.row_lower - tol) | (activity > self.row_upper + tol)
+        return not np.any(violated & ~unknown_rows)
+
+    def family_counts(self) -> dict[str, int]:
+        """制約ファミリーごとの行数"""
+        counts: dict[str, int] = {}
+        for block, end in zip(self.blocks, self._block_ends()):
+            counts[block.family] = counts.get(block.family, 0) + end - block.start
+        return counts
+
+    def elastic(self, penalties: dict[str, float]) -> tuple["MipModel", np.ndarray, np.ndarray]:
+        """指定ファミリーの各行に非負スラック列を足した弾性モデルを返す
+
+        下限のある行には +s、上限のある行には -s を加え、元の目的関数の代わりに
+        ファミリーごとの重み × スラックの総和を最小化する。
+        戻り値は (弾性モデル, スラック列番号, 各スラックが属する行番号)。
+        """
+        weight = np.zeros(self.num_row)
+        for block, end in zip(self.blocks, self._block_ends()):
+            weight[block.start:end] = penalties.get(block.family, 0.0)
+        elastic_row = weight > 0
+        under = np.nonzero(elastic_row & np.isfinite(self.row_lower))[0]
+        over = np.nonzero(elastic_row & np.isfinite(self.row_upper))[0]
+        rows = np.concatenate([under, over])
+        signs = np.concatenate([np.ones(len(under)), -np.ones(len(over))])
+        order = np.argsort(rows, kind="stable")
+        rows, signs = rows[order], signs[order]
+        slack_cols = np.arange(self.num_col, self.num_col + len(rows), dtype=np.int64)
+
+        # 各行の末尾にスラック項を差し込む（同じ行への挿入は順序を保つ）
+        insert_at = self.a_start[rows + 1]
+        counts = np.diff(self.a_start) + np.bincount(rows, minlength=self.num_row)
+        a_start = np.zeros(self.num_row + 1, dtype=np.int32)
+        np.cumsum(counts, out=a_start[1:])
+        n = len(rows)
+        model = MipModel(
+            col_cost=np.concatenate([np.zeros(self.num_col), weight[rows]]),
+            col_lower=np.concatenate([self.col_lower, np.zeros(n)]),
+            col_upper=np.concatenate([self.col_upper, np.full(n, INF)]),
+            integrality=np.concatenate([self.integrality, np.zeros(n, dtype=np.int32)]),
+            row_lower=self.row_lower.copy(),
+            row_upper=self.row_upper.copy(),
+            a_start=a_start,
+            a_index=np.insert(self.a_index, insert_at, slack_cols).astype(np.int32),
+            a_value=np.insert(self.a_value, insert_at, signs),
+            blocks=list(self.blocks),
+            redundant_rows=self.redundant_rows,
+        )
+        return model, slack_cols, rows
+
+    def family_rows(self, families: set[str]) -> np.ndarray:
+        """指定ファミリーに属する行なら True の (行数,) 配列"""
+        mask = np.zeros(self.num_row, dtype=bool)
+        for block, end in zip(self.blocks, self._block_ends()):
+            if block.family in families:
+                mask[block.start:end] = True
+        return mask
+
+    def components(self, shared_rows: np.ndarray) -> tuple[np.ndarray, int]:
+        """shared_rows 以外の行でつながる列の連結成分を求める
+
+        戻り値は (列ごとの成分番号, 成分数)。shared_rows にしか現れない列
+        （公平性の z など複数の成分にまたがる列）とどの行にも現れない列は -1。
+        """
+        row_len = np.diff(self.a_start)
+        rows = np.nonzero(~shared_rows & (row_len > 0))[0]
+        lengths = row_len[rows]
+        cols = self.a_index[self._row_nz(rows)].astype(np.int64)
+        offsets = np.zeros(len(rows), dtype=np.int64)
+        np.cumsum(lengths[:-1], out=offsets[1:])
+
+        # 行内の最小ラベルを行の全列に広げ、ポインタジャンプで縮約する
+        labels = np.arange(self.num_col, dtype=np.int64)
+        while len(rows):
+            row_min = np.minimum.reduceat(labels[cols], offsets)
+            updated = labels.copy()
+            np.minimum.at(updated, cols, np.repeat(row_min, lengths))
+            updated = updated[updated]
+            while True:
+                jumped = updated[updated]
+                if np.array_equal(jumped, updated):
+                    break
+                updated = jumped
+            if np.array_equal(updated, labels):
+                break
+            labels = updated
+
+        in_rows = np.zeros(self.num_col, dtype=bool)
+        in_rows[cols] = True
+        roots, dense = np.unique(labels[in_rows], return_inverse=True)
+        result = np.full(self.num_col, -1, dtype=np.int64)
+        result[in_rows] = dense
+        return result, len(roots)
+
+    def subset(self, cols: np.ndarray, rows: np.ndarray) -> "MipModel":
+        """列 cols と行 rows（昇順）だけから成る部分モデル
+
+        部分モデルの列の順序は cols の順。rows のうち cols に含まれない列の項は落とす
+        （成分をまたぐ公平性の行を、その成分の列だけに絞るのに使う）。
+        """
+        col_map = np.full(self.num_col, -1, dtype=np.int64)
+        col_map[cols] = np.arange(len(cols))
+        nz = self._row_nz(rows)
+        inside = col_map[self.a_index[nz]] >= 0
+        row_of_nz = np.repeat(np.arange(len(rows)), np.diff(self.a_start)[rows])
+        nz = nz[inside]
+        row_len = np.bincount(row_of_nz[inside], minlength=len(rows))
+        a_start = np.zeros(len(rows) + 1, dtype=np.int32)
+        np.cumsum(row_len, out=a_start[1:])
+        return MipModel(
+            col_cost=self.col_cost[cols],
+            col_lower=self.col_lower[cols],
+            col_upper=self.col_upper[cols],
+            integrality=self.integrality[cols],
+            row_lower=self.row_lower[rows],
+            row_upper=self.row_upper[rows],
+            a_start=a_start,
+            a_index=col_map[self.a_index[nz]].astype(np.int32),
+            a_value=self.a_value[nz],
+        )
+
+    def with_fixed(self, cols: np.ndarray, values: np.ndarray) -> "MipModel":
+        """列 cols を values に固定したモデル（行列は共有する）"""
+        lower, upper = self.col_lower.copy(), self.col_upper.copy()
+        lower[cols] = upper[cols] = values
+        return replace(self, col_lower=lower, col_upper=upper)
+
+    def violated_rows(
+        self, col_values: np.ndarray, rows: np.ndarray, tol: float = 1e-6
+    ) -> np.ndarray:
+        """昇順の行番号 rows のうち、col_values で満たされない行を返す"""
+        nz = self._row_nz(rows)
+        row_of_nz = np.repeat(np.arange(len(rows)), np.diff(self.a_start)[rows])
+        activity = np.bincount(
+            row_of_nz, weights=self.a_value[nz] * col_values[self.a_index[nz]],
+            minlength=len(rows),
+        )
+        bad = (activity < self.row_lower[rows] - tol) | (activity > self.row_upper[rows] + tol)
+        return rows[bad]
+
+    def _row_nz(self, rows: np.ndarray) -> np.ndarray:
+        """昇順の行番号 rows に属する非ゼロ要素の位置（行順）"""
+        selected = np.zeros(self.num_row, dtype=bool)
+        selected[rows] = True
+        return np.nonzero(np.repeat(selected, np.diff(self.a_start)))[0]
+
+    def _block_ends(self) -> list[int]:
+        return [b.start for b in self.blocks[1:]] + [self.num_row]
+
+
+class ModelBuilder:
+    """列・行をブロック単位で NumPy 配列として積み上げ、最後に CSR へまとめる"""
+
+    def __init__(self):
+        self.offset = 0.0
+        self.redundant_rows = 0
+        self._num_col = 0
+        self._num_row = 0
+        self._cost: list[np.ndarray] = []
+        self._lower: list[np.ndarray] = []
+        self._upper: list[np.ndarray] = []
+        self._integrality: list[np.ndarray] = []
+        self._row_counts: list[np.ndarray] = []
+        self._row_index: list[np.ndarray] = []
+        self._row_value: list[np.ndarray] = []
+        self._row_lower: list[np.ndarray] = []
+        self._row_upper: list[np.ndarray] = []
+        self._blocks: list[RowBlock] = []
+
+    @property
+    def num_col(self) -> int:
+        return self._num_col
+
+    def add_cols(
+        self,
+        n: int,
+        cost=0.0,
+        lower=0.0,
+        upper=1.0,
+        integer: bool = True,
+    ) -> np.ndarray:
+        """n 本の列を追加し、その列番号を返す"""
+        ids = np.arange(self._num_col, self._num_col + n, dtype=np.int64)
+        self._cost.append(np.broadcast_to(np.asarray(cost, dtype=np.float64), (n,)).copy())
+        self._lower.append(np.broadcast_to(np.asarray(lower, dtype=np.float64), (n,)).copy())
+        self._upper.append(np.broadcast_to(np.asarray(upper, dtype=np.float64), (n,)).copy())
+        self._integrality.append(np.full(n, 1 if integer else 0, dtype=np.int32))
+        self._num_col += n
+        return ids
+
+    def add_rows(
+        self,
+        family: str,
+        cols,
+        lower=-INF,
+        upper=INF,
+        coefs=1.0,
+        keys=None,
+    ) -> None:
+        """1行につき cols の1行分の列を持つ制約をまとめて追加する
+
+        cols は (行数, k) の整数配列で、ABSENT(-1) は「その位置に項なし」、
+        FIXED_ONE(-2) は「値 1 の定数項」を表す（定数分は上下限から差し引く）。
+        行ごとに長さが異なる場合は 1 次元配列のリストも受け付ける。
+        列の上下限だけで常に満たされる行（項がすべて欠けた行など）は追加しない。
+        """
+        if isinstance(cols, list):
+            cols, coefs = _pad_ragged(cols, coefs)
+        cols = np.asarray(cols, dtype=np.int64)
+        if cols.ndim == 1:
+            cols = cols[:, None]
+        n = cols.shape[0]
+        if n == 0:
+            return
+        coefs = np.broadcast_to(np.asarray(coefs, dtype=np.float64), cols.shape)
+        lower = np.broadcast_to(np.asarray(lower, dtype=np.float64), (n,))
+        upper = np.broadcast_to(np.asarray(upper, dtype=np.float64), (n,))
+        if keys is None:
+            keys = np.arange(n)
+        keys = np.asarray(keys, dtype=np.int64)
+        if keys.ndim == 1:
+            keys = keys[:, None]
+
+        constant = np.where(cols == FIXED_ONE, coefs, 0.0).sum(axis=1)
+        if np.any(constant):
+            lower = lower - constant
+            upper = upper - constant
+
+        mask = cols >= 0
+        act_min, act_max = self._activity_bounds(cols, coefs, mask)
+        keep = (act_min < lower) | (act_max > upper)
+        self.redundant_rows += int(n - keep.sum())
+        if not keep.any():
+            return
+        cols, coefs, mask = cols[keep], coefs[keep], mask[keep]
+
+        self._row_counts.append(mask.sum(axis=1))
+        self._row_index.append(cols[mask])
+        self._row_value.append(coefs[mask])
+        self._row_lower.append(lower[keep].copy())
+        self._row_upper.append(upper[keep].copy())
+        self._blocks.append(RowBlock(family=family, start=self._num_row, keys=keys[keep]))
+        self._num_row += int(keep.sum())
+
+    def _activity_bounds(
+        self, cols: np.ndarray, coefs: np.ndarray, mask: np.ndarray
+    ) -> tuple[np.ndarray, np.ndarray]:
+        """列の上下限から各行の取りうる値の範囲を求める"""
+        col_lower = _concat(self._lower, np.float64)
+        col_upper = _concat(self._upper, np.float64)
+        safe = np.where(mask, cols, 0)
+        with np.errstate(invalid="ignore"):
+            lo = np.where(mask, coefs * col_lower[safe], 0.0)
+            hi = np.where(mask, coefs * col_upper[safe], 0.0)
+        lo, hi = np.minimum(lo, hi), np.maximum(lo, hi)
+        return lo.sum(axis=1), hi.sum(axis=1)
+
+    def build(self) -> MipModel:
+        counts = _concat(self._row_counts, np.int64)
+        a_start = np.zeros(len(counts) + 1, dtype=np.int32)
+        np.cumsum(counts, out=a_start[1:])
+        return MipModel(
+            col_cost=_concat(self._cost, np.float64),
+            col_lower=_concat(self._lower, np.float64),
+            col_upper=_concat(self._upper, np.float64),
+            integrality=_concat(self._integrality, np.int32),
+            row_lower=_concat(self._row_lower, np.float64),
+            row_upper=_concat(self._row_upper, np.float64),
+            a_start=a_start,
+            a_index=_concat(self._row_index, np.int32),
+            a_value=_concat(self._row_value, np.float64),
+            offset=float(self.offset),
+            blocks=list(self._blocks),
+            redundant_rows=self.redundant_rows,
+        )
+
+
+def _concat(parts: list[np.ndarray], dtype) -> np.ndarray:
+    if not parts:
+        return np.zeros(0, dtype=dtype)
+    return np.concatenate(parts).astype(dtype, copy=False)
+
+
+def _pad_ragged(rows: list, coefs) -> tuple[np.ndarray, np.ndarray]:
+    """長さの異なる列リストを ABSENT 埋めの矩形配列にそろえる"""
+    width = max((len(r) for r in rows), default=0)
+    cols = np.full((len(rows), width), ABSENT, dtype=np.int64)
+    values = np.zeros((len(rows), width), dtype=np.float64)
+    coef_rows = coefs if isinstance(coefs, list) else [coefs] * len(rows)
+    for i, (r, c) in enumerate(zip(rows, coef_rows)):
+        cols[i, : len(r)] = r
+        values[i, : len(r)] = c
+    return cols, values
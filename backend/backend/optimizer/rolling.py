@@ -0,0 +1,175 @@
+import math
+import threading
+import time
+from dataclasses import replace
+from datetime import date, timedelta
+
+from backend.domain import (
+    RoleStaffingRequirement,
+    ScheduleAssignment,
+    SchedulePeriod,
+    ShiftSlot,
+    SkillRequirement,
+    SolverConfig,
+    Staff,
+    StaffingRequirement,
+    StaffRequest,
+    StaffSkill,
+)
+from backend.optimizer.solver import _default_config, solve_schedule
+
+DEFAULT_WINDOW_DAYS = 14
+DEFAULT_COMMIT_DAYS = 7
+# 全体の制限時間を分けたときの、1ウィンドウあたりの制限時間の下限（秒）
+_MIN_WINDOW_SECONDS = 1.0
+
+
+def _window_end(commit_start: date, commit_end: date, window_days: int, last: date) -> date:
+    """ウィンドウの末尾。週の途中で切れないよう、確定範囲を越える日曜があればそこで止める"""
+    end = min(commit_start + timedelta(days=window_days - 1), last)
+    if end == last:
+        return end
+    sunday = end - timedelta(days=(end.weekday() + 1) % 7)
+    return sunday if sunday >= commit_end else end
+
+
+def _windows(
+    start: date, last: date, window_days: int, commit_days: int,
+) -> list[tuple[date, date, date, date]]:
+    """(ウィンドウ先頭, 確定開始, 確定末尾, ウィンドウ末尾) の列。境界は日付だけで決まる"""
+    windows = []
+    commit_start = start
+    while commit_start <= last:
+        commit_end = min(commit_start + timedelta(days=commit_days - 1), last)
+        # 週勤務上限を週単位で数えるため、ウィンドウは週の月曜まで遡って始める
+        win_start = max(start, commit_start - timedelta(days=commit_start.weekday()))
+        win_end = _window_end(commit_start, commit_end, window_days, last)
+        if win_end == last:
+            commit_end = win_end  # 最後のウィンドウは全部確定する
+        windows.append((win_start, commit_start, commit_end, win_end))
+        commit_start = commit_end + timedelta(days=1)
+    return windows
+
+
+def solve_rolling_horizon(
+    period: SchedulePeriod,
+    staff_list: list[Staff],
+    slots: list[ShiftSlot],
+    requirements: list[StaffingRequirement],
+    requests: list[StaffRequest],
+    config: SolverConfig | None = None,
+    role_requirements: list[RoleStaffingRequirement] | None = None,
+    prefix_assignments: dict[int, list] | None = None,
+    staff_skills: list[StaffSkill] | None = None,
+    skill_requirements: list[SkillRequirement] | None = None,
+    initial_assignments: list[ScheduleAssignment] | None = None,
+    fixed_assignments: list[ScheduleAssignment] | None = None,
+    stop_event: threading.Event | None = None,
+    window_days: int = DEFAULT_WINDOW_DAYS,
+    commit_days: int = DEFAULT_COMMIT_DAYS,
+) -> dict:
+    """長い期間を重なりのあるウィンドウに分けて順に解き、1つの割り当てにつなぐ
+
+    各ウィンドウ（既定 14 日）を solve_schedule で解き、先頭 commit_days 日
+    （既定 7 日）だけを確定して次のウィンドウへ進む。確定済みの勤務は
+    - ウィンドウより前の日: prefix_assignments として渡し、連勤を引き継ぐ
+    - ウィンドウと同じ週の日: 手動確定（fixed_assignments）として渡し、週勤務上限・
+      最低勤務日数を週単位のまま数える（ウィンドウは週の月曜まで遡って始める）
+    ことで境界をまたぐ制約を守る。制限時間は全体で config.time_limit とし、
+    残り時間を残りのウィンドウ数で等分する（1ウィンドウあたり最低 1 秒）。
+    公平性などの目的関数はウィンドウ内でのみ最適化されるため、status は常に
+    "feasible"（いずれかのウィンドウが解けなければそのウィンドウの結果）になる。
+    """
+    if config is None:
+        config = _default_config()
+    if not 1 <= commit_days <= window_days:
+        raise ValueError("commit_days must be between 1 and window_days")
+
+    staff_ids = [s.id for s in staff_list]
+    # 確定済みの勤務 (staff_id, date) → shift_slot_id（手動確定・ソルバー決定の両方）
+    committed: dict[tuple[int, date], int] = {}
+    committed_days: set[date] = set()
+    user_fixed = fixed_assignments or []
+    assignments: list[dict] = []
+    windows: list[dict] = []
+    started = time.perf_counter()
+
+    def report() -> dict:
+        return {
+            "window_days": window_days,
+            "commit_days": commit_days,
+            "windows": windows,
+            "solve_seconds": round(time.perf_counter() - started, 3),
+        }
+
+    plan = _windows(period.start_date, period.end_date, window_days, commit_days)
+    for index, (win_start, commit_start, commit_end, win_end) in enumerate(plan):
+        remaining = config.time_limit - (time.perf_counter() - started)
+        share = math.floor(remaining / (len(plan) - index) * 10) / 10
+        window_limit = max(share, _MIN_WINDOW_SECONDS)
+
+        # ウィンドウ前の確定勤務は prefix に、同じ週の確定日は手動確定として渡す
+        prefix = {sid: list(days) for sid, days in (prefix_assignments or {}).items()}
+        for sid, d in committed:
+            if d < win_start:
+                prefix.setdefault(sid, []).append(d)
+        pinned = [
+            ScheduleAssignment(
+                id=0, period_id=period.id, staff_id=sid, date=d,
+                shift_slot_id=committed.get((sid, d)),
+            )
+            for d in sorted(committed_days) if win_start <= d
+            for sid in staff_ids
+        ]
+        pinned += [a for a in user_fixed if commit_start <= a.date <= win_end]
+        initial = [
+            a for a in initial_assignments or [] if commit_start <= a.date <= win_end
+        ]
+
+        result = solve_schedule(
+            SchedulePeriod(id=period.id, start_date=win_start, end_date=win_end),
+            staff_list, slots, requirements, requests,
+            config=replace(config, time_limit=window_limit),
+            role_requirements=role_requirements,
+            prefix_assignments=prefix or None,
+            staff_skills=staff_skills,
+            skill_requirements=skill_requirements,
+            initial_assignments=initial or None,
+            fixed_assignments=pinned or None,
+            stop_event=stop_event,
+        )
+        windows.append({
+            "start": win_start.isoformat(),
+            "end": win_end.isoformat(),
+            "commit_end": commit_end.isoformat(),
+            "status": result["status"],
+            "objective": result.get("objective"),
+            "time_limit": window_limit,
+        })
+        if result["status"] not in ("optimal", "feasible"):
+            result["message"] = (
+                f"{win_start.isoformat()}〜{win_end.isoformat()} のウィンドウで"
+                f"シフトが決まりませんでした。{result['message']}"
+            )
+            result["rolling"] = report()
+            return result
+
+        for a in result["assignments"]:
+            d = date.fromisoformat(a["date"])
+            if commit_start <= d <= commit_end:
+                assignments.append(a)
+                committed[(a["staff_id"], d)] = a["shift_slot_id"]
+        for a in user_fixed:
+            if commit_start <= a.date <= commit_end and a.shift_slot_id is not None:
+                committed[(a.staff_id, a.date)] = a.shift_slot_id
+        committed_days.update(
+            commit_start + timedelta(days=i) for i in range((commit_end - commit_start).days + 1)
+        )
+
+    return {
+        "status": "feasible",
+        "message": f"期間を {len(windows)} 個のウィンドウに分けてシフトを作成しました。",
+        "assignments": assignments,
+        "diagnostics": [],
+        "rolling": report(),
+    }
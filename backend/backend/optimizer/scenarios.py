@@ -0,0 +1,239 @@
+import itertools
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import replace
+from datetime import date, timedelta
+
+import numpy as np
+
+from backend.domain import RoleStaffingRequirement, ScheduleAssignment, StaffingRequirement
+from backend.optimizer.backends import own_highs_scheduler
+from backend.optimizer.solver import _build_preferred_map, _get_day_type, solve_schedule
+
+
+def solve_scenarios(
+    solve_kwargs: dict, scenarios: list[dict], max_workers: int | None = None,
+) -> list[dict]:
+    """設定・必要人数を差し替えた複数のシナリオをプロセスプールで並列に解いて比べる
+
+    scenarios の各要素は name と、任意で config（SolverConfig の上書きする項目）、
+    requirements / role_requirements（(枠, 曜日区分[, ロール]) ごとの min_count の
+    上書き。該当がなければ追加）を持つ。DB の設定や割り当ては変更しない。
+    返すのはシナリオごとの目的値・必要人数の不足・勤務日数の差・かなえた希望の件数・
+    求解秒数。
+    """
+    variants = [_apply_overrides(solve_kwargs, s) for s in scenarios]
+    workers = min(len(variants), max_workers or os.cpu_count() or 1)
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+        initializer=own_highs_scheduler,
+    ) as pool:
+        futures = [pool.submit(_solve_scenario, v) for v in variants]
+        rows = []
+        for scenario, variant, future in zip(scenarios, variants, futures):
+            try:
+                result, seconds = future.result()
+            except Exception as e:
+                result = {"status": "error", "message": f"{type(e).__name__}: {e}"}
+                seconds = None
+            rows.append({"name": scenario["name"], **_summarize(variant, result, seconds)})
+    return rows
+
+
+WEIGHT_FIELDS = (
+    "weight_preferred",
+    "weight_fairness",
+    "weight_weekend_fairness",
+    "weight_soft_staffing",
+)
+
+
+def weight_points(
+    grid: dict[str, list[float]], random_samples: int = 0, seed: int = 0,
+) -> list[dict[str, float]]:
+    """重みの組を作る。random_samples が 0 なら grid の直積、正なら各重みの
+    [最小, 最大] から一様に random_samples 個を取る（grid にない重みは現在の設定のまま）
+    """
+    names = [n for n in WEIGHT_FIELDS if grid.get(n)]
+    if random_samples <= 0:
+        return [dict(zip(names, values)) for values in itertools.product(*(grid[n] for n in names))]
+    rng = np.random.default_rng(seed)
+    return [
+        {n: round(float(rng.uniform(min(grid[n]), max(grid[n]))), 3) for n in names}
+        for _ in range(random_samples)
+    ]
+
+
+def sweep_weights(
+    solve_kwargs: dict, points: list[dict[str, float]], max_workers: int | None = None,
+) -> list[dict]:
+    """重みの組ごとに解き、かなえた希望・勤務日数の差・必要人数の不足で比べる
+
+    重みの組を辞書順に並べて並列度と同じ数の連続した区間に分け、各プロセスは区間を
+    順に解きながら直前の点（隣の重み）の解を次の点の初期解に渡す。
+    各点には非劣解（希望が多く、差と不足が小さい方向で他の点に支配されない）かどうかを
+    pareto に入れて、入力の順に返す。
+    """
+    order = sorted(range(len(points)), key=lambda i: [points[i].get(n, 0.0) for n in WEIGHT_FIELDS])
+    workers = min(len(points), max_workers or os.cpu_count() or 1)
+    chains = [[int(i) for i in c] for c in np.array_split(order, workers) if len(c)]
+    config = solve_kwargs["config"]
+    rows: list[dict | None] = [None] * len(points)
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+        initializer=own_highs_scheduler,
+    ) as pool:
+        futures = [
+            pool.submit(_solve_chain, solve_kwargs, [replace(config, **points[i]) for i in chain])
+            for chain in chains
+        ]
+        for chain, future in zip(chains, futures):
+            try:
+                outcomes = future.result()
+            except Exception as e:
+                error = {"status": "error", "message": f"{type(e).__name__}: {e}"}
+                outcomes = [(error, None)] * len(chain)
+            for i, (result, seconds) in zip(chain, outcomes):
+                weights = {n: points[i].get(n, getattr(config, n)) for n in WEIGHT_FIELDS}
+                rows[i] = {
+                    "weights": weights,
+                    **_summarize(solve_kwargs, result, seconds),
+                    "warm_started": bool((result.get("warm_start") or {}).get("accepted")),
+                }
+    _mark_pareto(rows)
+    return rows
+
+
+def _solve_chain(solve_kwargs: dict, configs: list) -> list[tuple[dict, float]]:
+    """隣り合う重みの点を順に解き、解けた点の割り当てを次の点の初期解にする（プロセスプール用）"""
+    outcomes = []
+    initial = solve_kwargs.get("initial_assignments")
+    for config in configs:
+        result, seconds = _solve_scenario({**solve_kwargs, "config": config, "initial_assignments": initial})
+        if result["status"] in ("optimal", "feasible"):
+            period_id = solve_kwargs["period"].id
+            initial = [
+                ScheduleAssignment(
+                    id=0, period_id=period_id, staff_id=a["staff_id"],
+                    date=date.fromisoformat(a["date"]), shift_slot_id=a["shift_slot_id"],
+                )
+                for a in result["assignments"]
+            ]
+        outcomes.append((result, seconds))
+    return outcomes
+
+
+def _mark_pareto(rows: list[dict]) -> None:
+    """解けた点のうち他の点に支配されないものの pareto を True にする"""
+    solved = [r for r in rows if r["status"] in ("optimal", "feasible")]
+    # すべて小さいほど良い向きにそろえる
+    keys = np.array(
+        [[-r["preferences_satisfied"], r["fairness_spread"] or 0, r["shortfall"]] for r in solved],
+        dtype=np.int64,
+    ).reshape(len(solved), 3)
+    for r in rows:
+        r["pareto"] = False
+    for i, r in enumerate(solved):
+        dominated = ((keys <= keys[i]).all(axis=1) & (keys < keys[i]).any(axis=1)).any()
+        r["pareto"] = not dominated
+
+
+def _solve_scenario(solve_kwargs: dict) -> tuple[dict, float]:
+    """1シナリオを解き、結果と所要秒数を返す（プロセスプール用）
+
+    プールの中からさらにレースのプロセスを起こさない（別のプロセスグループになり、
+    ジョブのキャンセルで止められない）。
+    """
+    started = time.perf_counter()
+    config = replace(solve_kwargs["config"], enable_solver_race=False)
+    result = solve_schedule(**{**solve_kwargs, "config": config}, _skip_diagnostics=True)
+    return result, time.perf_counter() - started
+
+
+def _apply_overrides(solve_kwargs: dict, scenario: dict) -> dict:
+    kwargs = dict(solve_kwargs)
+    kwargs["config"] = replace(solve_kwargs["config"], **scenario.get("config", {}))
+    kwargs["requirements"] = _override_requirements(
+        solve_kwargs["requirements"], scenario.get("requirements", []),
+        StaffingRequirement, ("shift_slot_id", "day_type"),
+    )
+    kwargs["role_requirements"] = _override_requirements(
+        solve_kwargs.get("role_requirements") or [], scenario.get("role_requirements", []),
+        RoleStaffingRequirement, ("shift_slot_id", "day_type", "role"),
+    )
+    return kwargs
+
+
+def _override_requirements(current: list, overrides: list[dict], cls, key: tuple) -> list:
+    by_key = {tuple(getattr(r, k) for k in key): r for r in current}
+    for o in overrides:
+        k = tuple(o[name] for name in key)
+        if k in by_key:
+            by_key[k] = replace(by_key[k], min_count=o["min_count"])
+        else:
+            by_key[k] = cls(id=0, **o)
+    return list(by_key.values())
+
+
+def _summarize(solve_kwargs: dict, result: dict, seconds: float | None) -> dict:
+    row = {
+        "status": result["status"],
+        "message": result["message"],
+        "objective": result.get("objective"),
+        "shortfall": None,
+        "fairness_spread": None,
+        "preferences_satisfied": None,
+        "solve_seconds": round(seconds, 3) if seconds is not None else None,
+    }
+    if result["status"] in ("optimal", "feasible"):
+        row.update(_outcome_metrics(solve_kwargs, result["assignments"]))
+    return row
+
+
+def _outcome_metrics(solve_kwargs: dict, assignments: list[dict]) -> dict:
+    """必要人数に足りない人数の合計・スタッフの勤務日数の最大と最小の差・
+    かなえた勤務希望（preferred）の件数
+
+    手動確定（fixed_assignments）の勤務も数える。
+    """
+    period = solve_kwargs["period"]
+    staff_list = solve_kwargs["staff_list"]
+    slots = solve_kwargs["slots"]
+    num_days = (period.end_date - period.start_date).days + 1
+    dates = [period.start_date + timedelta(days=i) for i in range(num_days)]
+    day_of = {d: i for i, d in enumerate(dates)}
+    slot_of = {s.id: t for t, s in enumerate(slots)}
+    staff_of = {s.id: i for i, s in enumerate(staff_list)}
+
+    cells = [(a["staff_id"], date.fromisoformat(a["date"]), a["shift_slot_id"]) for a in assignments]
+    cells += [
+        (a.staff_id, a.date, a.shift_slot_id)
+        for a in solve_kwargs.get("fixed_assignments") or []
+        if a.shift_slot_id is not None
+    ]
+    working = {(staff_id, d): slot_id for staff_id, d, slot_id in cells}
+    staffed = np.zeros((len(dates), len(slots)), dtype=np.int64)
+    worked = np.zeros(len(staff_list), dtype=np.int64)
+    for staff_id, d, slot_id in cells:
+        if d in day_of and slot_id in slot_of:
+            staffed[day_of[d], slot_of[slot_id]] += 1
+        if staff_id in staff_of:
+            worked[staff_of[staff_id]] += 1
+
+    req_map = {(r.shift_slot_id, r.day_type): r.min_count for r in solve_kwargs["requirements"]}
+    required = np.array(
+        [[req_map.get((s.id, _get_day_type(d)), 0) for s in slots] for d in dates],
+        dtype=np.int64,
+    ).reshape(len(dates), len(slots))
+    satisfied = sum(
+        1
+        for (staff_id, d, slot_id) in _build_preferred_map(solve_kwargs["requests"])
+        if (staff_id, d) in working and slot_id in (None, working[staff_id, d])
+    )
+    return {
+        "shortfall": int(np.maximum(required - staffed, 0).sum()),
+        "fairness_spread": int(worked.max() - worked.min()) if len(worked) else None,
+        "preferences_satisfied": satisfied,
+    }
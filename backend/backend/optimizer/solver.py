@@ -1,12 +1,20 @@
+import multiprocessing
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FuturesTimeoutError, as_completed
 from copy import deepcopy
+from dataclasses import asdict, dataclass, field, replace
 from datetime import date, timedelta
 from collections import defaultdict
 
-from pulp import LpMinimize, LpProblem, LpVariable, lpSum, value
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
 
 from backend.domain import (
     DiagnosticItem,
     RoleStaffingRequirement,
+    ScheduleAssignment,
     SchedulePeriod,
     ShiftSlot,
     SkillRequirement,
@@ -16,6 +24,37 @@ from backend.domain import (
     StaffRequest,
     StaffSkill,
 )
+from backend.optimizer.backends import (
+    SOLVER_PROFILES,
+    MipStart,
+    ProgressCallback,
+    SolveOutcome,
+    SolverParams,
+    own_highs_scheduler,
+    race_model,
+    solve_model,
+)
+from backend.optimizer.metrics import span
+from backend.optimizer.model import ABSENT, FIXED_ONE, INF, MipModel, ModelBuilder
+
+# 制約緩和テストを並列に走らせるワーカー数の上限
+_DIAGNOSTIC_MAX_WORKERS = 4
+
+# 独立な部分問題への分割を試す最小の列数（小さいモデルはプロセス起動の方が高くつく）
+_DECOMPOSE_MIN_COLUMNS = 2000
+# 部分問題1つあたりの最小の列数。これより小さい成分は隣の成分とまとめて1つのプロセスで解く
+_DECOMPOSE_MIN_COMPONENT_COLUMNS = 500
+# 分割時に成分の求解に使う制限時間の割合（残りは解をまとめる LP に取っておく）
+_DECOMPOSE_COMPONENT_SHARE = 0.9
+# 成分をまたいで目的関数を結合する行ファミリー → 応答で知らせる目的項の名前
+_COUPLING_FAMILIES = {
+    "fairmax": "fairness",
+    "fairmin": "fairness",
+    "wfairmax": "weekend_fairness",
+    "wfairmin": "weekend_fairness",
+}
+# 遅延追加モードで最初は外し、解が違反したときだけ足す行ファミリー
+_LAZY_FAMILIES = {"interval", "revcycle"}
 
 
 def _get_day_type(d: date) -> str:
@@ -36,6 +75,21 @@ def _default_config() -> SolverConfig:
     )
 
 
+def _solver_params(config: SolverConfig) -> SolverParams:
+    """SolverConfig のプロファイルと個別設定からソルバーパラメータを決める"""
+    profile = config.solver_profile if config.solver_profile in SOLVER_PROFILES else "balanced"
+    defaults = SOLVER_PROFILES[profile]
+    return SolverParams(
+        profile=profile,
+        mip_rel_gap=(
+            config.mip_rel_gap if config.mip_rel_gap is not None else defaults["mip_rel_gap"]
+        ),
+        threads=config.solver_threads,
+        random_seed=config.random_seed,
+        heuristic_effort=defaults["heuristic_effort"],
+    )
+
+
 def _build_preferred_map(
     requests: list[StaffRequest],
 ) -> dict[tuple[int, date, int | None], bool]:
@@ -55,6 +109,35 @@ def _shifts_conflict(slot_a: ShiftSlot, slot_b: ShiftSlot, min_hours: int) -> bo
     return gap < min_hours * 60
 
 
+def _forbidden_pairs(slots: list[ShiftSlot], config: SolverConfig) -> np.ndarray:
+    """forbid[a, b]: d 日目に枠 a、d+1 日目に枠 b を入れてはいけない組"""
+    T = len(slots)
+    forbid = np.zeros((T, T), dtype=bool)
+    for a, t_a in enumerate(slots):
+        for b, t_b in enumerate(slots):
+            if config.enable_shift_interval and _shifts_conflict(
+                t_a, t_b, config.min_shift_interval_hours
+            ):
+                forbid[a, b] = True
+            if config.enable_reverse_cycle_prohibition and t_b.start_time < t_a.start_time:
+                forbid[a, b] = True
+    return forbid
+
+
+def _prefix_runs(
+    prefix_assignments: dict[int, list] | None, staff_list: list[Staff], first_day: date,
+) -> np.ndarray:
+    """期間初日の前日から遡って連続している勤務日数（スタッフごと）"""
+    runs = np.zeros(len(staff_list), dtype=np.int64)
+    for i, s in enumerate(staff_list):
+        worked = set((prefix_assignments or {}).get(s.id, []))
+        check_date = first_day - timedelta(days=1)
+        while check_date in worked:
+            runs[i] += 1
+            check_date -= timedelta(days=1)
+    return runs
+
+
 def _presolve_checks(
     dates: list[date],
     staff_list: list[Staff],
@@ -63,91 +146,294 @@ def _presolve_checks(
     requests: list[StaffRequest],
     config: SolverConfig,
     role_requirements: list[RoleStaffingRequirement],
+    staff_skills: list[StaffSkill] | None = None,
+    skill_requirements: list[SkillRequirement] | None = None,
+    fixed_assignments: list[ScheduleAssignment] | None = None,
+    prefix_assignments: dict[int, list] | None = None,
 ) -> list[DiagnosticItem]:
-    """ソルバーを使わずに算術チェックで明らかな問題を検出"""
-    diagnostics: list[DiagnosticItem] = []
-
-    unavailable = set()
-    for req in requests:
-        if req.type == "unavailable":
-            unavailable.add((req.staff_id, req.date))
+    """ソルバーを使わずに算術チェックで明らかな問題を検出
 
-    req_map: dict[tuple[int, str], int] = {}
-    for r in requirements:
-        req_map[(r.shift_slot_id, r.day_type)] = r.min_count
+    スタッフ×日の勤務可能行列と日×枠の必要人数行列を作り、各チェックを配列の集計で行う。
+    手動編集（fixed_assignments）はモデルと同じく確定セルとして扱い、確定した勤務どうしが
+    週上限・連勤・インターバルに違反していればそのセルを挙げる。
+    """
+    diagnostics: list[DiagnosticItem] = []
+    S, D, T = len(staff_list), len(dates), len(slots)
+
+    staff_pos = {s.id: i for i, s in enumerate(staff_list)}
+    date_pos = {d: i for i, d in enumerate(dates)}
+    unavailable = np.zeros((S, D), dtype=bool)
+    off = [
+        (staff_pos[r.staff_id], date_pos[r.date])
+        for r in requests
+        if r.type == "unavailable" and r.staff_id in staff_pos and r.date in date_pos
+    ]
+    if off:
+        unavailable[tuple(np.array(off).T)] = True
+    pinned_on, pinned_days = _pinned_cells(fixed_assignments, staff_list, dates, slots)
+    pinned_work = pinned_on.any(axis=2)
+
+    diagnostics.extend(_pinned_conflicts(
+        dates, staff_list, slots, config, pinned_on, prefix_assignments,
+    ))
+
+    # 勤務可能行列 (S, D): 不可日と手動で確定した日は False。ただし勤務で確定した日は True
+    free = ~unavailable & ~pinned_days
+    avail = free | pinned_work
+    available = avail.sum(axis=0)  # (D,)
+    # 枠ごとの利用可能人数 (D, T): 未確定のスタッフ + その枠に確定したスタッフ
+    slot_available = free.sum(axis=0)[:, None] + pinned_on.sum(axis=0)
+
+    # 必要人数行列 (D, T)
+    day_types = [_get_day_type(d) for d in dates]
+    demand = _demand_matrix(
+        day_types, slots, [(r.shift_slot_id, r.day_type, r.min_count) for r in requirements],
+    )
 
-    # 日別・シフト枠別の利用可能人数 vs 必要人数
-    for d in dates:
-        day_type = _get_day_type(d)
-        for t in slots:
-            min_count = req_map.get((t.id, day_type), 0)
-            if min_count <= 0:
-                continue
-            unavailable_on_date = sum(
-                1 for s in staff_list if (s.id, d) in unavailable
+    def shortage(d_idx: int, where: str, have: int, need: int) -> DiagnosticItem:
+        d = dates[d_idx].isoformat()
+        if unavailable[:, d_idx].any():
+            return DiagnosticItem(
+                constraint="C3_unavailable",
+                severity="error",
+                message=f"{d} {where}で不可日により利用可能人数({have}人)が必要人数({need}人)に不足しています。不可日の登録を見直してください。",
             )
-            available = len(staff_list) - unavailable_on_date
-            if available < min_count:
-                if unavailable_on_date > 0:
-                    diagnostics.append(DiagnosticItem(
-                        constraint="C3_unavailable",
-                        severity="error",
-                        message=f"{d.isoformat()} のシフト「{t.name}」で不可日により利用可能人数({available}人)が必要人数({min_count}人)に不足しています。不可日の登録を見直してください。",
-                    ))
-                else:
-                    diagnostics.append(DiagnosticItem(
-                        constraint="C2_staffing",
-                        severity="error",
-                        message=f"{d.isoformat()} のシフト「{t.name}」で利用可能人数({available}人)が必要人数({min_count}人)に不足しています。",
-                    ))
-
-    # 週別の勤務上限合計 vs 必要人日
-    weeks: dict[date, list[date]] = defaultdict(list)
-    for d in dates:
-        week_start = d - timedelta(days=d.weekday())
-        weeks[week_start].append(d)
-    for week_start, week_dates in weeks.items():
-        total_capacity = sum(s.max_days_per_week for s in staff_list)
-        total_needed = 0
-        for d in week_dates:
-            day_type = _get_day_type(d)
-            for t in slots:
-                total_needed += req_map.get((t.id, day_type), 0)
-        if total_needed > total_capacity:
-            diagnostics.append(DiagnosticItem(
-                constraint="C5_weekly_max",
+        if pinned_days[:, d_idx].any():
+            return DiagnosticItem(
+                constraint="manual_edit",
                 severity="error",
-                message=f"週 {week_start.isoformat()} 開始: 必要延べ人日({total_needed})がスタッフの週勤務上限合計({total_capacity})を超えています。",
-            ))
+                message=f"{d} {where}で手動編集の確定により利用可能人数({have}人)が必要人数({need}人)に不足しています。確定したセルを見直してください。",
+                details=_pinned_labels(
+                    staff_list, dates, slots, pinned_on, pinned_days, days=[d_idx],
+                ),
+            )
+        return DiagnosticItem(
+            constraint="C2_staffing",
+            severity="error",
+            message=f"{d} {where}で利用可能人数({have}人)が必要人数({need}人)に不足しています。",
+        )
+
+    # 日別・シフト枠別の利用可能人数 vs 必要人数
+    short = (demand > 0) & (slot_available < demand)
+    for d_idx, t_idx in zip(*np.nonzero(short)):
+        diagnostics.append(shortage(
+            d_idx, f"のシフト「{slots[t_idx].name}」",
+            int(slot_available[d_idx, t_idx]), int(demand[d_idx, t_idx]),
+        ))
+
+    # 1人は1日1枠までなので、枠ごとには足りていても日の合計で足りない日
+    day_short = (demand.sum(axis=1) > available) & ~short.any(axis=1)
+    for d_idx in np.nonzero(day_short)[0]:
+        diagnostics.append(shortage(
+            d_idx, "は全シフト枠の合計（1人1日1枠）", int(available[d_idx]), int(demand[d_idx].sum()),
+        ))
+
+    # 週別の勤務上限合計 vs 必要人日（不可日を除いた勤務可能日数でも頭打ちにする）
+    week_starts, day_mat = _week_matrix(dates)
+    in_week = day_mat >= 0
+    avail_week = (avail[:, day_mat] & in_week).sum(axis=2)  # (S, 週数)
+    max_days = np.array([s.max_days_per_week for s in staff_list], dtype=np.int64)
+    capacity = np.minimum(max_days[:, None], avail_week).sum(axis=0)
+    needed = (demand.sum(axis=1)[day_mat] * in_week).sum(axis=1)
+    for w in np.nonzero(needed > capacity)[0]:
+        diagnostics.append(DiagnosticItem(
+            constraint="C5_weekly_max",
+            severity="error",
+            message=f"週 {week_starts[w].isoformat()} 開始: 必要延べ人日({int(needed[w])})がスタッフの週に勤務できる日数の合計({int(capacity[w])}、週上限と不可日から算出)を超えています。",
+        ))
 
     # ロール別人数チェック（B5有効時）
     if config.enable_role_staffing and role_requirements:
+        roles = np.array([s.role for s in staff_list], dtype=object)
+        short_roles = set()
         for rr in role_requirements:
-            eligible = [s for s in staff_list if s.role == rr.role]
-            if len(eligible) < rr.min_count:
+            eligible = int((roles == rr.role).sum())
+            if eligible < rr.min_count:
+                short_roles.add(rr.role)
                 diagnostics.append(DiagnosticItem(
                     constraint="B5_role_staffing",
                     severity="error",
-                    message=f"ロール「{rr.role}」のスタッフ数({len(eligible)}人)が必要人数({rr.min_count}人)に不足しています。",
+                    message=f"ロール「{rr.role}」のスタッフ数({eligible}人)が必要人数({rr.min_count}人)に不足しています。",
                 ))
+        for role in dict.fromkeys(rr.role for rr in role_requirements):
+            if role in short_roles:
+                continue
+            role_demand = _demand_matrix(day_types, slots, [
+                (rr.shift_slot_id, rr.day_type, rr.min_count)
+                for rr in role_requirements if rr.role == role
+            ])
+            diagnostics.extend(_group_shortage(
+                "B5_role_staffing", f"ロール「{role}」", roles == role, avail, role_demand, dates,
+            ))
+
+    # スキル別人数チェック（B8有効時。有資格者がいない要件はモデルでも課さない）
+    if config.enable_skill_staffing and skill_requirements:
+        skilled: dict[str, np.ndarray] = defaultdict(lambda: np.zeros(S, dtype=bool))
+        for ss in staff_skills or []:
+            if ss.staff_id in staff_pos:
+                skilled[ss.skill][staff_pos[ss.staff_id]] = True
+        for skill in dict.fromkeys(sr.skill for sr in skill_requirements):
+            if skill not in skilled:
+                continue
+            skill_demand = _demand_matrix(day_types, slots, [
+                (sr.shift_slot_id, sr.day_type, sr.min_count)
+                for sr in skill_requirements if sr.skill == skill
+            ])
+            diagnostics.extend(_group_shortage(
+                "B8_skill_staffing", f"スキル「{skill}」", skilled[skill], avail, skill_demand, dates,
+            ))
 
     return diagnostics
 
 
+def _pinned_labels(
+    staff_list: list[Staff],
+    dates: list[date],
+    slots: list[ShiftSlot],
+    pinned_on: np.ndarray,
+    pinned_days: np.ndarray,
+    staff: np.ndarray | None = None,
+    days: list[int] | None = None,
+) -> list[str]:
+    """確定セルを「スタッフ 日付 枠（休み）」の表記で返す（staff / days で絞り込む）"""
+    mask = pinned_days.copy()
+    if staff is not None:
+        mask &= staff[:, None]
+    if days is not None:
+        keep = np.zeros(len(dates), dtype=bool)
+        keep[days] = True
+        mask &= keep[None, :]
+    slot_of = pinned_on.argmax(axis=2)
+    return [
+        f"{staff_list[i].name} {dates[d].isoformat()} "
+        + (slots[slot_of[i, d]].name if pinned_on[i, d].any() else "休み")
+        for i, d in zip(*np.nonzero(mask))
+    ]
+
+
+def _pinned_conflicts(
+    dates: list[date],
+    staff_list: list[Staff],
+    slots: list[ShiftSlot],
+    config: SolverConfig,
+    pinned_on: np.ndarray,
+    prefix_assignments: dict[int, list] | None,
+) -> list[DiagnosticItem]:
+    """手動編集で確定した勤務だけで週上限・連勤・インターバル/逆循環に違反していないか
+
+    確定セルはモデルでも固定されるので、ここで違反していれば他の割り当てに関係なく解けない。
+    """
+    works = pinned_on.any(axis=2)
+    if not works.any():
+        return []
+    S, D = works.shape
+    diagnostics: list[DiagnosticItem] = []
+
+    def conflict(rule: str, cells: np.ndarray) -> None:
+        diagnostics.append(DiagnosticItem(
+            constraint="manual_edit",
+            severity="error",
+            message=f"手動編集で確定した勤務だけで{rule}に違反しています。確定したセルを見直してください。",
+            details=_pinned_labels(staff_list, dates, slots, pinned_on, cells),
+        ))
+
+    # 週上限: 確定した勤務日数がスタッフの週最大勤務日数を超える週
+    _, day_mat = _week_matrix(dates)
+    in_week = day_mat >= 0
+    per_week = (works[:, day_mat] & in_week).sum(axis=2)  # (S, 週数)
+    max_days = np.array([s.max_days_per_week for s in staff_list], dtype=np.int64)
+    over_s, over_w = np.nonzero(per_week > max_days[:, None])
+    if len(over_s):
+        cells = np.zeros((S, D), dtype=bool)
+        for i, w in zip(over_s, over_w):
+            cells[i, day_mat[w][in_week[w]]] = True
+        conflict("週勤務上限", cells & works)
+
+    # 連勤: 前期間の末尾から続く分も含めて、確定した勤務が上限を超えて連続する
+    W = config.max_consecutive_days
+    if W >= 0:
+        run = _prefix_runs(prefix_assignments, staff_list, dates[0])
+        over = np.zeros((S, D), dtype=bool)
+        for d in range(D):
+            run = np.where(works[:, d], run + 1, 0)
+            over[:, d] = run > W
+        if over.any():
+            # 上限を超えた日から連続の先頭までさかのぼって印をつける
+            cells = over.copy()
+            for d in range(D - 1, 0, -1):
+                cells[:, d - 1] |= cells[:, d] & works[:, d - 1]
+            conflict(f"連勤制限（{W}日）", cells)
+
+    # インターバル・逆循環: 翌日の枠との組み合わせが禁止されている
+    forbid = _forbidden_pairs(slots, config)
+    if D > 1 and forbid.any():
+        slot_of = pinned_on.argmax(axis=2)
+        both = works[:, :-1] & works[:, 1:]
+        bad = both & forbid[slot_of[:, :-1], slot_of[:, 1:]]
+        if bad.any():
+            cells = np.zeros((S, D), dtype=bool)
+            cells[:, :-1] |= bad
+            cells[:, 1:] |= bad
+            conflict("シフト間インターバル・逆循環禁止", cells)
+
+    return diagnostics
+
+
+def _demand_matrix(
+    day_types: list[str], slots: list[ShiftSlot], entries: list[tuple[int, str, int]],
+) -> np.ndarray:
+    """(枠 ID, 曜日区分, 必要人数) の並びを (日, 枠) の必要人数行列にする"""
+    slot_pos = {t.id: k for k, t in enumerate(slots)}
+    type_names = sorted(set(day_types))
+    type_pos = {name: i for i, name in enumerate(type_names)}
+    by_type = np.zeros((len(type_names), len(slots)), dtype=np.int64)
+    for slot_id, day_type, min_count in entries:
+        if slot_id in slot_pos and day_type in type_pos:
+            by_type[type_pos[day_type], slot_pos[slot_id]] = min_count
+    day_index = np.array([type_pos[dt] for dt in day_types], dtype=np.int64)
+    return by_type[day_index].reshape(len(day_types), len(slots))
+
+
+def _group_shortage(
+    constraint: str,
+    label: str,
+    eligible: np.ndarray,
+    avail: np.ndarray,
+    demand: np.ndarray,
+    dates: list[date],
+) -> list[DiagnosticItem]:
+    """対象スタッフ（eligible）のうち勤務可能な人数が、その日の全枠の必要人数の合計に
+    届かない日をまとめて1件にする（1人1日1枠なので枠ごとの不足もここに含まれる）
+    """
+    have = avail[eligible].sum(axis=0)
+    short = np.nonzero(demand.sum(axis=1) > have)[0]
+    if not len(short):
+        return []
+    days = [dates[i].isoformat() for i in short]
+    return [DiagnosticItem(
+        constraint=constraint,
+        severity="error",
+        message=f"{label}の利用可能人数が必要人数に届かない日が {len(days)} 日あります（例: {days[0]} は {int(have[short[0]])}人 / 必要 {int(demand[short[0]].sum())}人）。",
+        details=days,
+    )]
+
+
 def _diagnose_with_highs_iis(
-    prob: LpProblem,
+    highs,
+    built: "ScheduleModel",
     staff_list: list[Staff],
     slots: list[ShiftSlot],
+    dates: list[date],
 ) -> list[DiagnosticItem]:
     """HiGHS の IIS を使って制約違反の原因を特定する"""
+    model = built.model
     try:
-        _, iis = prob.solverModel.getIis()
+        _, iis = highs.getIis()
         if not iis.valid_:
             return []
     except Exception:
         return []
 
-    constraint_keys = list(prob.constraints.keys())
     iis_row_indices = list(iis.row_index_)
 
     # row_index_ が空の場合は row_status_ にフォールバック
@@ -159,7 +445,7 @@ def _diagnose_with_highs_iis(
             row_statuses = list(iis.row_status_)
             iis_row_indices = [
                 i for i, s in enumerate(row_statuses)
-                if s in (in_conflict, maybe_conflict) and i < len(constraint_keys)
+                if s in (in_conflict, maybe_conflict) and i < model.num_row
             ]
         except Exception:
             return []
@@ -167,33 +453,21 @@ def _diagnose_with_highs_iis(
     if not iis_row_indices:
         return []
 
-    staff_map = {s.id: s.name for s in staff_list}
-    slot_map = {t.id: t.name for t in slots}
-
-    # 制約名のプレフィックスごとに分類
-    types_found: dict[str, list[str]] = defaultdict(list)
+    # 制約ファミリーのプレフィックスごとに行キーを分類
+    types_found: dict[str, list[tuple[int, ...]]] = defaultdict(list)
     for row_idx in iis_row_indices:
-        if row_idx < len(constraint_keys):
-            cname = constraint_keys[row_idx]
-            prefix = cname.split("_")[0]
-            types_found[prefix].append(cname)
+        if row_idx < model.num_row:
+            block, local = model.row_block(row_idx)
+            prefix = block.family.split("_")[0]
+            types_found[prefix].append(tuple(int(k) for k in block.keys[local]))
 
     diagnostics: list[DiagnosticItem] = []
 
     if "staffing" in types_found:
         examples = []
-        for cname in types_found["staffing"][:3]:
-            parts = cname.split("_")
-            # staffing_YYYYMMDD_SLOTID
-            if len(parts) >= 3:
-                ymd = parts[1]  # '20260307'
-                try:
-                    slot_id = int(parts[2])
-                    d_str = f"{ymd[:4]}-{ymd[4:6]}-{ymd[6:]}" if len(ymd) == 8 else ymd
-                    slot_name = slot_map.get(slot_id, f"枠{slot_id}")
-                    examples.append(f"{d_str}の{slot_name}")
-                except (ValueError, IndexError):
-                    pass
+        for d_idx, t_idx in types_found["staffing"][:3]:
+            # staffing キー: (日付 index, シフト枠 index)
+            examples.append(f"{dates[d_idx].isoformat()}の{slots[t_idx].name}")
         detail = "（例: " + "、".join(examples) + "）" if examples else ""
         diagnostics.append(DiagnosticItem(
             constraint="C2_staffing",
@@ -201,18 +475,15 @@ def _diagnose_with_highs_iis(
             message=f"必要人数を満たせない日程があります{detail}。必要人数を下げるか、「必要人数を目標として扱う」を有効にしてください。",
         ))
 
-    if "unavail" in types_found:
-        affected: set[str] = set()
-        for cname in types_found["unavail"]:
-            parts = cname.split("_")
-            # unavail_STAFFID_YYYYMMDD_SLOTID
-            if len(parts) >= 2:
-                try:
-                    staff_id = int(parts[1])
-                    affected.add(staff_map.get(staff_id, f"スタッフ{staff_id}"))
-                except ValueError:
-                    pass
-        names = "、".join(list(affected)[:3])
+    # 不可日のセルは変数自体を作らないため、IIS に含まれた staffing 行の日付で
+    # 不可日登録のあるスタッフを C3 の原因候補として挙げる
+    unavail_staff = [
+        staff_list[s_idx].name
+        for d_idx, _ in types_found.get("staffing", [])
+        for s_idx in np.nonzero(built.unavailable[:, d_idx])[0]
+    ]
+    if unavail_staff:
+        names = "、".join(list(dict.fromkeys(unavail_staff))[:3])
         diagnostics.append(DiagnosticItem(
             constraint="C3_unavailable",
             severity="error",
@@ -227,16 +498,8 @@ def _diagnose_with_highs_iis(
         ))
 
     if "weekly" in types_found:
-        affected: set[str] = set()
-        for cname in types_found["weekly"]:
-            parts = cname.split("_")
-            # weekly_STAFFID_YYYYMMDD
-            if len(parts) >= 2:
-                try:
-                    staff_id = int(parts[1])
-                    affected.add(staff_map.get(staff_id, f"スタッフ{staff_id}"))
-                except ValueError:
-                    pass
+        # weekly キー: (スタッフ index, 週開始日の序数)
+        affected = {staff_list[key[0]].name for key in types_found["weekly"]}
         names = "、".join(list(affected)[:3])
         diagnostics.append(DiagnosticItem(
             constraint="C5_weekly_max",
@@ -275,6 +538,113 @@ def _diagnose_with_highs_iis(
     return diagnostics
 
 
+# 弾性診断でスラックを付ける制約ファミリーと、1単位緩和あたりのペナルティ。
+# 不可日はスタッフ本人の都合なので、他の制約より緩和しにくく重み付けする
+_ELASTIC_PENALTIES: dict[str, float] = {
+    "staffing": 1.0,
+    "unavail": 2.0,
+    "consec": 1.0,
+    "consec_prefix": 1.0,
+    "weekly": 1.0,
+    "interval": 1.0,
+    "role": 1.0,
+    "mindays": 1.0,
+    "revcycle": 1.0,
+    "skill": 1.0,
+}
+
+# 制約ファミリーのプレフィックス → (診断の制約名, メッセージ)
+_ELASTIC_MESSAGES: dict[str, tuple[str, str]] = {
+    "staffing": ("C2_staffing", "必要人数を満たせない日程があります。必要人数を下げるか、「必要人数を目標として扱う」を有効にしてください。"),
+    "unavail": ("C3_unavailable", "不可日を守ると必要人数を満たせません。スタッフの不可日を見直してください。"),
+    "consec": ("C4_consecutive", "連勤制限が厳しすぎます。最大連続勤務日数を引き上げてください（設定画面 → 基本設定）。"),
+    "weekly": ("C5_weekly_max", "週勤務上限が低すぎます。スタッフの週最大勤務日数を引き上げてください。"),
+    "interval": ("B4_interval", "シフト間インターバル制約が厳しすぎます。インターバル時間を短縮するか無効にしてください（設定画面 → 追加制約）。"),
+    "role": ("B5_role_staffing", "役割ごとの最低人数を満たせません。役割別必要人数の設定を見直してください。"),
+    "mindays": ("B6_min_days", "週最低勤務日数の制約を満たせません。スタッフの週最低勤務日数を引き下げてください。"),
+    "revcycle": ("B7_reverse_cycle", "逆循環禁止の制約を満たせません。シフトの並びか逆循環禁止の設定を見直してください。"),
+    "skill": ("B8_skill_staffing", "スキル別必要人数を満たせません。有資格者の配置かスキル要件を見直してください。"),
+}
+
+
+def _diagnose_with_elastic(
+    built: "ScheduleModel",
+    staff_list: list[Staff],
+    slots: list[ShiftSlot],
+    dates: list[date],
+    time_limit: float,
+) -> list[DiagnosticItem]:
+    """全ハード制約にスラックを付けた弾性モデルを1回だけ解き、緩和が必要な箇所を特定する
+
+    built は _build_model(..., elastic=True) で組んだモデル。時間内に解けなかった
+    場合は空リストを返す（呼び出し側で制約緩和テストにフォールバックする）。
+    """
+    if time_limit <= 0:
+        return []
+    model, slack_cols, slack_rows = built.model.elastic(_ELASTIC_PENALTIES)
+    outcome = solve_model(model, time_limit)
+    if outcome.status not in ("optimal", "feasible"):
+        return []
+
+    amounts = outcome.col_values[slack_cols]
+    details: dict[str, list[str]] = defaultdict(list)
+    for row, amount in zip(slack_rows[amounts > 0.5], amounts[amounts > 0.5]):
+        block, local = model.row_block(int(row))
+        prefix = block.family.split("_")[0]
+        key = [int(k) for k in block.keys[local]]
+        n = int(round(amount))
+        if prefix == "staffing":
+            detail = f"{dates[key[0]].isoformat()}の{slots[key[1]].name}: {n}人不足"
+        elif prefix in ("role", "skill"):
+            detail = f"{dates[key[1]].isoformat()}の{slots[key[2]].name}: {n}人不足"
+        elif prefix == "unavail":
+            detail = f"{staff_list[key[0]].name} {dates[key[1]].isoformat()}"
+        elif prefix == "consec":
+            detail = f"{staff_list[key[0]].name} {dates[key[1]].isoformat()}: {n}日超過"
+        elif prefix in ("weekly", "mindays"):
+            week = date.fromordinal(key[1]).isoformat()
+            detail = f"{staff_list[key[0]].name} 週{week}開始: {n}日"
+        else:  # interval, revcycle
+            detail = f"{staff_list[key[0]].name} {dates[key[1]].isoformat()}→{dates[key[1] + 1].isoformat()}"
+        details[prefix].append(detail)
+
+    diagnostics: list[DiagnosticItem] = []
+    for prefix, (constraint, message) in _ELASTIC_MESSAGES.items():
+        if prefix in details:
+            diagnostics.append(DiagnosticItem(
+                constraint=constraint,
+                severity="error",
+                message=message,
+                details=list(dict.fromkeys(details[prefix])),
+            ))
+    return diagnostics
+
+
+def _run_relaxation_probe(solve_kwargs: dict) -> tuple[str, float]:
+    """緩和した条件で1回だけ求解し、ステータスと所要秒数を返す（プロセスプール用）
+
+    プールの中からさらにレースのプロセスを起こすと、別のプロセスグループに
+    なってジョブのキャンセルで止められないので、レースは使わない。
+    """
+    started = time.perf_counter()
+    config = replace(solve_kwargs["config"], enable_solver_race=False)
+    status = solve_schedule(
+        **{**solve_kwargs, "config": config}, _skip_diagnostics=True,
+    )["status"]
+    return status, time.perf_counter() - started
+
+
+def _terminate_pool(pool: ProcessPoolExecutor) -> None:
+    """締め切りを過ぎたプローブのワーカープロセスを止める"""
+    pool.shutdown(wait=False, cancel_futures=True)
+    terminate = getattr(pool, "terminate_workers", None)  # Python 3.14+
+    if terminate is not None:
+        terminate()
+        return
+    for process in list((getattr(pool, "_processes", None) or {}).values()):
+        process.terminate()
+
+
 def _try_solve_relaxed(
     period: SchedulePeriod,
     staff_list: list[Staff],
@@ -283,8 +653,23 @@ def _try_solve_relaxed(
     requests: list[StaffRequest],
     config: SolverConfig,
     role_requirements: list[RoleStaffingRequirement],
-) -> list[DiagnosticItem]:
-    """制約を1つずつ緩和して再ソルブし、原因制約を特定（IIS フォールバック用）"""
+    prefix_assignments: dict[int, list] | None = None,
+    staff_skills: list[StaffSkill] | None = None,
+    skill_requirements: list[SkillRequirement] | None = None,
+    fixed_assignments: list[ScheduleAssignment] | None = None,
+    deadline: float | None = None,
+) -> tuple[list[DiagnosticItem], list[dict]]:
+    """制約を1つずつ緩和して再ソルブし、原因制約を特定（IIS フォールバック用）
+
+    各プローブは元の求解と同じモデル（前期間の末尾・スキル・手動確定を含む）から
+    1つだけ緩めて解く。プロセスプールで並列に解き、締め切り deadline
+    （time.perf_counter() の時刻。診断フェーズの開始時に決めたものを渡す。
+    省略時は今から config.time_limit 秒後）までの残り時間を各プローブの制限時間にする。
+    締め切りまでに終わらなかったプローブは打ち切り、プローブごとの所要時間と
+    打ち切り有無を返す。
+    """
+    if deadline is None:
+        deadline = time.perf_counter() + config.time_limit
     diagnostics: list[DiagnosticItem] = []
 
     relaxations: list[tuple[str, str, dict]] = [
@@ -318,17 +703,37 @@ def _try_solve_relaxed(
             "最低勤務日数の設定を引き下げてください。",
             {"enable_min_days_per_week": False},
         ),
+        (
+            "B7_reverse_cycle",
+            "逆循環禁止を無効にするか、シフトの並びを見直してください。",
+            {"enable_reverse_cycle_prohibition": False},
+        ),
+        (
+            "B8_skill_staffing",
+            "スキル別必要人数の設定か有資格者の配置を見直してください。",
+            {"enable_skill_staffing": False},
+        ),
     ]
 
-    # C3: 不可日の緩和は特殊処理
-    has_unavailable = any(r.type == "unavailable" for r in requests)
-
-    resolved_any = False
+    # (制約名, メッセージ, solve_schedule の引数)
+    probes: list[tuple[str, str, dict]] = []
+    base_kwargs = dict(
+        period=period,
+        staff_list=staff_list,
+        slots=slots,
+        requirements=requirements,
+        requests=requests,
+        config=config,
+        role_requirements=role_requirements,
+        prefix_assignments=prefix_assignments,
+        staff_skills=staff_skills,
+        skill_requirements=skill_requirements,
+        fixed_assignments=fixed_assignments,
+    )
 
     for constraint_name, message, overrides in relaxations:
         relaxed_config = deepcopy(config)
         relaxed_staff = staff_list
-        relaxed_requests = requests
 
         # 既にその設定が無効/緩和済みならスキップ
         if constraint_name == "B4_interval" and not config.enable_shift_interval:
@@ -339,6 +744,12 @@ def _try_solve_relaxed(
             continue
         if constraint_name == "C2_staffing" and config.enable_soft_staffing:
             continue
+        if constraint_name == "B7_reverse_cycle" and not config.enable_reverse_cycle_prohibition:
+            continue
+        if constraint_name == "B8_skill_staffing" and not (
+            config.enable_skill_staffing and skill_requirements
+        ):
+            continue
 
         if "override_max_days_per_week" in overrides:
             relaxed_staff = [
@@ -352,53 +763,98 @@ def _try_solve_relaxed(
             for key, val in overrides.items():
                 setattr(relaxed_config, key, val)
 
-        result = solve_schedule(
-            period=period,
-            staff_list=relaxed_staff,
-            slots=slots,
-            requirements=requirements,
-            requests=relaxed_requests,
-            config=relaxed_config,
-            role_requirements=role_requirements,
-            _skip_diagnostics=True,
+        probes.append((
+            constraint_name,
+            message,
+            {**base_kwargs, "staff_list": relaxed_staff, "config": relaxed_config},
+        ))
+
+    # C3: 不可日の緩和は特殊処理
+    if any(r.type == "unavailable" for r in requests):
+        probes.append((
+            "C3_unavailable",
+            "不可日の登録が多すぎる可能性があります。スタッフの不可日を見直してください。",
+            {**base_kwargs, "requests": [r for r in requests if r.type != "unavailable"]},
+        ))
+
+    # 手動確定はハード制約なので、外して解けるなら手動編集が原因
+    if fixed_assignments:
+        probes.append((
+            "manual_edit",
+            "手動編集で確定したセルが制約と両立しません。確定したセルを見直してください。",
+            {**base_kwargs, "fixed_assignments": None},
+        ))
+
+    probe_reports: dict[str, dict] = {
+        name: {"constraint": name, "status": "cut_off", "seconds": None, "cut_off": True}
+        for name, _, _ in probes
+    }
+    resolved: set[str] = set()
+
+    started = time.perf_counter()
+    remaining = deadline - started
+    if probes and remaining > 0:
+        probes = [
+            (name, message, {**kwargs, "config": replace(kwargs["config"], time_limit=remaining)})
+            for name, message, kwargs in probes
+        ]
+        # HiGHS のスレッドを抱えた親プロセスを fork しないよう spawn で起動する
+        pool = ProcessPoolExecutor(
+            max_workers=min(len(probes), _DIAGNOSTIC_MAX_WORKERS, os.cpu_count() or 1),
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=own_highs_scheduler,
         )
-        if result["status"] == "optimal":
+        futures = {
+            pool.submit(_run_relaxation_probe, kwargs): name
+            for name, _, kwargs in probes
+        }
+        try:
+            for future in as_completed(futures, timeout=remaining):
+                name = futures[future]
+                try:
+                    status, seconds = future.result()
+                except Exception:
+                    status, seconds = "error", time.perf_counter() - started
+                probe_reports[name].update(
+                    status=status, seconds=round(seconds, 3), cut_off=False,
+                )
+                if status in ("optimal", "feasible"):
+                    resolved.add(name)
+                if time.perf_counter() > deadline:
+                    break
+        except FuturesTimeoutError:
+            pass
+        finally:
+            if any(not f.done() for f in futures):
+                _terminate_pool(pool)
+            else:
+                pool.shutdown(wait=True)
+
+    for name, message, _ in probes:
+        if name in resolved:
             diagnostics.append(DiagnosticItem(
-                constraint=constraint_name,
+                constraint=name,
                 severity="error",
                 message=message,
             ))
-            resolved_any = True
-
-    # C3: 不可日の緩和テスト
-    if has_unavailable:
-        relaxed_requests = [r for r in requests if r.type != "unavailable"]
-        result = solve_schedule(
-            period=period,
-            staff_list=staff_list,
-            slots=slots,
-            requirements=requirements,
-            requests=relaxed_requests,
-            config=config,
-            role_requirements=role_requirements,
-            _skip_diagnostics=True,
-        )
-        if result["status"] == "optimal":
-            diagnostics.append(DiagnosticItem(
-                constraint="C3_unavailable",
-                severity="error",
-                message="不可日の登録が多すぎる可能性があります。スタッフの不可日を見直してください。",
-            ))
-            resolved_any = True
 
-    if not resolved_any:
+    cut_off = [name for name, report in probe_reports.items() if report["cut_off"]]
+    if cut_off:
+        diagnostics.append(DiagnosticItem(
+            constraint="diagnostics_timeout",
+            severity="warning",
+            message=f"診断の制限時間({config.time_limit}秒)内に一部の緩和テストが完了しませんでした。",
+            details=cut_off,
+        ))
+
+    if not resolved:
         diagnostics.append(DiagnosticItem(
             constraint="combined",
             severity="error",
             message="複数の制約の組み合わせが原因の可能性があります。制約設定を全体的に見直してください。",
         ))
 
-    return diagnostics
+    return diagnostics, list(probe_reports.values())
 
 
 def diagnose_infeasibility(
@@ -409,295 +865,657 @@ def diagnose_infeasibility(
     requests: list[StaffRequest],
     config: SolverConfig,
     role_requirements: list[RoleStaffingRequirement],
+    prefix_assignments: dict[int, list] | None = None,
+    staff_skills: list[StaffSkill] | None = None,
+    skill_requirements: list[SkillRequirement] | None = None,
+    fixed_assignments: list[ScheduleAssignment] | None = None,
 ) -> list[DiagnosticItem]:
-    """infeasible 時に原因を特定する診断を実行（HiGHS IIS なしのフォールバック）"""
+    """infeasible 時に原因を特定する診断を実行（HiGHS IIS なしのフォールバック）
+
+    弾性モデルの求解と制約緩和テストは合わせて config.time_limit 秒に収める。
+    """
+    deadline = time.perf_counter() + config.time_limit
     num_days = (period.end_date - period.start_date).days + 1
     dates = [period.start_date + timedelta(days=i) for i in range(num_days)]
 
     # Phase 1: プリソルブチェック
     presolve = _presolve_checks(
         dates, staff_list, slots, requirements, requests, config, role_requirements,
+        staff_skills, skill_requirements, fixed_assignments, prefix_assignments,
     )
     if presolve:
         return presolve
 
-    # Phase 2: 制約緩和テスト
-    return _try_solve_relaxed(
+    # Phase 2: 弾性モデルで緩和が必要な制約を1回の求解で特定
+    req_map = {(r.shift_slot_id, r.day_type): r.min_count for r in requirements}
+    elastic = _build_model(
+        dates, staff_list, slots, req_map, requests, config, role_requirements,
+        prefix_assignments, staff_skills, skill_requirements, fixed_assignments, elastic=True,
+    )
+    diagnostics = _diagnose_with_elastic(
+        elastic, staff_list, slots, dates, deadline - time.perf_counter(),
+    )
+    if diagnostics:
+        return diagnostics
+
+    # Phase 3: 制約緩和テスト
+    diagnostics, _ = _try_solve_relaxed(
         period, staff_list, slots, requirements, requests, config, role_requirements,
+        prefix_assignments, staff_skills, skill_requirements, fixed_assignments, deadline,
     )
+    return diagnostics
 
 
-def solve_schedule(
-    period: SchedulePeriod,
+def _solve_component(
+    model: MipModel, time_limit: float, start: MipStart | None, params: SolverParams,
+) -> SolveOutcome:
+    """成分1つを解く（プロセスプール用。HiGHS のオブジェクトは親へ送れないので外す）"""
+    outcome = solve_model(model, time_limit, start, params=params)
+    outcome.solver_model = None
+    return outcome
+
+
+def _pack_components(
+    labels: np.ndarray, n_components: int, min_columns: int,
+) -> tuple[np.ndarray, int]:
+    """min_columns 列に満たない成分を成分番号の順に隣とまとめ直す
+
+    独立な成分をいくつまとめても独立なので、必要人数の行がなくスタッフごとに
+    成分が分かれるような場合でも、小さな部分問題ごとにプロセスを起こさずに済む。
+    """
+    sizes = np.bincount(labels[labels >= 0], minlength=n_components)
+    group = np.empty(n_components, dtype=np.int64)
+    n_groups, filled = 0, 0
+    for c, size in enumerate(sizes):
+        group[c] = n_groups
+        filled += int(size)
+        if filled >= min_columns:
+            n_groups, filled = n_groups + 1, 0
+    if filled:
+        # 最後の足りない分は直前のまとまりに含める
+        if n_groups:
+            group[group == n_groups] = n_groups - 1
+        else:
+            n_groups = 1
+    if not n_components:
+        return labels, 0
+    packed = np.where(labels >= 0, group[np.maximum(labels, 0)], -1)
+    return packed, n_groups
+
+
+def _solve_decomposed(
+    model: MipModel,
+    labels: np.ndarray,
+    n_components: int,
+    shared_rows: np.ndarray,
+    time_limit: float,
+    start: MipStart | None,
+    params: SolverParams,
+) -> tuple[SolveOutcome, dict]:
+    """連結成分ごとの部分モデルをプロセスプールで並列に解き、1つの解にまとめる
+
+    公平性の z_max / z_min のように成分をまたぐ列は各成分に複製し、公平性の行は
+    その成分の列だけに絞る（公平性は成分ごとに最適化される）。まとめた x を固定して
+    元のモデルを LP として解き直し、全体の目的値と共有列の値を求める。成分の求解と
+    この LP は合わせて time_limit 秒に収める。
+    """
+    started = time.perf_counter()
+    deadline = started + time_limit
+    shared_cols = np.nonzero(labels < 0)[0]
+    row_of_nz = np.repeat(np.arange(model.num_row), np.diff(model.a_start))
+    nz_label = labels[model.a_index]
+    # 各行が触れる成分。共有行は複数の成分に触れうるので (行, 成分) の組で持つ
+    touched = np.unique(np.stack([row_of_nz, nz_label], axis=1)[nz_label >= 0], axis=0)
+    shared_only = np.ones(model.num_row, dtype=bool)
+    shared_only[touched[:, 0]] = False  # 共有列だけの行はすべての成分に複製する
+
+    subproblems = []
+    for c in range(n_components):
+        cols = np.concatenate([np.nonzero(labels == c)[0], shared_cols])
+        rows = np.union1d(touched[touched[:, 1] == c, 0], np.nonzero(shared_only)[0])
+        sub_start = None
+        if start is not None:
+            index, values = start
+            local = np.full(model.num_col, -1, dtype=np.int64)
+            local[cols] = np.arange(len(cols))
+            keep = local[index] >= 0
+            sub_start = (local[index[keep]], values[keep])
+        subproblems.append((cols, model.subset(cols, rows), sub_start))
+
+    workers = min(n_components, os.cpu_count() or 1)
+    # 並列度を超える成分は順番待ちになるので、その分だけ1成分あたりの時間を縮める
+    per_component = time_limit * _DECOMPOSE_COMPONENT_SHARE * workers / n_components
+    outcomes = []
+    with ProcessPoolExecutor(
+        max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+        initializer=own_highs_scheduler,
+    ) as pool:
+        futures = [
+            pool.submit(_solve_component, sub, per_component, sub_start, params)
+            for _, sub, sub_start in subproblems
+        ]
+        for f in futures:
+            try:
+                outcomes.append(f.result())
+            except Exception:
+                outcomes.append(SolveOutcome(status="error", backend="decomposition"))
+
+    statuses = [o.status for o in outcomes]
+    coupled = sorted({
+        _COUPLING_FAMILIES[b.family] for b in model.blocks if b.family in _COUPLING_FAMILIES
+    })
+    report = {
+        "components": n_components,
+        "component_columns": [sub.num_col - len(shared_cols) for _, sub, _ in subproblems],
+        "statuses": statuses,
+        "coupled_terms": coupled,
+    }
+    backend = outcomes[0].backend
+    for failed in ("infeasible", "error", "timeout"):
+        if failed in statuses:
+            return SolveOutcome(
+                status=failed, backend=backend,
+                solve_seconds=time.perf_counter() - started,
+            ), report
+
+    own_cols = np.concatenate([cols[: len(cols) - len(shared_cols)] for cols, _, _ in subproblems])
+    own_values = np.concatenate([
+        o.col_values[: len(cols) - len(shared_cols)]
+        for (cols, _, _), o in zip(subproblems, outcomes)
+    ])
+    # x を固定した LP はすぐ解けるので、成分が時間を使い切っても最低1秒は与える
+    merged = solve_model(
+        model.with_fixed(own_cols, own_values),
+        max(deadline - time.perf_counter(), 1.0), params=params,
+    )
+    if merged.status not in ("optimal", "feasible"):
+        # 成分の解は各成分で実行可能なので、まとめの LP が解けないのは時間切れか異常
+        status = "error" if merged.status == "error" else "timeout"
+        return SolveOutcome(
+            status=status, backend=backend, solve_seconds=time.perf_counter() - started,
+        ), report
+    optimal = all(s == "optimal" for s in statuses) and not shared_rows.any()
+    return SolveOutcome(
+        status="optimal" if optimal and merged.status == "optimal" else "feasible",
+        backend=backend,
+        col_values=merged.col_values,
+        objective=merged.objective,
+        solve_seconds=time.perf_counter() - started,
+    ), report
+
+
+def _solve_lazy(
+    model: MipModel,
+    time_limit: float,
+    start: MipStart | None,
+    progress: ProgressCallback | None,
+    stop: threading.Event | None,
+    params: SolverParams,
+) -> tuple[SolveOutcome, dict]:
+    """インターバル・逆循環の行を外して解き、解が違反した行だけを足して解き直す
+
+    各ラウンドの解で未追加の行の活動値をまとめて計算し、違反した行を加えて
+    前回の解を初期解に再求解する。違反がなくなった解は元のモデルの解でもある。
+    制限時間はラウンド全体で共有し、違反が残ったまま時間切れになれば timeout。
+    """
+    started = time.perf_counter()
+    lazy = model.family_rows(_LAZY_FAMILIES)
+    active, pending = np.nonzero(~lazy)[0], np.nonzero(lazy)[0]
+    # 各行のスタッフ index（インターバル・逆循環の行キーの先頭）
+    row_staff = np.full(model.num_row, -1, dtype=np.int64)
+    for block, end in zip(model.blocks, [b.start for b in model.blocks[1:]] + [model.num_row]):
+        if block.family in _LAZY_FAMILIES:
+            row_staff[block.start:end] = block.keys[:, 0]
+    cols = np.arange(model.num_col)
+    rounds = 0
+    while True:
+        remaining = time_limit - (time.perf_counter() - started)
+        sub = replace(model.subset(cols, active), offset=model.offset)
+        outcome = solve_model(sub, remaining, start, progress, stop, params)
+        # IIS の行番号は部分モデルのものなので、診断には使わせない
+        outcome.solver_model = None
+        rounds += 1
+        if outcome.status not in ("optimal", "feasible"):
+            break
+        violated = model.violated_rows(outcome.col_values, pending)
+        if not len(violated):
+            break
+        if time.perf_counter() - started >= time_limit or (stop is not None and stop.is_set()):
+            outcome = SolveOutcome(status="timeout", backend=outcome.backend)
+            break
+        # 違反したスタッフの行はまとめて足す（1行ずつだと別の組へ違反が移るだけになる）
+        added = pending[np.isin(row_staff[pending], row_staff[violated])]
+        active = np.union1d(active, added)
+        pending = np.setdiff1d(pending, added)
+        start = (cols, outcome.col_values)
+    outcome.solve_seconds = time.perf_counter() - started
+    return outcome, {
+        "rounds": rounds,
+        "rows_added": int(lazy.sum()) - len(pending),
+        "lazy_rows": int(lazy.sum()),
+        "model_rows": model.num_row,
+    }
+
+
+def _week_matrix(dates: list[date]) -> tuple[list[date], np.ndarray]:
+    """週（月曜始まり）ごとの日付 index を -1 埋めの (週数, 7) 配列にまとめる"""
+    weeks: dict[date, list[int]] = defaultdict(list)
+    for i, d in enumerate(dates):
+        weeks[d - timedelta(days=d.weekday())].append(i)
+    week_starts = list(weeks.keys())
+    day_mat = np.full((len(week_starts), 7), -1, dtype=np.int64)
+    for w, week_start in enumerate(week_starts):
+        days = weeks[week_start]
+        day_mat[w, : len(days)] = days
+    return week_starts, day_mat
+
+
+def _gather_days(x: np.ndarray, day_mat: np.ndarray) -> np.ndarray:
+    """x[s, day_mat[w], :] を (S, 週数, 7 * T) の列番号配列として取り出す（ABSENT 埋め）"""
+    gathered = x[:, day_mat, :]
+    gathered = np.where(day_mat[None, :, :, None] >= 0, gathered, ABSENT)
+    return gathered.reshape(x.shape[0], day_mat.shape[0], -1)
+
+
+def _conflict_bicliques(pairs: list[tuple[int, int]]) -> list[tuple[list[int], list[int]]]:
+    """前日の枠 a → 翌日の枠 b の禁止組を、全組が衝突する (A, B) の集まりで覆う
+
+    同じ日の枠同士は1日1シフトで排他なので、A × B がすべて禁止組なら
+    sum_A x[s,d,a] + sum_B x[s,d+1,b] <= 1 の1行で A × B の組をまとめて禁止できる。
+    各 a について B = a の衝突先、A = 衝突先が B を含む枠 とした組を作る。
+    """
+    conflicts: dict[int, set[int]] = defaultdict(set)
+    for a, b in pairs:
+        conflicts[a].add(b)
+    cliques: dict[tuple[tuple[int, ...], tuple[int, ...]], None] = {}
+    for a in sorted(conflicts):
+        right = conflicts[a]
+        left = tuple(a2 for a2 in sorted(conflicts) if right <= conflicts[a2])
+        cliques[(left, tuple(sorted(right)))] = None
+    return [(list(left), list(right)) for left, right in cliques]
+
+
+def _clique_rows(
+    b: ModelBuilder, family: str, x: np.ndarray, works: np.ndarray,
+    pairs: list[tuple[int, int]],
+) -> None:
+    """禁止組を _conflict_bicliques でまとめ、(スタッフ, 日, 組) ごとに1行を追加する
+
+    A や B が全枠なら、その日の x の和の代わりに works を使う。
+    行キーは (スタッフ index, 前日の日付 index, 組の番号)。
+    """
+    S, D, T = x.shape
+    s_idx, d_idx = np.indices((S, D - 1))
+    for k, (left, right) in enumerate(_conflict_bicliques(pairs)):
+        before = works[:, :-1, None] if len(left) == T else x[:, :-1, left]
+        after = works[:, 1:, None] if len(right) == T else x[:, 1:, right]
+        cols = np.concatenate([before, after], axis=2)
+        b.add_rows(
+            family, cols.reshape(S * (D - 1), -1), upper=1,
+            keys=np.column_stack([s_idx.ravel(), d_idx.ravel(), np.full(s_idx.size, k)]),
+        )
+
+
+def _assignment_cells(
+    assignments: list[ScheduleAssignment],
     staff_list: list[Staff],
+    dates: list[date],
     slots: list[ShiftSlot],
-    requirements: list[StaffingRequirement],
+) -> np.ndarray:
+    """保存済みの割り当てを (S, D, T) の真偽値配列にする（休み・範囲外は無視）"""
+    staff_pos = {s.id: i for i, s in enumerate(staff_list)}
+    date_pos = {d: i for i, d in enumerate(dates)}
+    slot_pos = {t.id: k for k, t in enumerate(slots)}
+    cells = np.zeros((len(staff_list), len(dates), len(slots)), dtype=bool)
+    for a in assignments:
+        if a.staff_id in staff_pos and a.date in date_pos and a.shift_slot_id in slot_pos:
+            cells[staff_pos[a.staff_id], date_pos[a.date], slot_pos[a.shift_slot_id]] = True
+    return cells
+
+
+def _pinned_cells(
+    fixed_assignments: list[ScheduleAssignment] | None,
+    staff_list: list[Staff],
+    dates: list[date],
+    slots: list[ShiftSlot],
+) -> tuple[np.ndarray, np.ndarray]:
+    """手動編集で確定したセルを ((S, D, T) の勤務セル, (S, D) の確定日) で返す
+
+    shift_slot_id が None の手動編集は「休み」で確定した日として扱う。
+    """
+    staff_pos = {s.id: i for i, s in enumerate(staff_list)}
+    date_pos = {d: i for i, d in enumerate(dates)}
+    pinned_days = np.zeros((len(staff_list), len(dates)), dtype=bool)
+    for a in fixed_assignments or []:
+        if a.staff_id in staff_pos and a.date in date_pos:
+            pinned_days[staff_pos[a.staff_id], date_pos[a.date]] = True
+    pinned_on = _assignment_cells(fixed_assignments or [], staff_list, dates, slots)
+    return pinned_on, pinned_days
+
+
+def _symmetry_classes(
+    staff_list: list[Staff],
+    dates: list[date],
     requests: list[StaffRequest],
-    max_consecutive_days: int = 6,
-    time_limit: int = 30,
-    config: SolverConfig | None = None,
-    role_requirements: list[RoleStaffingRequirement] | None = None,
-    _skip_diagnostics: bool = False,
-    prefix_assignments: dict[int, list] | None = None,
-    staff_skills: list[StaffSkill] | None = None,
-    skill_requirements: list[SkillRequirement] | None = None,
-) -> dict:
-    if config is None:
-        config = _default_config()
-        config.max_consecutive_days = max_consecutive_days
-        config.time_limit = time_limit
+    staff_skills: list[StaffSkill] | None,
+    pinned_days: np.ndarray,
+    prefix_assignments: dict[int, list] | None,
+) -> list[list[int]]:
+    """入れ替えても解の価値が変わらないスタッフの同値類（2人以上のもの）を index で返す
+
+    ロール・スキル・週の最大/最低勤務日数が同じで、期間内の希望・不可日、
+    手動確定、前期間からの連勤のいずれも持たないスタッフを同じクラスとみなす。
+    """
+    period_dates = set(dates)
+    has_request = {r.staff_id for r in requests if r.date in period_dates}
+    has_prefix = {sid for sid, days in (prefix_assignments or {}).items() if days}
+    skills: dict[int, set[str]] = defaultdict(set)
+    for ss in staff_skills or []:
+        skills[ss.staff_id].add(ss.skill)
+    classes: dict[tuple, list[int]] = defaultdict(list)
+    for i, s in enumerate(staff_list):
+        if (
+            s.max_days_per_week <= 0
+            or s.id in has_request
+            or s.id in has_prefix
+            or pinned_days[i].any()
+        ):
+            continue
+        key = (s.role, s.max_days_per_week, s.min_days_per_week, frozenset(skills[s.id]))
+        classes[key].append(i)
+    return [members for members in classes.values() if len(members) > 1]
+
+
+@dataclass
+class ScheduleModel:
+    """行列モデルと (スタッフ, 日付, シフト枠) → 列番号の疎インデックス"""
+    model: MipModel
+    x: np.ndarray  # (S, D, T)。変数を作らなかったセルは ABSENT、手動確定の勤務は FIXED_ONE
+    works: np.ndarray  # (S, D)。その日に勤務するかの列（x と同じ番兵値）
+    unavailable: np.ndarray  # (S, D)
+    symmetry_classes: list[list[int]] = field(default_factory=list)
+
+    def selected(self, col_values: np.ndarray) -> np.ndarray:
+        """解で 1 になったセルを (S, D, T) の真偽値配列で返す"""
+        exists = self.x >= 0
+        hit = np.zeros(self.x.shape, dtype=bool)
+        hit[exists] = col_values[self.x[exists]] > 0.5
+        return hit
+
+    def start_from(self, cells: np.ndarray) -> MipStart:
+        """(S, D, T) の割り当てセルを x・works 列の初期解に変換する（列のないセルは無視）"""
+        exists = self.x >= 0
+        index, values = self.x[exists], cells[exists].astype(np.float64)
+        if self.x.shape[2] > 1:
+            # works も与えておくと、連勤・週上限などの行も初期解の判定に含まれる
+            own = self.works >= 0
+            index = np.concatenate([index, self.works[own]])
+            values = np.concatenate([values, cells.any(axis=2)[own].astype(np.float64)])
+        return index, values
+
+    def stats(self) -> dict:
+        """モデル規模と、密なモデルに比べて削減した変数・行の数"""
+        n_slots = self.x.shape[2]
+        return {
+            "variables": self.model.num_col,
+            "constraints": self.model.num_row,
+            "nonzeros": self.model.num_nz,
+            "eliminated_variables": int((self.x < 0).sum()),
+            "fixed_variables": int((self.x == FIXED_ONE).sum()),
+            # 不可日ごとの x == 0 行は変数ごと不要になり、項が消えて自明になった行は追加しない
+            "eliminated_rows": int(self.unavailable.sum()) * n_slots + self.model.redundant_rows,
+            "symmetry_classes": len(self.symmetry_classes),
+            "symmetric_staff": sum(len(c) for c in self.symmetry_classes),
+            "family_rows": self.model.family_counts(),
+        }
 
-    if role_requirements is None:
-        role_requirements = []
 
-    # 日付リスト
-    num_days = (period.end_date - period.start_date).days + 1
-    dates = [period.start_date + timedelta(days=i) for i in range(num_days)]
-
-    # 不可日マップ
-    unavailable = set()
+def _build_model(
+    dates: list[date],
+    staff_list: list[Staff],
+    slots: list[ShiftSlot],
+    req_map: dict[tuple[int, str], int],
+    requests: list[StaffRequest],
+    config: SolverConfig,
+    role_requirements: list[RoleStaffingRequirement],
+    prefix_assignments: dict[int, list] | None,
+    staff_skills: list[StaffSkill] | None,
+    skill_requirements: list[SkillRequirement] | None,
+    fixed_assignments: list[ScheduleAssignment] | None = None,
+    elastic: bool = False,
+) -> ScheduleModel:
+    """制約行列を NumPy 配列で組み立てる
+
+    x 変数は勤務しうるセルにだけ作る。不可日・週勤務上限 0 のスタッフのセルは
+    列を持たず、以降の各制約は存在する列だけを参照する。
+    手動編集で確定した日も列を持たず、勤務セルの分だけ各行の右辺から差し引く。
+    日単位の制約（連勤・週上限・最低勤務日数・公平性）は x を枠ごとに足し直さず、
+    1日1シフト行で sum_t x = works と定義した works[s, d] を参照する
+    （枠が1つなら x そのものを works として使う）。
+    elastic=True（弾性診断用）では不可日のセルにも列を作り、unavail 行で 0 に抑える。
+    入れ替え可能なスタッフのクラスは常に検出し、config.enable_symmetry_breaking では
+    クラス内で期間中の勤務日数が非増加になる順序制約（symmetry 行）を加える
+    （弾性診断では加えない）。
+    行の並びと制約ファミリー名は従来の PuLP 版と同じ
+    （staffing_, consec_, weekly_, interval_, role_, mindays_, revcycle_, skill_ など）。
+    """
+    S, D, T = len(staff_list), len(dates), len(slots)
+    staff_pos = {s.id: i for i, s in enumerate(staff_list)}
+    date_pos = {d: i for i, d in enumerate(dates)}
+    slot_pos = {t.id: k for k, t in enumerate(slots)}
+    day_types = [_get_day_type(d) for d in dates]
+
+    demand = np.array(
+        [[req_map.get((t.id, dt), 0) for t in slots] for dt in day_types],
+        dtype=np.float64,
+    ).reshape(D, T)
+
+    unavailable = np.zeros((S, D), dtype=bool)
     for req in requests:
-        if req.type == "unavailable":
-            unavailable.add((req.staff_id, req.date))
-
-    # 必要人数マップ
-    req_map = {}
-    for r in requirements:
-        req_map[(r.shift_slot_id, r.day_type)] = r.min_count
-
-    # --- PuLP モデル構築 ---
-    prob = LpProblem("ShiftScheduling", LpMinimize)
+        if req.type == "unavailable" and req.staff_id in staff_pos and req.date in date_pos:
+            unavailable[staff_pos[req.staff_id], date_pos[req.date]] = True
 
-    # 決定変数
-    x = {}
-    for s in staff_list:
-        for d in dates:
-            for t in slots:
-                x[(s.id, d, t.id)] = LpVariable(
-                    f"x_{s.id}_{d}_{t.id}", cat="Binary"
-                )
+    b = ModelBuilder()
 
     # === 目的関数の構築 ===
-    objective_terms = []
-
-    # ベース: 超過人数の最小化
-    objective_terms.append(
-        lpSum(
-            x[(s.id, d, t.id)]
-            for s in staff_list
-            for d in dates
-            for t in slots
-        )
-        - lpSum(
-            req_map.get((t.id, _get_day_type(d)), 0)
-            for d in dates
-            for t in slots
-        )
-    )
+
+    # ベース: 超過人数の最小化（sum x - sum 必要人数）
+    x_cost = np.ones((S, D, T))
+    b.offset = -demand.sum()
 
     # A1: 希望シフト反映
     if config.enable_preferred_shift:
-        preferred_map = _build_preferred_map(requests)
-        preferred_bonus = []
-        for s in staff_list:
-            for d in dates:
-                for t in slots:
-                    # shift_slot_id 指定ありの preferred
-                    if (s.id, d, t.id) in preferred_map:
-                        preferred_bonus.append(x[(s.id, d, t.id)])
-                    # shift_slot_id なしの preferred（当日のどの枠でも OK）
-                    elif (s.id, d, None) in preferred_map:
-                        preferred_bonus.append(x[(s.id, d, t.id)])
-        if preferred_bonus:
-            objective_terms.append(-config.weight_preferred * lpSum(preferred_bonus))
+        preferred = np.zeros((S, D, T), dtype=bool)
+        for (staff_id, d, slot_id) in _build_preferred_map(requests):
+            if staff_id not in staff_pos or d not in date_pos:
+                continue
+            if slot_id is None:
+                # shift_slot_id なしの preferred（当日のどの枠でも OK）
+                preferred[staff_pos[staff_id], date_pos[d], :] = True
+            elif slot_id in slot_pos:
+                preferred[staff_pos[staff_id], date_pos[d], slot_pos[slot_id]] = True
+        x_cost -= config.weight_preferred * preferred
+
+    # 決定変数（疎インデックス）
+    max_days = np.array([s.max_days_per_week for s in staff_list], dtype=np.float64)
+    pinned_on, pinned_days = _pinned_cells(fixed_assignments, staff_list, dates, slots)
+    blocked = pinned_days if elastic else unavailable | pinned_days
+    workable = np.broadcast_to(
+        (~blocked & (max_days > 0)[:, None])[:, :, None], (S, D, T)
+    )
+    x = np.full((S, D, T), ABSENT, dtype=np.int64)
+    x[workable] = b.add_cols(int(workable.sum()), cost=x_cost[workable])
+    x[pinned_on] = FIXED_ONE
+    b.offset += x_cost[pinned_on].sum()
+
+    # 勤務日変数 works[s, d] = sum_t x[s, d, t]。日単位の行はすべてこれを参照する
+    if T == 1:
+        works = x[:, :, 0].copy()
+    else:
+        works = np.full((S, D), ABSENT, dtype=np.int64)
+        has_cols = (x >= 0).any(axis=2)
+        works[has_cols] = b.add_cols(int(has_cols.sum()))
+        works[pinned_on.any(axis=2)] = FIXED_ONE
 
     # A2: 公平性（均等配分）
     if config.enable_fairness:
-        z_max = LpVariable("z_max", lowBound=0)
-        z_min = LpVariable("z_min", lowBound=0)
-        for s in staff_list:
-            total = lpSum(x[(s.id, d, t.id)] for d in dates for t in slots)
-            prob += total <= z_max, f"fairmax_{s.id}"
-            prob += total >= z_min, f"fairmin_{s.id}"
-        objective_terms.append(config.weight_fairness * (z_max - z_min))
+        z_max, z_min = b.add_cols(
+            2, cost=[config.weight_fairness, -config.weight_fairness],
+            upper=INF, integer=False,
+        )
+        ones = np.ones((S, D))
+        b.add_rows(
+            "fairmax", np.hstack([works, np.full((S, 1), z_max)]),
+            upper=0, coefs=np.hstack([ones, -np.ones((S, 1))]),
+        )
+        b.add_rows(
+            "fairmin", np.hstack([works, np.full((S, 1), z_min)]),
+            lower=0, coefs=np.hstack([ones, -np.ones((S, 1))]),
+        )
 
     # A3: 土日祝の公平配分
     if config.enable_weekend_fairness:
-        weekend_dates = [d for d in dates if d.weekday() >= 5]
-        if weekend_dates:
-            zw_max = LpVariable("zw_max", lowBound=0)
-            zw_min = LpVariable("zw_min", lowBound=0)
-            for s in staff_list:
-                total = lpSum(
-                    x[(s.id, d, t.id)] for d in weekend_dates for t in slots
-                )
-                prob += total <= zw_max, f"wfairmax_{s.id}"
-                prob += total >= zw_min, f"wfairmin_{s.id}"
-            objective_terms.append(
-                config.weight_weekend_fairness * (zw_max - zw_min)
+        weekend_idx = [i for i, d in enumerate(dates) if d.weekday() >= 5]
+        if weekend_idx:
+            zw_max, zw_min = b.add_cols(
+                2, cost=[config.weight_weekend_fairness, -config.weight_weekend_fairness],
+                upper=INF, integer=False,
             )
-
-    # C7: 必要人数のソフト制約化（スラック変数）
-    slack_vars = {}
-    if config.enable_soft_staffing:
-        for d in dates:
-            for t in slots:
-                min_count = req_map.get((t.id, _get_day_type(d)), 0)
-                if min_count > 0:
-                    u = LpVariable(f"u_{d}_{t.id}", lowBound=0)
-                    slack_vars[(d, t.id)] = u
-        if slack_vars:
-            objective_terms.append(
-                config.weight_soft_staffing * lpSum(slack_vars.values())
+            xw = works[:, weekend_idx]
+            ones = np.ones(xw.shape)
+            b.add_rows(
+                "wfairmax", np.hstack([xw, np.full((S, 1), zw_max)]),
+                upper=0, coefs=np.hstack([ones, -np.ones((S, 1))]),
+            )
+            b.add_rows(
+                "wfairmin", np.hstack([xw, np.full((S, 1), zw_min)]),
+                lower=0, coefs=np.hstack([ones, -np.ones((S, 1))]),
             )
 
-    prob += lpSum(objective_terms)
+    # C7: 必要人数のソフト制約化（スラック変数）
+    demand_pos = np.argwhere(demand > 0)
+    slack = None
+    if config.enable_soft_staffing and len(demand_pos):
+        slack = b.add_cols(
+            len(demand_pos), cost=config.weight_soft_staffing,
+            upper=INF, integer=False,
+        )
 
     # === ハード制約 ===
 
-    # 制約1: 1日1シフト
-    for s in staff_list:
-        for d in dates:
-            prob += (
-                lpSum(x[(s.id, d, t.id)] for t in slots) <= 1
-            ), f"one_{s.id}_{d.strftime('%Y%m%d')}"
+    # 制約1: 1日1シフト（works の上限 1 で表し、行は works の定義を兼ねる）
+    one_keys = np.indices((S, D)).reshape(2, -1).T
+    if T == 1:
+        b.add_rows("one", x.reshape(S * D, T), upper=1, keys=one_keys)
+    else:
+        b.add_rows(
+            "one", np.hstack([x.reshape(S * D, T), works.reshape(-1, 1)]),
+            lower=0, upper=0, coefs=np.hstack([np.ones(T), -1.0]), keys=one_keys,
+        )
 
     # 制約2: 必要人数確保
-    for d in dates:
-        for t in slots:
-            min_count = req_map.get((t.id, _get_day_type(d)), 0)
-            if min_count > 0:
-                cname = f"staffing_{d.strftime('%Y%m%d')}_{t.id}"
-                if config.enable_soft_staffing:
-                    u = slack_vars.get((d, t.id))
-                    if u is not None:
-                        prob += (
-                            lpSum(x[(s.id, d, t.id)] for s in staff_list) + u
-                            >= min_count
-                        ), cname
-                else:
-                    prob += (
-                        lpSum(x[(s.id, d, t.id)] for s in staff_list)
-                        >= min_count
-                    ), cname
-
-    # 制約3: 不可日
-    for s in staff_list:
-        for d in dates:
-            if (s.id, d) in unavailable:
-                for t in slots:
-                    prob += (
-                        x[(s.id, d, t.id)] == 0
-                    ), f"unavail_{s.id}_{d.strftime('%Y%m%d')}_{t.id}"
+    if len(demand_pos):
+        cols = x[:, demand_pos[:, 0], demand_pos[:, 1]].T
+        if slack is not None:
+            cols = np.hstack([cols, slack[:, None]])
+        b.add_rows(
+            "staffing", cols,
+            lower=demand[demand_pos[:, 0], demand_pos[:, 1]], keys=demand_pos,
+        )
+
+    # 制約3: 不可日 → 該当セルの変数を作らないことで表現済み
+    # （弾性診断では緩和量を測るため、手動確定日以外の不可日を行として持つ）
+    if elastic:
+        unavail_pos = np.argwhere(unavailable & ~pinned_days)
+        b.add_rows(
+            "unavail", x[unavail_pos[:, 0], unavail_pos[:, 1], :], upper=0, keys=unavail_pos,
+        )
 
     # 制約4: 連勤制限
-    _prefix = prefix_assignments or {}
-    for s in staff_list:
-        for i in range(len(dates) - config.max_consecutive_days):
-            window = dates[i : i + config.max_consecutive_days + 1]
-            prob += (
-                lpSum(x[(s.id, d, t.id)] for d in window for t in slots)
-                <= config.max_consecutive_days
-            ), f"consec_{s.id}_{dates[i].strftime('%Y%m%d')}"
-
-    # 月またぎ連勤制約: 期間先頭 max_consecutive_days 日間に prefix を加算
-    if _prefix:
-        for s in staff_list:
-            prefix_dates = _prefix.get(s.id, [])
-            if not prefix_dates:
-                continue
-            prefix_set = set(prefix_dates)
-            # dates[0] の前日から遡って連続する勤務日数を数える
-            prefix_count = 0
-            check_date = dates[0] - timedelta(days=1)
-            while check_date in prefix_set:
-                prefix_count += 1
-                check_date -= timedelta(days=1)
-                if prefix_count >= config.max_consecutive_days:
-                    break
-            if prefix_count == 0:
-                continue
-            # 今期の先頭 1〜max_consecutive_days 日のウィンドウ（prefix_count 分が確定済み）
-            for i in range(min(config.max_consecutive_days, len(dates))):
-                current_window = dates[: i + 1]
-                prob += (
-                    prefix_count + lpSum(x[(s.id, d, t.id)] for d in current_window for t in slots)
-                    <= config.max_consecutive_days
-                ), f"consec_prefix_{s.id}_{i}"
+    W = config.max_consecutive_days
+    if 0 <= W < D:
+        windows = sliding_window_view(works, W + 1, axis=1)  # (S, D - W, W + 1)
+        b.add_rows(
+            "consec", windows.reshape(S * (D - W), -1), upper=W,
+            keys=np.indices((S, D - W)).reshape(2, -1).T,
+        )
+
+    # 月またぎ連勤制約: 前期間の末尾から続く連勤を含む W+1 日の窓
+    if prefix_assignments and W >= 0:
+        prefix_rows, prefix_upper, prefix_keys = [], [], []
+        runs = np.minimum(_prefix_runs(prefix_assignments, staff_list, dates[0]), W)
+        for s_idx in np.nonzero(runs)[0]:
+            # 今期の先頭 i+1 日と前期間の末尾 W-i 日の窓。前期間側がすべて連勤の
+            # 範囲に入る窓だけが縛りになる（休みを含む窓は上限を超えない）
+            for i in range(W - int(runs[s_idx]), min(W, D)):
+                prefix_rows.append(works[s_idx, : i + 1])
+                prefix_upper.append(i)
+                prefix_keys.append((s_idx, i))
+        if prefix_rows:
+            b.add_rows("consec_prefix", prefix_rows, upper=prefix_upper, keys=prefix_keys)
 
     # 制約5: 週あたり勤務上限
-    for s in staff_list:
-        weeks: dict[date, list[date]] = defaultdict(list)
-        for d in dates:
-            week_start = d - timedelta(days=d.weekday())
-            weeks[week_start].append(d)
-        for week_start, week_dates in weeks.items():
-            prob += (
-                lpSum(x[(s.id, d, t.id)] for d in week_dates for t in slots)
-                <= s.max_days_per_week
-            ), f"weekly_{s.id}_{week_start.strftime('%Y%m%d')}"
+    week_starts, day_mat = _week_matrix(dates)
+    x_weeks = _gather_days(works[:, :, None], day_mat)  # (S, 週数, 7)
+    n_weeks = len(week_starts)
+    week_ordinals = np.array([ws.toordinal() for ws in week_starts], dtype=np.int64)
+    b.add_rows(
+        "weekly", x_weeks.reshape(S * n_weeks, -1), upper=np.repeat(max_days, n_weeks),
+        keys=np.column_stack([np.repeat(np.arange(S), n_weeks), np.tile(week_ordinals, S)]),
+    )
 
     # B4: シフト間インターバル
-    if config.enable_shift_interval:
-        conflict_pairs = []
-        for t_a in slots:
-            for t_b in slots:
-                if _shifts_conflict(t_a, t_b, config.min_shift_interval_hours):
-                    conflict_pairs.append((t_a.id, t_b.id))
+    if config.enable_shift_interval and D > 1:
+        conflict_pairs = [
+            (a, b_)
+            for a, t_a in enumerate(slots)
+            for b_, t_b in enumerate(slots)
+            if _shifts_conflict(t_a, t_b, config.min_shift_interval_hours)
+        ]
         if conflict_pairs:
-            for s in staff_list:
-                for i in range(len(dates) - 1):
-                    d1 = dates[i]
-                    d2 = dates[i + 1]
-                    for t_a_id, t_b_id in conflict_pairs:
-                        prob += (
-                            x[(s.id, d1, t_a_id)] + x[(s.id, d2, t_b_id)] <= 1
-                        ), f"interval_{s.id}_{d1.strftime('%Y%m%d')}_{t_a_id}_{t_b_id}"
+            _clique_rows(b, "interval", x, works, conflict_pairs)
 
     # B5: ロール別必要人数
     if config.enable_role_staffing and role_requirements:
         for ri, rr in enumerate(role_requirements):
-            eligible = [s for s in staff_list if s.role == rr.role]
-            for d in dates:
-                if _get_day_type(d) == rr.day_type:
-                    prob += (
-                        lpSum(x[(s.id, d, rr.shift_slot_id)] for s in eligible)
-                        >= rr.min_count
-                    ), f"role_{ri}_{d.strftime('%Y%m%d')}_{rr.shift_slot_id}"
+            if rr.shift_slot_id not in slot_pos:
+                continue
+            eligible = [i for i, s in enumerate(staff_list) if s.role == rr.role]
+            days = [i for i, dt in enumerate(day_types) if dt == rr.day_type]
+            if not days:
+                continue
+            cols = x[eligible][:, days, slot_pos[rr.shift_slot_id]].T
+            b.add_rows(
+                "role", cols, lower=rr.min_count,
+                keys=[(ri, d_idx, slot_pos[rr.shift_slot_id]) for d_idx in days],
+            )
 
     # B6: 最低勤務日数/週
     if config.enable_min_days_per_week:
-        for s in staff_list:
-            if s.min_days_per_week > 0:
-                weeks_min: dict[date, list[date]] = defaultdict(list)
-                for d in dates:
-                    week_start = d - timedelta(days=d.weekday())
-                    weeks_min[week_start].append(d)
-                for week_start, week_dates in weeks_min.items():
-                    prob += (
-                        lpSum(
-                            x[(s.id, d, t.id)] for d in week_dates for t in slots
-                        )
-                        >= s.min_days_per_week
-                    ), f"mindays_{s.id}_{week_start.strftime('%Y%m%d')}"
+        min_staff = [i for i, s in enumerate(staff_list) if s.min_days_per_week > 0]
+        if min_staff:
+            min_days = np.array(
+                [staff_list[i].min_days_per_week for i in min_staff], dtype=np.float64
+            )
+            b.add_rows(
+                "mindays", x_weeks[min_staff].reshape(len(min_staff) * n_weeks, -1),
+                lower=np.repeat(min_days, n_weeks),
+                keys=np.column_stack([
+                    np.repeat(min_staff, n_weeks), np.tile(week_ordinals, len(min_staff)),
+                ]),
+            )
 
     # B7: 逆循環禁止（遅番翌日の早番を禁止）
     # 翌日の開始時刻 < 前日の開始時刻 となる組み合わせを禁止する
-    if config.enable_reverse_cycle_prohibition:
+    if config.enable_reverse_cycle_prohibition and D > 1:
         reverse_pairs = [
-            (t_a.id, t_b.id)
-            for t_a in slots
-            for t_b in slots
+            (a, b_)
+            for a, t_a in enumerate(slots)
+            for b_, t_b in enumerate(slots)
             if t_b.start_time < t_a.start_time
         ]
         if reverse_pairs:
-            for s in staff_list:
-                for i in range(len(dates) - 1):
-                    d1, d2 = dates[i], dates[i + 1]
-                    for t_a_id, t_b_id in reverse_pairs:
-                        prob += (
-                            x[(s.id, d1, t_a_id)] + x[(s.id, d2, t_b_id)] <= 1
-                        ), f"revcycle_{s.id}_{d1.strftime('%Y%m%d')}_{t_a_id}_{t_b_id}"
+            _clique_rows(b, "revcycle", x, works, reverse_pairs)
 
     # B8: スキル配置制約（有資格者を指定シフトに最低人数確保）
     if config.enable_skill_staffing and skill_requirements:
@@ -706,45 +1524,154 @@ def solve_schedule(
         for ss in (staff_skills or []):
             skills_map.setdefault(ss.staff_id, set()).add(ss.skill)
         for sr in skill_requirements:
-            eligible = [s for s in staff_list if sr.skill in skills_map.get(s.id, set())]
+            if sr.shift_slot_id not in slot_pos:
+                continue
+            eligible = [
+                i for i, s in enumerate(staff_list) if sr.skill in skills_map.get(s.id, set())
+            ]
             if not eligible:
                 # 有資格者がいない場合は制約をスキップ（infeasibleを避けるため）
                 continue
-            for d in dates:
-                if _get_day_type(d) == sr.day_type:
-                    prob += (
-                        lpSum(x[(s.id, d, sr.shift_slot_id)] for s in eligible)
-                        >= sr.min_count
-                    ), f"skill_{sr.id}_{d.strftime('%Y%m%d')}_{sr.shift_slot_id}"
+            days = [i for i, dt in enumerate(day_types) if dt == sr.day_type]
+            if not days:
+                continue
+            cols = x[eligible][:, days, slot_pos[sr.shift_slot_id]].T
+            b.add_rows(
+                "skill", cols, lower=sr.min_count,
+                keys=[(sr.id, d_idx, slot_pos[sr.shift_slot_id]) for d_idx in days],
+            )
+
+    # 対称性の除去: 同じクラスのスタッフは入れ替えても実行可能性も目的値も変わらない
+    # ため、クラス内の並び順で勤務日数が非増加になる解だけを探索させる
+    classes = _symmetry_classes(
+        staff_list, dates, requests, staff_skills, pinned_days, prefix_assignments,
+    )
+    if config.enable_symmetry_breaking and not elastic:
+        for members in classes:
+            upper_staff, lower_staff = np.array(members[:-1]), np.array(members[1:])
+            ones = np.ones((len(upper_staff), D))
+            b.add_rows(
+                "symmetry",
+                np.hstack([works[upper_staff], works[lower_staff]]),
+                lower=0, coefs=np.hstack([ones, -ones]),
+                keys=np.column_stack([upper_staff, lower_staff]),
+            )
+
+    return ScheduleModel(
+        model=b.build(), x=x, works=works, unavailable=unavailable,
+        symmetry_classes=classes,
+    )
+
+
+def solve_schedule(
+    period: SchedulePeriod,
+    staff_list: list[Staff],
+    slots: list[ShiftSlot],
+    requirements: list[StaffingRequirement],
+    requests: list[StaffRequest],
+    max_consecutive_days: int = 6,
+    time_limit: int = 30,
+    config: SolverConfig | None = None,
+    role_requirements: list[RoleStaffingRequirement] | None = None,
+    _skip_diagnostics: bool = False,
+    prefix_assignments: dict[int, list] | None = None,
+    staff_skills: list[StaffSkill] | None = None,
+    skill_requirements: list[SkillRequirement] | None = None,
+    initial_assignments: list[ScheduleAssignment] | None = None,
+    fixed_assignments: list[ScheduleAssignment] | None = None,
+    progress_callback: ProgressCallback | None = None,
+    stop_event: threading.Event | None = None,
+) -> dict:
+    """シフトを最適化する
+
+    fixed_assignments（手動編集）のスタッフ・日付は確定済みとして扱い、
+    返す assignments にはソルバーが決めたセルだけを含める。
+    progress_callback には暫定解の目的値・双対境界・ギャップ・経過秒が通知され、
+    stop_event をセットすると求解を中断する。
+    """
+    if config is None:
+        config = _default_config()
+        config.max_consecutive_days = max_consecutive_days
+        config.time_limit = time_limit
+
+    if role_requirements is None:
+        role_requirements = []
+
+    # 日付リスト
+    num_days = (period.end_date - period.start_date).days + 1
+    dates = [period.start_date + timedelta(days=i) for i in range(num_days)]
+
+    # 必要人数マップ
+    req_map = {}
+    for r in requirements:
+        req_map[(r.shift_slot_id, r.day_type)] = r.min_count
+
+    # --- 行列モデル構築 ---
+    with span("build_model"):
+        built = _build_model(
+            dates, staff_list, slots, req_map, requests, config, role_requirements,
+            prefix_assignments, staff_skills, skill_requirements, fixed_assignments,
+        )
+
+    # 既存の割り当てを MIP の初期解として渡す
+    start = None
+    warm_start = None
+    if initial_assignments:
+        start = built.start_from(
+            _assignment_cells(initial_assignments, staff_list, dates, slots)
+        )
+        warm_start = {
+            "provided": True,
+            "accepted": built.model.start_is_feasible(*start),
+        }
 
     # === 求解 ===
-    _used_highs = False
-    try:
-        import pulp as _pulp
-        import highspy as _highspy
-
-        _highs_solver = _pulp.HiGHS(
-            msg=False,
-            timeLimit=float(config.time_limit),
-            iis=True,
-            iis_strategy=int(_highspy.IisStrategy.kIisStrategyIrreducible),
+    params = _solver_params(config)
+    race = None
+    decomposition = None
+    lazy = None
+    n_components = 1
+    if (
+        config.enable_decomposition
+        and not config.enable_solver_race
+        and not config.enable_lazy_constraints
+        and progress_callback is None
+        and built.model.num_col >= _DECOMPOSE_MIN_COLUMNS
+    ):
+        # 公平性の行を除くと独立な部分問題に分かれるなら、成分ごとに並列に解く
+        shared_rows = built.model.family_rows(set(_COUPLING_FAMILIES))
+        labels, n_components = built.model.components(shared_rows)
+        labels, n_components = _pack_components(
+            labels, n_components, _DECOMPOSE_MIN_COMPONENT_COLUMNS,
         )
-        if _highs_solver.available():
-            prob.solve(_highs_solver)
-            _used_highs = True
+    with span("solve"):
+        if config.enable_solver_race:
+            # 使えるソルバーを別プロセスで同時に走らせ、先に決着したものを採用する
+            outcome, race = race_model(
+                built.model, config.time_limit, start, params, stop_event,
+            )
+        elif config.enable_lazy_constraints:
+            # インターバル・逆循環の行は違反したものだけを足しながら解き直す
+            outcome, lazy = _solve_lazy(
+                built.model, config.time_limit, start, progress_callback, stop_event, params,
+            )
+        elif n_components > 1:
+            outcome, decomposition = _solve_decomposed(
+                built.model, labels, n_components, shared_rows, config.time_limit, start, params,
+            )
         else:
-            raise ImportError("HiGHS not available")
-    except Exception:
-        try:
-            from pulp import SCIP_CMD
-            prob.solve(SCIP_CMD(msg=0, timeLimit=config.time_limit))
-        except Exception:
-            from pulp import PULP_CBC_CMD
-            prob.solve(PULP_CBC_CMD(msg=0, timeLimit=config.time_limit))
+            outcome = solve_model(
+                built.model, config.time_limit, start, progress_callback, stop_event, params,
+            )
+    if warm_start is not None:
+        warm_start["solve_seconds"] = round(outcome.solve_seconds, 3)
+        # 初期解なしで解いた場合との差は測れないため、制限時間に対する余裕を報告する
+        warm_start["time_limit_headroom_seconds"] = round(
+            max(config.time_limit - outcome.solve_seconds, 0.0), 3
+        )
 
-    if prob.status != 1:
-        # status 0 = Not Solved (timeout), -1 = Infeasible
-        if prob.status == 0:
+    if outcome.status not in ("optimal", "feasible"):
+        if outcome.status == "timeout":
             return {
                 "status": "timeout",
                 "message": "制限時間内に解が見つかりませんでした。制限時間を延長するか、制約を緩和してください。",
@@ -754,60 +1681,138 @@ def solve_schedule(
                     severity="warning",
                     message=f"制限時間({config.time_limit}秒)内に解が見つかりませんでした。設定画面で制限時間を延長してください。",
                 )] if not _skip_diagnostics else [],
+                "model_stats": built.stats(),
+                "warm_start": warm_start,
+                "solver_params": asdict(params),
+                "race": race,
+                "decomposition": decomposition,
+                "lazy": lazy,
+            }
+
+        if outcome.status == "error":
+            # ソルバー自体が失敗した（レースで全バックエンドが異常終了した等）。
+            # 実行不能とは限らないので診断は行わない
+            return {
+                "status": "error",
+                "message": "ソルバーの実行に失敗しました。時間をおいて再実行してください。",
+                "assignments": [],
+                "diagnostics": [],
+                "model_stats": built.stats(),
+                "warm_start": warm_start,
+                "solver_params": asdict(params),
+                "race": race,
+                "decomposition": decomposition,
+                "lazy": lazy,
             }
 
         # Infeasible: run diagnostics
         diagnostics: list[DiagnosticItem] = []
+        probes: list[dict] = []
         if not _skip_diagnostics:
-            # Phase 1: プリソルブチェック（算術的に明らかな問題）
-            num_days = (period.end_date - period.start_date).days + 1
-            all_dates = [period.start_date + timedelta(days=i) for i in range(num_days)]
-            presolve = _presolve_checks(
-                all_dates, staff_list, slots, requirements, requests, config,
-                role_requirements if role_requirements else [],
-            )
-            if presolve:
-                diagnostics = presolve
-            elif _used_highs:
-                # Phase 2: HiGHS IIS で正確な原因特定
-                diagnostics = _diagnose_with_highs_iis(prob, staff_list, slots)
-                if not diagnostics:
-                    # IIS が空の場合は制約緩和テストにフォールバック
-                    diagnostics = _try_solve_relaxed(
-                        period, staff_list, slots, requirements, requests,
-                        config, role_requirements if role_requirements else [],
-                    )
-            else:
-                # Phase 2 (フォールバック): 制約緩和テスト
-                diagnostics = _try_solve_relaxed(
-                    period, staff_list, slots, requirements, requests,
-                    config, role_requirements if role_requirements else [],
+            with span("diagnostics"):
+                # IIS・弾性モデル・制約緩和テストは合わせて制限時間に収める
+                deadline = time.perf_counter() + config.time_limit
+                # Phase 1: プリソルブチェック（算術的に明らかな問題）
+                presolve = _presolve_checks(
+                    dates, staff_list, slots, requirements, requests, config,
+                    role_requirements, staff_skills, skill_requirements,
+                    fixed_assignments, prefix_assignments,
                 )
+                if presolve:
+                    diagnostics = presolve
+                else:
+                    if outcome.backend == "highs":
+                        # Phase 2: HiGHS IIS で正確な原因特定
+                        diagnostics = _diagnose_with_highs_iis(
+                            outcome.solver_model, built, staff_list, slots, dates,
+                        )
+                    if not diagnostics:
+                        # Phase 3: IIS が空か CBC の場合は弾性モデルを1回だけ解く
+                        elastic = _build_model(
+                            dates, staff_list, slots, req_map, requests, config,
+                            role_requirements, prefix_assignments, staff_skills,
+                            skill_requirements, fixed_assignments, elastic=True,
+                        )
+                        diagnostics = _diagnose_with_elastic(
+                            elastic, staff_list, slots, dates,
+                            deadline - time.perf_counter(),
+                        )
+                    if not diagnostics:
+                        # Phase 4: 弾性モデルも時間内に解けなければ制約緩和テスト
+                        diagnostics, probes = _try_solve_relaxed(
+                            period, staff_list, slots, requirements, requests,
+                            config, role_requirements, prefix_assignments,
+                            staff_skills, skill_requirements, fixed_assignments,
+                            deadline,
+                        )
 
         return {
             "status": "infeasible",
             "message": "実行可能なシフトが見つかりませんでした。下記の診断結果を確認してください。" if diagnostics else "実行可能なシフトが見つかりませんでした。制約を緩和してください。",
             "assignments": [],
             "diagnostics": diagnostics,
+            "diagnostic_probes": probes,
+            "model_stats": built.stats(),
+            "warm_start": warm_start,
+            "solver_params": asdict(params),
+            "race": race,
+            "decomposition": decomposition,
+            "lazy": lazy,
         }
 
     # 結果の抽出
-    assignments = []
-    for s in staff_list:
-        for d in dates:
-            for t in slots:
-                if value(x[(s.id, d, t.id)]) > 0.5:
-                    assignments.append(
-                        {
-                            "staff_id": s.id,
-                            "date": d.isoformat(),
-                            "shift_slot_id": t.id,
-                        }
-                    )
+    s_idx, d_idx, t_idx = np.nonzero(built.selected(outcome.col_values))
+    assignments = [
+        {
+            "staff_id": staff_list[i].id,
+            "date": dates[j].isoformat(),
+            "shift_slot_id": slots[k].id,
+        }
+        for i, j, k in zip(s_idx, d_idx, t_idx)
+    ]
+
+    diagnostics = []
+    message = "最適なシフトが見つかりました。"
+    if (
+        outcome.status == "feasible"
+        and decomposition is not None
+        and all(st == "optimal" for st in decomposition["statuses"])
+    ):
+        # 成分はすべて最適。公平性だけが成分ごとの最適化になっている
+        message = f"{decomposition['components']} 個の独立な部分問題に分けて最適化しました。"
+        if not _skip_diagnostics:
+            diagnostics.append(DiagnosticItem(
+                constraint="decomposition",
+                severity="warning",
+                message="公平性の項は部分問題ごとに最適化しています。全体での公平性は最適とは限りません。",
+                details=decomposition["coupled_terms"],
+            ))
+    elif outcome.status == "feasible":
+        # 時間切れ・中断時の暫定解。ギャップを添えて呼び出し側に採否を委ねる
+        gap = (
+            f"最適解との差は最大 {outcome.mip_gap * 100:.1f}%"
+            if outcome.mip_gap is not None else "最適解との差は不明"
+        )
+        message = f"制限時間内に最適性は証明できませんでしたが、実行可能なシフトが見つかりました（{gap}）。"
+        if not _skip_diagnostics:
+            diagnostics.append(DiagnosticItem(
+                constraint="timeout",
+                severity="warning",
+                message=f"制限時間({config.time_limit}秒)で打ち切った暫定解です（{gap}）。制限時間を延長すると改善する可能性があります。",
+            ))
 
     return {
-        "status": "optimal",
-        "message": "最適なシフトが見つかりました。",
+        "status": outcome.status,
+        "message": message,
         "assignments": assignments,
-        "diagnostics": [],
+        "diagnostics": diagnostics,
+        "objective": outcome.objective,
+        "mip_gap": outcome.mip_gap,
+        "mip_bound": outcome.bound,
+        "model_stats": built.stats(),
+        "warm_start": warm_start,
+        "solver_params": asdict(params),
+        "race": race,
+        "decomposition": decomposition,
+        "lazy": lazy,
     }
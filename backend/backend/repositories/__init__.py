@@ -6,6 +6,7 @@ from backend.repositories.schedule import ScheduleRepository
 from backend.repositories.solver_config import SolverConfigRepository
 from backend.repositories.role_staffing_requirement import RoleStaffingRequirementRepository
 from backend.repositories.skill import SkillRepository
+from backend.repositories.optimization_job import OptimizationJobRepository
 
 __all__ = [
     "StaffRepository",
@@ -16,4 +17,5 @@ __all__ = [
     "SolverConfigRepository",
     "RoleStaffingRequirementRepository",
     "SkillRepository",
+    "OptimizationJobRepository",
 ]
@@ -0,0 +1,67 @@
+import json
+from datetime import datetime
+
+from sqlalchemy.orm import Session
+
+from backend.domain import OptimizationJob
+from backend.models import OptimizationJobModel
+
+
+class OptimizationJobRepository:
+    def __init__(self, db: Session):
+        self.db = db
+
+    @staticmethod
+    def _to_domain(model: OptimizationJobModel) -> OptimizationJob:
+        return OptimizationJob(
+            id=model.id,
+            period_id=model.period_id,
+            status=model.status,
+            created_at=model.created_at,
+            started_at=model.started_at,
+            finished_at=model.finished_at,
+            result=json.loads(model.result) if model.result else None,
+            error=model.error,
+            kind=model.kind,
+            params=json.loads(model.params) if model.params else None,
+        )
+
+    def create(
+        self, period_id: int, kind: str = "optimize", params: dict | None = None,
+    ) -> OptimizationJob:
+        model = OptimizationJobModel(
+            period_id=period_id, status="queued", created_at=datetime.now(), kind=kind,
+            params=json.dumps(params, ensure_ascii=False) if params is not None else None,
+        )
+        self.db.add(model)
+        self.db.commit()
+        self.db.refresh(model)
+        return self._to_domain(model)
+
+    def get(self, job_id: int) -> OptimizationJob | None:
+        model = self.db.get(OptimizationJobModel, job_id)
+        return self._to_domain(model) if model else None
+
+    def transition(
+        self, job_id: int, from_statuses: tuple[str, ...], status: str, **fields
+    ) -> OptimizationJob | None:
+        """現在の状態が from_statuses のいずれかの場合だけ status に遷移させる
+
+        API とワーカーが別セッションから同じジョブを更新するため、状態の確認と
+        更新を1つの UPDATE 文で行う。遷移しなかった場合は None を返す。
+        """
+        if "result" in fields and fields["result"] is not None:
+            fields["result"] = json.dumps(fields["result"], ensure_ascii=False)
+        updated = (
+            self.db.query(OptimizationJobModel)
+            .filter(
+                OptimizationJobModel.id == job_id,
+                OptimizationJobModel.status.in_(from_statuses),
+            )
+            .update({"status": status, **fields}, synchronize_session=False)
+        )
+        self.db.commit()
+        if not updated:
+            return None
+        self.db.expire_all()
+        return self.get(job_id)
@@ -28,6 +28,14 @@ class SolverConfigRepository:
             weight_fairness=model.weight_fairness,
             weight_weekend_fairness=model.weight_weekend_fairness,
             weight_soft_staffing=model.weight_soft_staffing,
+            solver_profile=model.solver_profile,
+            mip_rel_gap=model.mip_rel_gap,
+            solver_threads=model.solver_threads,
+            random_seed=model.random_seed,
+            enable_solver_race=model.enable_solver_race,
+            enable_symmetry_breaking=model.enable_symmetry_breaking,
+            enable_lazy_constraints=model.enable_lazy_constraints,
+            enable_decomposition=model.enable_decomposition,
         )
 
     def get_or_create_default(self) -> SolverConfig:
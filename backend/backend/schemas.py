@@ -1,6 +1,16 @@
-from datetime import date, time
+from datetime import date, datetime, time
+from typing import Literal
 
-from pydantic import BaseModel
+from pydantic import BaseModel, Field, model_validator
+
+SolverProfile = Literal["fast_draft", "balanced", "prove_optimal"]
+# mip: 通常の最適化、draft: 貪欲法による即時の下書き、lns: 既存解からの近傍探索、
+# rolling: 重なりのあるウィンドウに分けて順に解く
+OptimizeMode = Literal["mip", "draft", "lns", "rolling"]
+
+WeightName = Literal[
+    "weight_preferred", "weight_fairness", "weight_weekend_fairness", "weight_soft_staffing",
+]
 
 
 # --- Staff ---
@@ -137,12 +147,139 @@ class DiagnosticItemSchema(BaseModel):
     details: list[str] | None = None
 
 
+class DiagnosticProbeSchema(BaseModel):
+    constraint: str
+    status: str  # "optimal", "feasible", "infeasible", "timeout", "cut_off", "error"
+    seconds: float | None = None
+    cut_off: bool
+
+
 # --- Optimize ---
+class SolverParamsSchema(BaseModel):
+    profile: str
+    mip_rel_gap: float
+    threads: int
+    random_seed: int
+    heuristic_effort: float
+
+
+class RaceBackendSchema(BaseModel):
+    backend: str
+    status: str  # "optimal", "feasible", "infeasible", "timeout", "error", "killed"
+    seconds: float
+    objective: float | None = None
+
+
+class RaceReportSchema(BaseModel):
+    winner: str | None = None
+    backends: list[RaceBackendSchema]
+
+
+class WarmStartSchema(BaseModel):
+    provided: bool
+    accepted: bool
+    solve_seconds: float | None = None
+    time_limit_headroom_seconds: float | None = None
+
+
+class UncoveredDemandSchema(BaseModel):
+    date: date
+    shift_slot_id: int
+    constraint: str  # "C2_staffing", "B5_role_staffing", "B8_skill_staffing"
+    label: str | None = None  # ロール名・スキル名
+    required: int
+    assigned: int
+
+
+class LnsStepSchema(BaseModel):
+    elapsed: float
+    objective: float
+    neighborhood: str  # "week:<先頭日 index>", "role:<ロール>", "staff:<人数>" または初期解の出所
+    improved: bool
+
+
+class LnsReportSchema(BaseModel):
+    start: str  # 初期解の出所: "initial_assignments", "draft", "mip"
+    iterations: int
+    improvements: int
+    initial_objective: float
+    history: list[LnsStepSchema]
+
+
+class RollingWindowSchema(BaseModel):
+    start: date
+    end: date
+    commit_end: date  # このウィンドウで確定した最終日
+    status: str
+    objective: float | None = None
+    time_limit: float | None = None  # 全体の制限時間から割り当てた秒数
+
+
+class RollingReportSchema(BaseModel):
+    window_days: int
+    commit_days: int
+    windows: list[RollingWindowSchema]
+    solve_seconds: float
+
+
+class DecompositionReportSchema(BaseModel):
+    components: int
+    component_columns: list[int]
+    statuses: list[str]
+    coupled_terms: list[str]  # 成分ごとに最適化した目的項（"fairness", "weekend_fairness"）
+
+
+class LazyRowsReportSchema(BaseModel):
+    rounds: int  # 求解した回数
+    rows_added: int  # 違反して追加したインターバル・逆循環の行数
+    lazy_rows: int  # 元のモデルにあるインターバル・逆循環の行数
+    model_rows: int  # 元のモデルの行数
+
+
+class ModelStatsSchema(BaseModel):
+    variables: int
+    constraints: int
+    nonzeros: int
+    eliminated_variables: int
+    fixed_variables: int
+    eliminated_rows: int
+    symmetry_classes: int  # 入れ替え可能なスタッフのクラス数（2人以上のもの）
+    symmetric_staff: int
+    family_rows: dict[str, int] = {}  # 制約ファミリーごとの行数
+
+
+class MetricsSpanSchema(BaseModel):
+    name: str  # 入れ子のフェーズは "/" でつなぐ（例: "optimize/build_model"）
+    seconds: float
+    count: int  # 同じフェーズを繰り返した回数（ローリングホライズンのウィンドウなど）
+
+
+class MetricsSchema(BaseModel):
+    total_seconds: float
+    spans: list[MetricsSpanSchema]
+    model: ModelStatsSchema | None = None
+
+
 class OptimizeResponse(BaseModel):
-    status: str  # "optimal", "infeasible", "timeout"
+    status: str  # "optimal", "feasible", "infeasible", "timeout", "draft", "error"
     message: str
     assignments: list[ScheduleAssignmentResponse]
     diagnostics: list[DiagnosticItemSchema] = []
+    diagnostic_probes: list[DiagnosticProbeSchema] = []
+    warm_start: WarmStartSchema | None = None
+    objective: float | None = None
+    mip_gap: float | None = None  # feasible 時の相対ギャップ（0.05 = 最大 5% 悪い）
+    mip_bound: float | None = None
+    solver_params: SolverParamsSchema | None = None
+    race: RaceReportSchema | None = None
+    uncovered: list[UncoveredDemandSchema] = []  # draft で埋められなかった需要
+    lns: LnsReportSchema | None = None
+    rolling: RollingReportSchema | None = None
+    decomposition: DecompositionReportSchema | None = None
+    model_stats: ModelStatsSchema | None = None
+    lazy: LazyRowsReportSchema | None = None
+    metrics: MetricsSchema | None = None
+    cached: bool = False  # 同じ入力の前回の結果をキャッシュから返した
 
 
 # --- SolverConfig ---
@@ -163,6 +300,25 @@ class SolverConfigUpdate(BaseModel):
     weight_fairness: float | None = None
     weight_weekend_fairness: float | None = None
     weight_soft_staffing: float | None = None
+    solver_profile: SolverProfile | None = None
+    mip_rel_gap: float | None = Field(default=None, ge=0, le=1)
+    solver_threads: int | None = Field(default=None, ge=0)
+    random_seed: int | None = Field(default=None, ge=0)
+    enable_solver_race: bool | None = None
+    enable_symmetry_breaking: bool | None = None
+    enable_lazy_constraints: bool | None = None
+    enable_decomposition: bool | None = None
+
+    @model_validator(mode="after")
+    def _reject_nulls(self):
+        """省略は「変更しない」。null を明示できるのは None に意味がある mip_rel_gap だけ"""
+        nulls = sorted(
+            name for name in self.model_fields_set
+            if getattr(self, name) is None and name != "mip_rel_gap"
+        )
+        if nulls:
+            raise ValueError(f"null is not allowed for: {', '.join(nulls)}")
+        return self
 
 
 class SolverConfigResponse(BaseModel):
@@ -183,6 +339,14 @@ class SolverConfigResponse(BaseModel):
     weight_fairness: float
     weight_weekend_fairness: float
     weight_soft_staffing: float
+    solver_profile: str
+    mip_rel_gap: float | None
+    solver_threads: int
+    random_seed: int
+    enable_solver_race: bool
+    enable_symmetry_breaking: bool
+    enable_lazy_constraints: bool
+    enable_decomposition: bool
 
     model_config = {"from_attributes": True}
 
@@ -205,6 +369,57 @@ class RoleStaffingRequirementResponse(BaseModel):
     model_config = {"from_attributes": True}
 
 
+# --- What-if シナリオ ---
+class ScenarioSpec(BaseModel):
+    name: str
+    config: SolverConfigUpdate = SolverConfigUpdate()  # 指定した項目だけ上書き
+    requirements: list[StaffingRequirementCreate] = []  # 同じ枠・曜日区分は上書き、なければ追加
+    role_requirements: list[RoleStaffingRequirementCreate] = []
+
+
+class ScenarioBatchRequest(BaseModel):
+    scenarios: list[ScenarioSpec] = Field(min_length=1, max_length=16)
+
+
+class ScenarioResultSchema(BaseModel):
+    name: str
+    status: str
+    message: str
+    objective: float | None = None
+    shortfall: int | None = None  # 必要人数に足りない人数の合計
+    fairness_spread: int | None = None  # 勤務日数の最大と最小の差
+    preferences_satisfied: int | None = None  # かなえた勤務希望の件数
+    solve_seconds: float | None = None
+
+
+class ScenarioComparisonResponse(BaseModel):
+    scenarios: list[ScenarioResultSchema]
+
+
+class WeightSweepRequest(BaseModel):
+    grid: dict[WeightName, list[float]] = Field(min_length=1)  # 重みごとの候補値
+    random_samples: int = Field(default=0, ge=0, le=64)  # 正なら直積ではなく範囲から抽出
+    seed: int = 0
+    time_limit: int | None = Field(default=None, ge=1)  # 1点あたり。None なら設定の値
+
+
+class WeightSweepPointSchema(BaseModel):
+    weights: dict[str, float]
+    status: str
+    message: str
+    objective: float | None = None
+    shortfall: int | None = None
+    fairness_spread: int | None = None
+    preferences_satisfied: int | None = None
+    solve_seconds: float | None = None
+    warm_started: bool = False  # 隣の点の解を初期解として受理した
+    pareto: bool = False  # 希望・勤務日数の差・不足のどれでも他の点に負けない
+
+
+class WeightSweepResponse(BaseModel):
+    points: list[WeightSweepPointSchema]
+
+
 # --- StaffSkill ---
 class StaffSkillCreate(BaseModel):
     skill: str
@@ -234,3 +449,19 @@ class SkillRequirementResponse(BaseModel):
     min_count: int
 
     model_config = {"from_attributes": True}
+
+
+# --- OptimizationJob ---
+class OptimizationJobResponse(BaseModel):
+    id: int
+    period_id: int
+    kind: str = "optimize"  # "optimize", "scenarios", "weight_sweep"
+    status: str  # "queued", "running", "completed", "failed", "cancelled"
+    created_at: datetime
+    started_at: datetime | None = None
+    finished_at: datetime | None = None
+    # kind に応じて OptimizeResponse / ScenarioComparisonResponse / WeightSweepResponse
+    result: OptimizeResponse | ScenarioComparisonResponse | WeightSweepResponse | None = None
+    error: str | None = None
+
+    model_config = {"from_attributes": True}
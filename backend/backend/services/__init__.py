@@ -1,7 +1,20 @@
 from backend.services.request import RequestService
 from backend.services.schedule import ScheduleService
+from backend.services.optimization_job import (
+    OptimizationJobRunner,
+    OptimizationJobService,
+    get_job_runner,
+    shutdown_job_runner,
+)
+from backend.services.result_cache import ResultCache, get_result_cache
 
 __all__ = [
     "RequestService",
     "ScheduleService",
+    "OptimizationJobRunner",
+    "OptimizationJobService",
+    "get_job_runner",
+    "shutdown_job_runner",
+    "ResultCache",
+    "get_result_cache",
 ]
@@ -0,0 +1,368 @@
+import multiprocessing
+import os
+import signal
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+from datetime import datetime
+
+from sqlalchemy.orm import Session, sessionmaker
+
+from backend.database import SessionLocal
+from backend.domain import OptimizationJob
+from backend.optimizer.backends import _kill_process_group, own_highs_scheduler
+from backend.optimizer.draft import draft_schedule
+from backend.optimizer.lns import improve_schedule
+from backend.optimizer.metrics import Metrics, collect, current_metrics, span
+from backend.optimizer.rolling import solve_rolling_horizon
+from backend.optimizer.scenarios import solve_scenarios, sweep_weights, weight_points
+from backend.optimizer.solver import solve_schedule
+from backend.repositories import OptimizationJobRepository, ScheduleRepository
+from backend.schemas import ScenarioComparisonResponse, WeightSweepResponse
+from backend.services.result_cache import get_result_cache, solve_key
+from backend.services.schedule import ScheduleService, to_optimize_response
+
+# 同時に走らせる最適化ジョブの上限（API のワーカースレッドとは別枠）
+_DEFAULT_MAX_WORKERS = int(os.environ.get("OPTIMIZATION_WORKERS", "2"))
+
+_ACTIVE_STATUSES = ("queued", "running")
+
+
+def _solve_in_subprocess(solve_kwargs: dict, conn, solve=solve_schedule) -> None:
+    """子プロセス側: 求解して結果をパイプで親に返す（計測したスパンを spans に添える）
+
+    新しいセッションを作ってプロセスグループの先頭になり、キャンセル時に親が
+    プロセスプールのワーカーや CBC の実行ファイルごとグループで止められるようにする。
+    求解は別スレッドで行い、HiGHS の求解中でもメインスレッドで SIGTERM を受ける。
+    """
+    if hasattr(os, "setsid"):
+        os.setsid()
+        signal.signal(signal.SIGTERM, _stop_solver_processes)
+    own_highs_scheduler()
+    worker = threading.Thread(
+        target=_send_result, args=(solve, solve_kwargs, conn), daemon=True,
+    )
+    worker.start()
+    worker.join()
+
+
+def _send_result(solve, solve_kwargs: dict, conn) -> None:
+    try:
+        with collect(Metrics()) as metrics:
+            result = solve(**solve_kwargs)
+        result["spans"] = metrics.report()["spans"]
+        conn.send(("ok", result))
+    except Exception as e:
+        conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def _compare_scenarios(solve_kwargs: dict, scenarios: list[dict]) -> dict:
+    """子プロセス側: what-if シナリオをプロセスプールで並列に解く"""
+    return {"scenarios": solve_scenarios(solve_kwargs, scenarios)}
+
+
+def _sweep_weights(solve_kwargs: dict, points: list[dict[str, float]]) -> dict:
+    """子プロセス側: 重みの組ごとにプロセスプールで並列に解く"""
+    return {"points": sweep_weights(solve_kwargs, points)}
+
+
+def _optimize_task(params: dict, solve_kwargs: dict) -> tuple:
+    """最適化ジョブの (子プロセスで呼ぶ関数, 引数)。mode=mip の関数は None（ランナーの既定）"""
+    mode = params.get("mode", "mip")
+    if mode == "draft":
+        solve_kwargs.pop("initial_assignments")
+        return draft_schedule, solve_kwargs
+    if mode == "lns":
+        return improve_schedule, solve_kwargs
+    if mode == "rolling":
+        return solve_rolling_horizon, {
+            **solve_kwargs,
+            "window_days": params["window_days"],
+            "commit_days": params["commit_days"],
+        }
+    return None, solve_kwargs
+
+
+def _batch_task(job: OptimizationJob, solve_kwargs: dict) -> tuple:
+    """比較ジョブの (子プロセスで呼ぶ関数, 引数, 結果のスキーマ)"""
+    params = job.params or {}
+    if job.kind == "scenarios":
+        return _compare_scenarios, {
+            "solve_kwargs": solve_kwargs, "scenarios": params["scenarios"],
+        }, ScenarioComparisonResponse
+    if params.get("time_limit") is not None:
+        solve_kwargs["config"] = replace(solve_kwargs["config"], time_limit=params["time_limit"])
+    points = weight_points(params["grid"], params.get("random_samples", 0), params.get("seed", 0))
+    return _sweep_weights, {"solve_kwargs": solve_kwargs, "points": points}, WeightSweepResponse
+
+
+def _stop_solver_processes(signum, frame) -> None:
+    """子プロセス側の SIGTERM: 別グループで動くレースのプロセスを止めてからグループごと終了する"""
+    for process in multiprocessing.active_children():
+        _kill_process_group(process)
+    os.killpg(0, signal.SIGKILL)
+
+
+def _stop_job_process(process: multiprocessing.process.BaseProcess) -> None:
+    """求解の子プロセスをプロセスグループごと止める（グループを作る前ならその子だけ）"""
+    if hasattr(os, "killpg"):
+        try:
+            os.killpg(process.pid, signal.SIGTERM)
+            return
+        except (ProcessLookupError, PermissionError):
+            pass
+    process.terminate()
+
+
+class OptimizationJobRunner:
+    """最適化ジョブをソルバー専用の子プロセスで実行する
+
+    ジョブごとに spawn した子プロセスで solve_schedule を呼び、親側のスレッドが
+    DB の読み書き（入力の収集と結果の保存）を担当する。キャンセル時は子プロセスの
+    プロセスグループ（診断・分割のプロセスプールやレースのプロセスを含む）をまとめて
+    止めるので、HiGHS の求解中でもすぐに止まる。
+    """
+
+    def __init__(
+        self,
+        session_factory: sessionmaker = SessionLocal,
+        max_workers: int = _DEFAULT_MAX_WORKERS,
+        solve=solve_schedule,
+    ):
+        self._session_factory = session_factory
+        self._solve_fn = solve  # 子プロセスで呼ぶ関数（spawn で渡すのでモジュールの関数に限る）
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="optimization-job",
+        )
+        self._mp = multiprocessing.get_context("spawn")
+        self._lock = threading.Lock()
+        self._processes: dict[int, multiprocessing.process.BaseProcess] = {}
+        self._cancelled: set[int] = set()
+        self._jobs: set[int] = set()  # 受け付けてまだ終わっていないジョブ
+
+    def submit(self, job_id: int) -> None:
+        with self._lock:
+            self._jobs.add(job_id)
+        self._executor.submit(self._run, job_id)
+
+    def cancel(self, job_id: int) -> None:
+        """以後このジョブの結果を保存しない（求解中の子プロセスは stop で止める）"""
+        with self._lock:
+            self._cancelled.add(job_id)
+
+    def stop(self, job_id: int) -> None:
+        with self._lock:
+            process = self._processes.get(job_id)
+        if process is not None and process.is_alive():
+            _stop_job_process(process)
+
+    def shutdown(self) -> None:
+        """求解中の子プロセスを止め、終わらなかったジョブを failed にする"""
+        with self._lock:
+            processes = list(self._processes.values())
+        for process in processes:
+            if process.is_alive():
+                _stop_job_process(process)
+        self._executor.shutdown(wait=True, cancel_futures=True)
+        with self._lock:
+            abandoned = sorted(self._jobs)
+            self._jobs.clear()
+        if not abandoned:
+            return
+        # 実行前に取り消された queued のジョブが残らないようにする
+        db = self._session_factory()
+        try:
+            jobs = OptimizationJobRepository(db)
+            for job_id in abandoned:
+                jobs.transition(
+                    job_id, _ACTIVE_STATUSES, "failed",
+                    finished_at=datetime.now(), error="Server shut down before the job finished",
+                )
+        finally:
+            db.close()
+
+    def _run(self, job_id: int) -> None:
+        db = self._session_factory()
+        try:
+            with collect(Metrics()):
+                self._run_job(db, job_id)
+        except Exception as e:
+            OptimizationJobRepository(db).transition(
+                job_id, _ACTIVE_STATUSES, "failed",
+                finished_at=datetime.now(), error=f"{type(e).__name__}: {e}",
+            )
+        finally:
+            with self._lock:
+                self._processes.pop(job_id, None)
+                self._cancelled.discard(job_id)
+                self._jobs.discard(job_id)
+            db.close()
+
+    def _run_job(self, db: Session, job_id: int) -> None:
+        jobs = OptimizationJobRepository(db)
+        job = jobs.transition(job_id, ("queued",), "running", started_at=datetime.now())
+        if job is None:
+            return  # 実行前にキャンセルされた
+
+        service = ScheduleService(db)
+        with span("load_data"):
+            solve_kwargs = service.prepare_optimization(job.period_id)
+        if solve_kwargs is None:
+            jobs.transition(
+                job_id, ("running",), "failed",
+                finished_at=datetime.now(), error="Schedule period not found",
+            )
+            return
+
+        if job.kind != "optimize":
+            self._run_batch(jobs, job, solve_kwargs)
+            return
+
+        # キャッシュするのは mode=mip の結果だけ（POST /optimize と同じ）
+        params = job.params or {}
+        cache = get_result_cache()
+        key = solve_key(solve_kwargs) if params.get("mode", "mip") == "mip" else None
+        cached = cache.get(key) if key is not None else None
+        if cached is not None:
+            outcome, payload = "ok", {**cached, "cached": True}
+        else:
+            solve, kwargs = _optimize_task(params, solve_kwargs)
+            solved = self._solve(job_id, kwargs, solve)
+            if solved is None:
+                return  # 子プロセスを起動する前にキャンセルされた
+            outcome, payload = solved
+            if outcome == "ok" and key is not None:
+                cache.put(key, payload)
+
+        with self._lock:
+            if job_id in self._cancelled:
+                return
+            if outcome == "error":
+                jobs.transition(
+                    job_id, ("running",), "failed",
+                    finished_at=datetime.now(), error=payload,
+                )
+                return
+            result = service.apply_optimization(job.period_id, payload)
+            jobs.transition(
+                job_id, ("running",), "completed",
+                finished_at=datetime.now(),
+                result=to_optimize_response(result).model_dump(mode="json"),
+            )
+
+    def _run_batch(
+        self, jobs: OptimizationJobRepository, job: OptimizationJob, solve_kwargs: dict,
+    ) -> None:
+        """シナリオ比較・重みスイープを子プロセスで解き、比較表を結果に保存する（割り当ては保存しない）"""
+        solve, kwargs, schema = _batch_task(job, solve_kwargs)
+        solved = self._solve(job.id, kwargs, solve)
+        if solved is None:
+            return
+        outcome, payload = solved
+        with self._lock:
+            if job.id in self._cancelled:
+                return
+            if outcome == "error":
+                jobs.transition(
+                    job.id, ("running",), "failed",
+                    finished_at=datetime.now(), error=payload,
+                )
+                return
+            jobs.transition(
+                job.id, ("running",), "completed",
+                finished_at=datetime.now(),
+                result=schema(**payload).model_dump(mode="json"),
+            )
+
+    def _solve(
+        self, job_id: int, solve_kwargs: dict, solve=None,
+    ) -> tuple[str, object] | None:
+        """子プロセスで solve（既定は solve_schedule）を呼び、("ok", 結果) か ("error", メッセージ) を返す"""
+        parent_conn, child_conn = self._mp.Pipe(duplex=False)
+        process = self._mp.Process(
+            target=_solve_in_subprocess,
+            args=(solve_kwargs, child_conn, solve or self._solve_fn),
+            # daemon にするとレース・診断のプロセスを子として起こせない（止めるのは shutdown）
+            daemon=False,
+        )
+        with self._lock:
+            if job_id in self._cancelled:
+                return None
+            process.start()
+            self._processes[job_id] = process
+        child_conn.close()
+
+        with span("optimize"):
+            try:
+                outcome, payload = parent_conn.recv()
+            except EOFError:
+                # terminate されたか、結果を送る前に異常終了した
+                outcome, payload = "error", f"Solver process exited with code {process.exitcode}"
+            finally:
+                parent_conn.close()
+                process.join()
+        if outcome == "ok":
+            # 子プロセスで測ったモデル構築・求解などのスパンを optimize の下に取り込む
+            current_metrics().merge(payload.pop("spans", []), prefix="optimize")
+        return outcome, payload
+
+
+_runner: OptimizationJobRunner | None = None
+
+
+def get_job_runner() -> OptimizationJobRunner:
+    global _runner
+    if _runner is None:
+        _runner = OptimizationJobRunner()
+    return _runner
+
+
+def shutdown_job_runner() -> None:
+    """アプリの終了時に呼ぶ: 求解の子プロセスを残さない（ランナー未作成なら何もしない）"""
+    global _runner
+    if _runner is not None:
+        _runner.shutdown()
+        _runner = None
+
+
+class OptimizationJobService:
+    def __init__(self, db: Session, runner: OptimizationJobRunner):
+        self._job_repo = OptimizationJobRepository(db)
+        self._schedule_repo = ScheduleRepository(db)
+        self._runner = runner
+
+    def submit(
+        self, period_id: int, kind: str = "optimize", params: dict | None = None,
+    ) -> OptimizationJob | None:
+        """ジョブを登録して実行待ちに入れる
+
+        kind が "optimize" なら params に {"mode", "window_days", "commit_days"}（省略時は
+        mode=mip）、"scenarios" なら {"scenarios": [...]}、"weight_sweep" なら
+        {"grid", "random_samples", "seed", "time_limit"} を渡す。
+        """
+        if self._schedule_repo.get_period(period_id) is None:
+            return None
+        job = self._job_repo.create(period_id, kind, params)
+        self._runner.submit(job.id)
+        return job
+
+    def get(self, job_id: int) -> OptimizationJob | None:
+        return self._job_repo.get(job_id)
+
+    def cancel(self, job_id: int) -> OptimizationJob | None:
+        """未完了のジョブをキャンセルする。完了済みのジョブはそのまま返す"""
+        job = self._job_repo.get(job_id)
+        if job is None or job.status not in _ACTIVE_STATUSES:
+            return job
+        # 先にランナーへ伝える。DB を先に cancelled にすると、その直後に求解が
+        # 終わったワーカーが割り当てを保存してしまう（完了への遷移だけが失敗する）
+        self._runner.cancel(job_id)
+        cancelled = self._job_repo.transition(
+            job_id, _ACTIVE_STATUSES, "cancelled", finished_at=datetime.now(),
+        )
+        if cancelled is None:
+            return self._job_repo.get(job_id)  # 直前に完了した
+        self._runner.stop(job_id)
+        return cancelled
@@ -0,0 +1,122 @@
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import asdict, is_dataclass
+from datetime import date, time as time_of_day
+
+# キャッシュする結果の上限件数と有効期限（秒）
+_DEFAULT_MAX_ENTRIES = int(os.environ.get("RESULT_CACHE_SIZE", "32"))
+_DEFAULT_TTL_SECONDS = float(os.environ.get("RESULT_CACHE_TTL", "900"))
+
+# 入力だけで決まる結果だけを保存する（時間切れの暫定解は解き直すと改善しうる）
+_CACHEABLE_STATUSES = ("optimal", "infeasible")
+# 制約緩和テストが決着したとみなすステータス（時間切れ・打ち切り・異常終了は除く）
+_SETTLED_PROBE_STATUSES = ("optimal", "feasible", "infeasible")
+
+# 解を変えない引数（初期解は探索の出発点にすぎない）
+_IGNORED_ARGS = ("initial_assignments", "progress_callback", "stop_event")
+
+
+def solve_key(solve_kwargs: dict) -> str:
+    """solve_schedule の入力の正規化ハッシュ
+
+    リストは要素の順序に依存しないよう並べ替え、手動確定（fixed_assignments）は
+    ID ではなくスタッフ・日付・枠で比べる。
+    """
+    canonical = {
+        name: _canonical(value, name)
+        for name, value in sorted(solve_kwargs.items())
+        if name not in _IGNORED_ARGS
+    }
+    payload = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+def _cacheable(result: dict) -> bool:
+    """実行不能の診断は、制約緩和テストがすべて決着した場合だけ入力で決まる
+
+    打ち切られたテストがある診断は混み具合で変わるので、解き直せば埋まりうる。
+    """
+    if result["status"] not in _CACHEABLE_STATUSES:
+        return False
+    return all(
+        probe["status"] in _SETTLED_PROBE_STATUSES
+        for probe in result.get("diagnostic_probes") or []
+    )
+
+
+def _canonical(value, name: str = ""):
+    if is_dataclass(value):
+        data = asdict(value)
+        if name == "fixed_assignments":
+            data = {k: data[k] for k in ("staff_id", "date", "shift_slot_id")}
+        return _canonical(data)
+    if isinstance(value, dict):
+        return {str(k): _canonical(v, name) for k, v in value.items()}
+    if isinstance(value, (list, tuple, set)):
+        items = [_canonical(v, name) for v in value]
+        return sorted(items, key=lambda v: json.dumps(v, sort_keys=True))
+    if isinstance(value, (date, time_of_day)):
+        return value.isoformat()
+    return value
+
+
+class ResultCache:
+    """同じ入力の最適化結果を使い回す LRU キャッシュ（有効期限つき）"""
+
+    def __init__(
+        self,
+        max_entries: int = _DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = _DEFAULT_TTL_SECONDS,
+        clock=time.monotonic,
+    ):
+        self._max_entries = max_entries
+        self._ttl = ttl_seconds
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._entries: OrderedDict[str, tuple[float, dict]] = OrderedDict()
+
+    def get(self, key: str) -> dict | None:
+        """期限内の結果のコピーを返す（なければ None）"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            stored_at, result = entry
+            if self._clock() - stored_at > self._ttl:
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return copy.deepcopy(result)
+
+    def put(self, key: str, result: dict) -> bool:
+        """入力だけで決まる結果なら保存する。保存したら True"""
+        if not _cacheable(result) or self._max_entries <= 0:
+            return False
+        with self._lock:
+            self._entries[key] = (self._clock(), copy.deepcopy(result))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self._max_entries:
+                self._entries.popitem(last=False)
+        return True
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+_cache: ResultCache | None = None
+
+
+def get_result_cache() -> ResultCache:
+    global _cache
+    if _cache is None:
+        _cache = ResultCache()
+    return _cache
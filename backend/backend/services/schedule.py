@@ -1,9 +1,21 @@
+import logging
+import queue
+import threading
+from collections.abc import Iterator
 from dataclasses import dataclass
 from datetime import date, timedelta
 
 from sqlalchemy.orm import Session
 
 from backend.domain import DiagnosticItem, ScheduleAssignment, SchedulePeriod
+from backend.optimizer.draft import draft_schedule
+from backend.optimizer.lns import improve_schedule
+from backend.optimizer.metrics import Metrics, collect, current_metrics, span
+from backend.optimizer.rolling import (
+    DEFAULT_COMMIT_DAYS,
+    DEFAULT_WINDOW_DAYS,
+    solve_rolling_horizon,
+)
 from backend.optimizer.solver import solve_schedule
 from backend.repositories import (
     ScheduleRepository,
@@ -15,7 +27,25 @@ from backend.repositories import (
     RoleStaffingRequirementRepository,
     SkillRepository,
 )
-from backend.schemas import ScheduleResponse
+from backend.services.result_cache import get_result_cache, solve_key
+from backend.schemas import (
+    DecompositionReportSchema,
+    DiagnosticItemSchema,
+    DiagnosticProbeSchema,
+    LazyRowsReportSchema,
+    LnsReportSchema,
+    MetricsSchema,
+    ModelStatsSchema,
+    OptimizeResponse,
+    ScheduleResponse,
+    RaceReportSchema,
+    RollingReportSchema,
+    SolverParamsSchema,
+    UncoveredDemandSchema,
+    WarmStartSchema,
+)
+
+logger = logging.getLogger(__name__)
 
 
 @dataclass
@@ -24,10 +54,29 @@ class OptimizeResult:
     message: str
     assignments: list[ScheduleAssignment]
     diagnostics: list[DiagnosticItem] = None
+    warm_start: dict | None = None
+    diagnostic_probes: list[dict] = None
+    objective: float | None = None
+    mip_gap: float | None = None
+    mip_bound: float | None = None
+    solver_params: dict | None = None
+    race: dict | None = None
+    uncovered: list[dict] = None
+    lns: dict | None = None
+    rolling: dict | None = None
+    decomposition: dict | None = None
+    model_stats: dict | None = None
+    lazy: dict | None = None
+    metrics: dict | None = None
+    cached: bool = False
 
     def __post_init__(self):
         if self.diagnostics is None:
             self.diagnostics = []
+        if self.diagnostic_probes is None:
+            self.diagnostic_probes = []
+        if self.uncovered is None:
+            self.uncovered = []
 
 
 class ScheduleService:
@@ -71,13 +120,51 @@ class ScheduleService:
             return None
         return self._schedule_repo.update_period_status(period_id, "published")
 
-    def optimize(self, period_id: int) -> OptimizeResult | None:
+    def optimize(
+        self,
+        period_id: int,
+        mode: str = "mip",
+        window_days: int = DEFAULT_WINDOW_DAYS,
+        commit_days: int = DEFAULT_COMMIT_DAYS,
+    ) -> OptimizeResult | None:
+        """mode="draft" では MIP を解かずに貪欲法の下書きを作り、
+        mode="lns" では既存の割り当て（なければ下書き）を近傍探索で改善する。
+        mode="rolling" では window_days 日のウィンドウを commit_days 日ずつ確定して進める。
+        mode="mip" は入力が前回と同じならキャッシュの結果を返す（応答の cached）。
+        データ読み込み・求解・保存の各フェーズの時間は結果の metrics に入る。
+        """
+        with collect(Metrics()):
+            with span("load_data"):
+                solve_kwargs = self.prepare_optimization(period_id)
+            if solve_kwargs is None:
+                return None
+            with span("optimize"):
+                if mode == "draft":
+                    solve_kwargs.pop("initial_assignments")
+                    result = draft_schedule(**solve_kwargs)
+                elif mode == "lns":
+                    result = improve_schedule(**solve_kwargs)
+                elif mode == "rolling":
+                    result = solve_rolling_horizon(
+                        **solve_kwargs, window_days=window_days, commit_days=commit_days,
+                    )
+                else:
+                    result = solve_with_cache(solve_kwargs)
+            return self.apply_optimization(period_id, result)
+
+    def prepare_optimization(self, period_id: int) -> dict | None:
+        """solve_schedule に渡す引数を集める（DB は変更しない）
+
+        バックグラウンドジョブでは、この引数だけを別プロセスのソルバーへ渡す。
+        """
         period = self._schedule_repo.get_period(period_id)
         if period is None:
             return None
 
-        # 既存の自動生成結果を削除（手動編集は保持）
-        self._schedule_repo.delete_auto_assignments(period_id)
+        # 直前の割り当てを初期解として使う（手動編集は確定セルとして扱う）
+        previous_assignments = self._schedule_repo.get_assignments_by_period(period_id)
+        manual_assignments = [a for a in previous_assignments if a.is_manual_edit]
+        auto_assignments = [a for a in previous_assignments if not a.is_manual_edit]
 
         # ソルバーに必要なデータを収集
         staff_list = self._staff_repo.list_all()
@@ -104,7 +191,7 @@ class ScheduleService:
                 if a.shift_slot_id is not None and a.date >= tail_start:
                     prefix_assignments.setdefault(a.staff_id, []).append(a.date)
 
-        result = solve_schedule(
+        return dict(
             period=period,
             staff_list=staff_list,
             slots=slots,
@@ -115,20 +202,90 @@ class ScheduleService:
             prefix_assignments=prefix_assignments if prefix_assignments else None,
             staff_skills=staff_skills_data if staff_skills_data else None,
             skill_requirements=skill_requirements_data if skill_requirements_data else None,
+            initial_assignments=auto_assignments if auto_assignments else None,
+            fixed_assignments=manual_assignments if manual_assignments else None,
         )
 
-        diagnostics = result.get("diagnostics", [])
+    def stream_optimization(
+        self, period_id: int, solve_kwargs: dict
+    ) -> Iterator[tuple[str, dict]]:
+        """求解を別スレッドで走らせ、("progress", 進捗) と最後の ("result", 応答) を順に返す
 
-        if result["status"] == "optimal":
-            self._schedule_repo.bulk_create_assignments(
-                period_id, result["assignments"]
-            )
-            saved = self._schedule_repo.get_assignments_by_period(period_id)
+        呼び出し側が途中で反復をやめた場合（クライアント切断）はソルバーを中断し、
+        結果は保存しない。
+        """
+        events: queue.Queue = queue.Queue()
+        stop = threading.Event()
+
+        metrics = Metrics()
+
+        def run() -> None:
+            try:
+                with collect(metrics), span("optimize"):
+                    result = solve_with_cache(
+                        solve_kwargs,
+                        progress_callback=lambda p: events.put(("progress", p)),
+                        stop_event=stop,
+                    )
+                events.put(("done", result))
+            except Exception as e:
+                events.put(("error", {"detail": f"{type(e).__name__}: {e}"}))
+
+        threading.Thread(target=run, name="optimize-stream", daemon=True).start()
+        try:
+            while True:
+                kind, payload = events.get()
+                if kind == "done":
+                    with collect(metrics):
+                        result = self.apply_optimization(period_id, payload)
+                    yield "result", to_optimize_response(result).model_dump(mode="json")
+                    return
+                yield kind, payload
+                if kind == "error":
+                    return
+        finally:
+            stop.set()
+
+    def apply_optimization(self, period_id: int, result: dict) -> OptimizeResult:
+        """solve_schedule の結果で自動生成分の割り当てを置き換える
+
+        記録中の Metrics（collect）があれば、保存の時間も含めた計測結果を
+        metrics に入れてログにも出す。
+        """
+        saved = []
+        with span("save_assignments"):
+            # 既存の自動生成結果を削除（手動編集は保持）
+            self._schedule_repo.delete_auto_assignments(period_id)
+            # 時間切れの暫定解（feasible）と貪欲法の下書き（draft）も最適解と同じく保存する
+            if result["status"] in ("optimal", "feasible", "draft"):
+                self._schedule_repo.bulk_create_assignments(
+                    period_id, result["assignments"]
+                )
+                saved = self._schedule_repo.get_assignments_by_period(period_id)
+        metrics = _metrics_report(period_id, result)
+
+        diagnostics = result.get("diagnostics", [])
+        warm_start = result.get("warm_start")
+        if result["status"] in ("optimal", "feasible", "draft"):
             return OptimizeResult(
                 status=result["status"],
                 message=result["message"],
                 assignments=saved,
                 diagnostics=diagnostics,
+                warm_start=warm_start,
+                objective=result.get("objective"),
+                mip_gap=result.get("mip_gap"),
+                mip_bound=result.get("mip_bound"),
+                solver_params=result.get("solver_params"),
+                race=result.get("race"),
+                uncovered=result.get("uncovered"),
+                lns=result.get("lns"),
+                rolling=result.get("rolling"),
+                decomposition=result.get("decomposition"),
+                model_stats=result.get("model_stats"),
+                lazy=result.get("lazy"),
+                metrics=metrics,
+                cached=result.get("cached", False),
             )
 
         return OptimizeResult(
@@ -136,4 +293,77 @@ class ScheduleService:
             message=result["message"],
             assignments=[],
             diagnostics=diagnostics,
+            warm_start=warm_start,
+            diagnostic_probes=result.get("diagnostic_probes", []),
+            solver_params=result.get("solver_params"),
+            race=result.get("race"),
+            rolling=result.get("rolling"),
+            decomposition=result.get("decomposition"),
+            model_stats=result.get("model_stats"),
+            lazy=result.get("lazy"),
+            metrics=metrics,
+            cached=result.get("cached", False),
         )
+
+
+def solve_with_cache(solve_kwargs: dict, **options) -> dict:
+    """同じ入力の結果がキャッシュにあればそれを返し、なければ解いて保存する
+
+    options（進捗コールバック・中断イベント）は求解するときだけ使う。
+    """
+    cache = get_result_cache()
+    key = solve_key(solve_kwargs)
+    result = cache.get(key)
+    if result is not None:
+        return {**result, "cached": True}
+    result = solve_schedule(**solve_kwargs, **options)
+    cache.put(key, result)
+    return result
+
+
+def _metrics_report(period_id: int, result: dict) -> dict | None:
+    """記録中の Metrics を応答用にまとめ、フェーズごとの時間をログに出す"""
+    metrics = current_metrics()
+    if metrics is None:
+        return None
+    report = {**metrics.report(), "model": result.get("model_stats")}
+    logger.info(
+        "optimize period=%s status=%s total=%.3fs %s",
+        period_id, result["status"], report["total_seconds"],
+        " ".join(f"{s['name']}={s['seconds']:.3f}s" for s in report["spans"]),
+    )
+    return report
+
+
+def to_optimize_response(result: OptimizeResult) -> OptimizeResponse:
+    return OptimizeResponse(
+        status=result.status,
+        message=result.message,
+        assignments=result.assignments,
+        diagnostics=[
+            DiagnosticItemSchema(
+                constraint=d.constraint,
+                severity=d.severity,
+                message=d.message,
+                details=d.details,
+            )
+            for d in result.diagnostics
+        ],
+        diagnostic_probes=[DiagnosticProbeSchema(**p) for p in result.diagnostic_probes],
+        warm_start=WarmStartSchema(**result.warm_start) if result.warm_start else None,
+        objective=result.objective,
+        mip_gap=result.mip_gap,
+        mip_bound=result.mip_bound,
+        solver_params=SolverParamsSchema(**result.solver_params) if result.solver_params else None,
+        race=RaceReportSchema(**result.race) if result.race else None,
+        uncovered=[UncoveredDemandSchema(**u) for u in result.uncovered],
+        lns=LnsReportSchema(**result.lns) if result.lns else None,
+        rolling=RollingReportSchema(**result.rolling) if result.rolling else None,
+        decomposition=(
+            DecompositionReportSchema(**result.decomposition) if result.decomposition else None
+        ),
+        model_stats=ModelStatsSchema(**result.model_stats) if result.model_stats else None,
+        lazy=LazyRowsReportSchema(**result.lazy) if result.lazy else None,
+        metrics=MetricsSchema(**result.metrics) if result.metrics else None,
+        cached=result.cached,
+    )
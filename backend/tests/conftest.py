@@ -8,6 +8,16 @@ from backend.database import Base, get_db
 from backend.main import app
 
 
+@pytest.fixture(autouse=True)
+def clear_result_cache():
+    """テストをまたいで同じ入力の結果がキャッシュから返らないようにする"""
+    from backend.services import get_result_cache
+
+    get_result_cache().clear()
+    yield
+    get_result_cache().clear()
+
+
 @pytest.fixture
 def db_session():
     engine = create_engine(
@@ -30,3 +40,15 @@ def client(db_session):
     app.dependency_overrides[get_db] = override_get_db
     yield TestClient(app)
     app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def job_runner(db_session):
+    from backend.services import OptimizationJobRunner, get_job_runner
+
+    runner = OptimizationJobRunner(
+        session_factory=sessionmaker(bind=db_session.get_bind()), max_workers=1,
+    )
+    app.dependency_overrides[get_job_runner] = lambda: runner
+    yield runner
+    runner.shutdown()
@@ -0,0 +1,255 @@
+import multiprocessing
+import os
+import subprocess
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pytest
+
+from backend.services import get_result_cache
+
+
+def _setup_scenario(client, days: int = 3):
+    for name in ["田中", "佐藤", "鈴木"]:
+        client.post("/api/staff", json={"name": name, "role": "一般"})
+    slot_id = client.post(
+        "/api/shift-slots",
+        json={"name": "早番", "start_time": "09:00:00", "end_time": "17:00:00"},
+    ).json()["id"]
+    client.post(
+        "/api/staffing-requirements",
+        json={"shift_slot_id": slot_id, "day_type": "weekday", "min_count": 2},
+    )
+    return client.post(
+        "/api/schedules",
+        json={"start_date": "2026-03-02", "end_date": f"2026-03-{1 + days:02d}"},
+    ).json()["id"]
+
+
+def _wait_for(client, job_id, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/optimization-jobs/{job_id}").json()
+        if job["status"] not in ("queued", "running"):
+            return job
+        time.sleep(0.1)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def _sleep_in_own_group() -> None:
+    os.setpgrp()  # レースのプロセスと同じく別のプロセスグループに移る
+    time.sleep(600)
+
+
+def _start_sleeper() -> int:
+    return subprocess.Popen(["sleep", "600"]).pid  # CBC の実行ファイルの代わり
+
+
+def _hold_solver_processes(**solve_kwargs) -> dict:
+    """ジョブの求解の代わり: レースとプロセスプール（とその下の実行ファイル）を起こして待つ"""
+    mp = multiprocessing.get_context("spawn")
+    race = mp.Process(target=_sleep_in_own_group, daemon=True)
+    race.start()
+    pool = ProcessPoolExecutor(max_workers=1, mp_context=mp)
+    sleeper = pool.submit(_start_sleeper).result()
+    pids = [race.pid, sleeper, *pool._processes]
+    with open(os.environ["JOB_TEST_PID_FILE"], "w") as f:
+        f.write(" ".join(str(p) for p in pids))
+    time.sleep(600)
+    return {}
+
+
+def _alive(pid: int) -> bool:
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            return f.read().rsplit(")", 1)[1].split()[0] != "Z"
+    except FileNotFoundError:
+        return False
+
+
+def test_submit_job_returns_immediately_and_completes(client, job_runner):
+    period_id = _setup_scenario(client)
+    response = client.post(f"/api/schedules/{period_id}/optimize/jobs")
+    assert response.status_code == 202
+    job = response.json()
+    assert job["status"] in ("queued", "running")
+    assert job["kind"] == "optimize"
+    assert job["result"] is None
+
+    done = _wait_for(client, job["id"])
+    assert done["status"] == "completed"
+    assert done["started_at"] is not None and done["finished_at"] is not None
+    assert done["result"]["status"] == "optimal"
+
+    # 結果は同期版と同じく DB に保存されている
+    saved = client.get(f"/api/schedules/{period_id}").json()["assignments"]
+    assert len(saved) == len(done["result"]["assignments"]) > 0
+
+    # 完了済みのジョブはキャンセルできない
+    assert client.delete(f"/api/optimization-jobs/{job['id']}").status_code == 409
+
+
+def test_submit_rolling_job(client, job_runner):
+    """mode=rolling も同期版と同じ引数でジョブとして解ける"""
+    period_id = _setup_scenario(client)
+    response = client.post(
+        f"/api/schedules/{period_id}/optimize/jobs",
+        params={"mode": "rolling", "window_days": 2, "commit_days": 1},
+    )
+    assert response.status_code == 202
+
+    done = _wait_for(client, response.json()["id"])
+    assert done["status"] == "completed"
+    assert done["result"]["status"] == "feasible"
+    assert [w["commit_end"] for w in done["result"]["rolling"]["windows"]] == [
+        "2026-03-02", "2026-03-04",
+    ]
+    saved = client.get(f"/api/schedules/{period_id}").json()["assignments"]
+    assert len(saved) == len(done["result"]["assignments"]) > 0
+
+    response = client.post(
+        f"/api/schedules/{period_id}/optimize/jobs",
+        params={"mode": "rolling", "window_days": 2, "commit_days": 3},
+    )
+    assert response.status_code == 422
+
+
+def test_submit_job_for_missing_period_returns_404(client, job_runner):
+    assert client.post("/api/schedules/999/optimize/jobs").status_code == 404
+    assert client.get("/api/optimization-jobs/999").status_code == 404
+
+
+def test_cancel_job_keeps_existing_assignments(client, job_runner):
+    period_id = _setup_scenario(client)
+    client.post(f"/api/schedules/{period_id}/optimize")
+    before = client.get(f"/api/schedules/{period_id}").json()["assignments"]
+    # 同じ入力の結果がキャッシュにあるとジョブがキャンセル前に終わってしまう
+    get_result_cache().clear()
+
+    job = client.post(f"/api/schedules/{period_id}/optimize/jobs").json()
+    response = client.delete(f"/api/optimization-jobs/{job['id']}")
+    assert response.status_code == 200
+    assert response.json()["status"] == "cancelled"
+
+    # ワーカーが後から結果を書き込まないこと
+    job_runner.shutdown()
+    assert client.get(f"/api/optimization-jobs/{job['id']}").json()["status"] == "cancelled"
+    after = client.get(f"/api/schedules/{period_id}").json()["assignments"]
+    assert sorted(a["id"] for a in after) == sorted(a["id"] for a in before)
+
+    # キャンセル済みのジョブへの再キャンセルはそのまま返す
+    assert client.delete(f"/api/optimization-jobs/{job['id']}").status_code == 200
+
+
+def test_cancel_between_solve_and_save_keeps_existing_assignments(
+    client, job_runner, monkeypatch,
+):
+    """求解が終わってから結果を保存するまでの間にキャンセルしても割り当ては変わらない"""
+    from backend.repositories import OptimizationJobRepository
+    from backend.services import ScheduleService
+
+    period_id = _setup_scenario(client)
+    client.post(f"/api/schedules/{period_id}/optimize")
+    get_result_cache().clear()
+
+    solved, release, finished = threading.Event(), threading.Event(), threading.Event()
+    solve, run = job_runner._solve, job_runner._run
+
+    def solve_then_wait(*args, **kwargs):
+        result = solve(*args, **kwargs)
+        solved.set()
+        release.wait(60)
+        return result
+
+    def run_then_notify(job_id):
+        try:
+            run(job_id)
+        finally:
+            finished.set()
+
+    transition = OptimizationJobRepository.transition
+
+    def transition_then_save(self, job_id, from_statuses, status, **fields):
+        job = transition(self, job_id, from_statuses, status, **fields)
+        if status == "cancelled":
+            # DB が cancelled になった直後にワーカーを保存まで進める
+            release.set()
+            assert finished.wait(60)
+        return job
+
+    saved = []
+    apply_optimization = ScheduleService.apply_optimization
+
+    def record_save(self, period_id, result):
+        saved.append(period_id)
+        return apply_optimization(self, period_id, result)
+
+    monkeypatch.setattr(ScheduleService, "apply_optimization", record_save)
+    monkeypatch.setattr(job_runner, "_solve", solve_then_wait)
+    monkeypatch.setattr(job_runner, "_run", run_then_notify)
+    monkeypatch.setattr(OptimizationJobRepository, "transition", transition_then_save)
+
+    job = client.post(f"/api/schedules/{period_id}/optimize/jobs").json()
+    assert solved.wait(60)
+    assert client.delete(f"/api/optimization-jobs/{job['id']}").json()["status"] == "cancelled"
+
+    assert client.get(f"/api/optimization-jobs/{job['id']}").json()["status"] == "cancelled"
+    assert saved == []  # ワーカーは割り当てを書き換えていない
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc"), reason="needs /proc to inspect processes")
+def test_cancel_stops_race_and_pool_processes(client, job_runner, tmp_path, monkeypatch):
+    """キャンセルすると、別グループのレースのプロセスやプールのワーカーの下の実行ファイルも残らない"""
+    pid_file = tmp_path / "pids"
+    monkeypatch.setenv("JOB_TEST_PID_FILE", str(pid_file))
+    job_runner._solve_fn = _hold_solver_processes
+    period_id = _setup_scenario(client)
+    job = client.post(f"/api/schedules/{period_id}/optimize/jobs").json()
+
+    deadline = time.monotonic() + 60
+    while not (pid_file.exists() and pid_file.read_text()):
+        assert time.monotonic() < deadline, "solver processes did not start"
+        time.sleep(0.1)
+    pids = [int(p) for p in pid_file.read_text().split()]
+    assert len(pids) == 3 and all(_alive(p) for p in pids)
+
+    assert client.delete(f"/api/optimization-jobs/{job['id']}").json()["status"] == "cancelled"
+    deadline = time.monotonic() + 10
+    while any(_alive(p) for p in pids) and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert [p for p in pids if _alive(p)] == []
+
+
+@pytest.mark.skipif(not os.path.isdir("/proc"), reason="needs /proc to inspect processes")
+def test_app_shutdown_stops_jobs(client, job_runner, tmp_path, monkeypatch):
+    """アプリの終了時に求解の子プロセスを止め、実行中・実行待ちのジョブを failed にする"""
+    from fastapi.testclient import TestClient
+
+    from backend.main import app
+    from backend.services import optimization_job
+
+    pid_file = tmp_path / "pids"
+    monkeypatch.setenv("JOB_TEST_PID_FILE", str(pid_file))
+    monkeypatch.setattr(optimization_job, "_runner", job_runner)
+    job_runner._solve_fn = _hold_solver_processes
+    period_id = _setup_scenario(client)
+    running = client.post(f"/api/schedules/{period_id}/optimize/jobs").json()
+    queued = client.post(f"/api/schedules/{period_id}/optimize/jobs").json()
+
+    deadline = time.monotonic() + 60
+    while not (pid_file.exists() and pid_file.read_text()):
+        assert time.monotonic() < deadline, "solver processes did not start"
+        time.sleep(0.1)
+    pids = [int(p) for p in pid_file.read_text().split()]
+
+    with TestClient(app):
+        pass  # lifespan の終了処理を走らせる
+
+    assert optimization_job._runner is None
+    deadline = time.monotonic() + 10
+    while any(_alive(p) for p in pids) and time.monotonic() < deadline:
+        time.sleep(0.1)
+    assert [p for p in pids if _alive(p)] == []
+    for job in (running, queued):
+        assert client.get(f"/api/optimization-jobs/{job['id']}").json()["status"] == "failed"
@@ -43,6 +43,79 @@ def test_optimize_saves_assignments(client):
     assert len(response.json()["assignments"]) > 0
 
 
+def test_optimize_reports_phase_metrics(client):
+    """応答にフェーズ別の所要時間とモデル規模が含まれる"""
+    period_id = _setup_optimization_scenario(client)
+    data = client.post(f"/api/schedules/{period_id}/optimize").json()
+
+    metrics = data["metrics"]
+    names = {s["name"] for s in metrics["spans"]}
+    assert {
+        "load_data",
+        "optimize",
+        "optimize/build_model",
+        "optimize/solve",
+        "save_assignments",
+    } <= names
+    assert metrics["total_seconds"] > 0
+    assert all(s["seconds"] >= 0 and s["count"] >= 1 for s in metrics["spans"])
+    assert metrics["model"]["family_rows"]["staffing"] > 0
+
+
+def test_optimize_draft_mode(client):
+    """mode=draft は MIP を使わずに下書きを作って保存する"""
+    period_id = _setup_optimization_scenario(client)
+    response = client.post(f"/api/schedules/{period_id}/optimize", params={"mode": "draft"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "draft"
+    assert data["uncovered"] == []
+    assert data["solver_params"] is None
+    assert len(data["assignments"]) == 6
+
+    saved = client.get(f"/api/schedules/{period_id}").json()["assignments"]
+    assert len(saved) == 6
+
+    response = client.post(f"/api/schedules/{period_id}/optimize", params={"mode": "greedy"})
+    assert response.status_code == 422
+
+
+def test_optimize_lns_mode_improves_saved_schedule(client):
+    """mode=lns は保存済みの割り当てを起点に近傍探索し、結果を保存する"""
+    period_id = _setup_optimization_scenario(client)
+    client.post(f"/api/schedules/{period_id}/optimize", params={"mode": "draft"})
+
+    response = client.post(f"/api/schedules/{period_id}/optimize", params={"mode": "lns"})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "feasible"
+    assert data["lns"]["start"] == "initial_assignments"
+    assert data["objective"] == data["lns"]["history"][-1]["objective"]
+    saved = client.get(f"/api/schedules/{period_id}").json()["assignments"]
+    assert len(saved) == len(data["assignments"]) == 6
+
+
+def test_optimize_rolling_mode(client):
+    """mode=rolling はウィンドウごとの結果をつないで保存する"""
+    period_id = _setup_optimization_scenario(client)
+    response = client.post(
+        f"/api/schedules/{period_id}/optimize",
+        params={"mode": "rolling", "window_days": 2, "commit_days": 1},
+    )
+    assert response.status_code == 200
+    data = response.json()
+    assert data["status"] == "feasible"
+    assert [w["commit_end"] for w in data["rolling"]["windows"]] == ["2026-03-02", "2026-03-04"]
+    saved = client.get(f"/api/schedules/{period_id}").json()["assignments"]
+    assert len(saved) == len(data["assignments"]) >= 6
+
+    response = client.post(
+        f"/api/schedules/{period_id}/optimize",
+        params={"mode": "rolling", "window_days": 2, "commit_days": 3},
+    )
+    assert response.status_code == 422
+
+
 def test_optimize_with_previous_published_period(client, db_session):
     """直前に公開済み期間があっても 500 エラーにならないことを確認"""
     from datetime import date, time as dt_time
@@ -83,3 +156,259 @@ def test_optimize_with_previous_published_period(client, db_session):
     assert response.status_code == 200
     data = response.json()
     assert data["status"] in ("optimal", "infeasible")
+
+
+def test_reoptimize_uses_previous_assignments_as_warm_start(client):
+    """2回目の最適化では前回の割り当てが初期解として渡され、受理される"""
+    from backend.services import get_result_cache
+
+    period_id = _setup_optimization_scenario(client)
+    first = client.post(f"/api/schedules/{period_id}/optimize").json()
+    assert first["warm_start"] is None
+
+    get_result_cache().clear()  # 同じ入力なのでキャッシュを消して解き直させる
+
+    second = client.post(f"/api/schedules/{period_id}/optimize").json()
+    assert second["status"] == "optimal"
+    assert second["warm_start"]["provided"] is True
+    assert second["warm_start"]["accepted"] is True
+
+
+def test_reoptimize_with_same_inputs_returns_cached_result(client):
+    """入力が変わらなければ2回目はキャッシュの結果を返し、設定を戻すと再び当たる"""
+    period_id = _setup_optimization_scenario(client)
+    first = client.post(f"/api/schedules/{period_id}/optimize").json()
+    assert first["cached"] is False
+
+    second = client.post(f"/api/schedules/{period_id}/optimize").json()
+    assert second["cached"] is True
+    assert second["objective"] == first["objective"]
+    assert len(second["assignments"]) == len(first["assignments"])
+    saved = client.get(f"/api/schedules/{period_id}").json()["assignments"]
+    assert len(saved) == len(first["assignments"])
+
+    client.put("/api/solver-config", json={"enable_fairness": False})
+    assert client.post(f"/api/schedules/{period_id}/optimize").json()["cached"] is False
+    client.put("/api/solver-config", json={"enable_fairness": True})
+    assert client.post(f"/api/schedules/{period_id}/optimize").json()["cached"] is True
+
+
+def test_result_cache_evicts_least_recently_used_and_expired_entries():
+    from backend.services import ResultCache
+
+    now = [0.0]
+    cache = ResultCache(max_entries=2, ttl_seconds=10, clock=lambda: now[0])
+    assert cache.put("a", {"status": "optimal"})
+    assert cache.put("b", {"status": "infeasible"})
+    assert not cache.put("c", {"status": "feasible"})  # 時間切れの暫定解は保存しない
+    # 緩和テストが打ち切られた診断は保存しない
+    assert not cache.put("e", {
+        "status": "infeasible",
+        "diagnostic_probes": [
+            {"constraint": "C3_unavailable", "status": "infeasible", "cut_off": False},
+            {"constraint": "manual_edit", "status": "cut_off", "cut_off": True},
+        ],
+    })
+    assert cache.get("a") is not None  # a を使ったので b が最も古くなる
+    cache.put("d", {"status": "optimal"})
+    assert cache.get("b") is None
+    assert len(cache) == 2
+
+    now[0] = 11.0
+    assert cache.get("a") is None
+    assert cache.get("d") is None
+
+
+def test_reoptimize_keeps_manual_edit_without_double_booking(client):
+    """手動編集したセルは再最適化後も1件だけ残り、同じスタッフ・日付に重複しない"""
+    period_id = _setup_optimization_scenario(client)
+    first = client.post(f"/api/schedules/{period_id}/optimize").json()
+    target = first["assignments"][0]
+    client.put(
+        f"/api/schedules/{period_id}/assignments/{target['id']}",
+        json={"shift_slot_id": None},
+    )
+
+    client.post(f"/api/schedules/{period_id}/optimize")
+    assignments = client.get(f"/api/schedules/{period_id}").json()["assignments"]
+    same_cell = [
+        a for a in assignments
+        if a["staff_id"] == target["staff_id"] and a["date"] == target["date"]
+    ]
+    assert len(same_cell) == 1
+    assert same_cell[0]["is_manual_edit"] is True
+    assert same_cell[0]["shift_slot_id"] is None
+
+
+def _job_result(client, response, timeout=60):
+    """202 で登録されたジョブの完了を待って result を返す"""
+    import time
+
+    assert response.status_code == 202
+    job_id = response.json()["id"]
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = client.get(f"/api/optimization-jobs/{job_id}").json()
+        if job["status"] not in ("queued", "running"):
+            assert job["status"] == "completed", job
+            return job["result"]
+        time.sleep(0.1)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def test_compare_scenarios_without_touching_saved_config(client, job_runner):
+    """what-if シナリオをジョブで並列に解いて比較表を返し、設定も割り当ても保存しない"""
+    period_id = _setup_optimization_scenario(client)
+    slot_id = client.get("/api/shift-slots").json()[0]["id"]
+    more = {"shift_slot_id": slot_id, "day_type": "weekday", "min_count": 4}
+    response = client.post(
+        f"/api/schedules/{period_id}/scenarios",
+        json={"scenarios": [
+            {"name": "現状"},
+            {"name": "4人必要", "requirements": [more]},
+            {
+                "name": "4人必要（不足を許容）",
+                "config": {"enable_soft_staffing": True},
+                "requirements": [more],
+            },
+        ]},
+    )
+    assert response.json()["kind"] == "scenarios"
+    rows = {r["name"]: r for r in _job_result(client, response)["scenarios"]}
+    assert rows["現状"]["status"] == "optimal"
+    assert rows["現状"]["shortfall"] == 0
+    assert rows["現状"]["fairness_spread"] <= 1
+    assert rows["現状"]["solve_seconds"] > 0
+    assert rows["4人必要"]["status"] == "infeasible"
+    assert rows["4人必要"]["shortfall"] is None
+    assert rows["4人必要（不足を許容）"]["status"] == "optimal"
+    assert rows["4人必要（不足を許容）"]["shortfall"] == 3
+
+    assert client.get("/api/solver-config").json()["enable_soft_staffing"] is False
+    assert client.get(f"/api/schedules/{period_id}").json()["assignments"] == []
+    missing = client.post("/api/schedules/999/scenarios", json={"scenarios": [{"name": "x"}]})
+    assert missing.status_code == 404
+    assert client.post(f"/api/schedules/{period_id}/scenarios", json={"scenarios": []}).status_code == 422
+    # null の上書きは SolverConfig に None を入れずに 422 で返す
+    null_override = {"scenarios": [{"name": "x", "config": {"time_limit": None}}]}
+    assert client.post(f"/api/schedules/{period_id}/scenarios", json=null_override).status_code == 422
+
+
+def test_weight_sweep_marks_preference_fairness_trade_off(client, job_runner):
+    """重みの直積を解き、希望と勤務日数の差のトレードオフにある点を非劣解として返す"""
+    period_id = _setup_optimization_scenario(client)
+    staff_ids = [s["id"] for s in client.get("/api/staff").json()]
+    slot_id = client.get("/api/shift-slots").json()[0]["id"]
+    # 1人目は3日とも希望、他の2人は週2日まで
+    staff_id = staff_ids[0]
+    for other in staff_ids[1:]:
+        client.put(f"/api/staff/{other}", json={"max_days_per_week": 2})
+    client.put("/api/solver-config", json={"solver_profile": "prove_optimal"})
+    client.post("/api/requests", json={
+        "period_id": period_id,
+        "requests": [
+            {"staff_id": staff_id, "date": f"2026-03-0{d}", "shift_slot_id": slot_id, "type": "preferred"}
+            for d in (2, 3, 4)
+        ],
+    })
+
+    response = client.post(
+        f"/api/schedules/{period_id}/weight-sweep",
+        json={"grid": {"weight_fairness": [0.5, 2.0, 5.0]}},
+    )
+    assert response.json()["kind"] == "weight_sweep"
+    points = _job_result(client, response)["points"]
+    assert [p["weights"]["weight_fairness"] for p in points] == [0.5, 2.0, 5.0]
+    assert all(p["weights"]["weight_preferred"] == 3.0 for p in points)
+    # 公平性の重みが小さいと希望を3件かなえ、大きいと勤務日数をそろえる。
+    # 最も小さい重みの解は、人数を必要数に抑えた分だけ差が開き、2点目に支配される
+    outcomes = [(p["preferences_satisfied"], p["fairness_spread"], p["pareto"]) for p in points]
+    assert outcomes == [(3, 2, False), (3, 1, True), (2, 0, True)]
+    assert client.get(f"/api/schedules/{period_id}").json()["assignments"] == []
+
+    too_many = client.post(
+        f"/api/schedules/{period_id}/weight-sweep",
+        json={"grid": {"weight_fairness": list(range(9)), "weight_preferred": list(range(8))}},
+    )
+    assert too_many.status_code == 422
+    sampled = _job_result(client, client.post(
+        f"/api/schedules/{period_id}/weight-sweep",
+        json={"grid": {"weight_fairness": [0.0, 5.0]}, "random_samples": 2, "seed": 1},
+    ))["points"]
+    assert len(sampled) == 2
+    assert all(0.0 <= p["weights"]["weight_fairness"] <= 5.0 for p in sampled)
+
+
+def test_optimize_stream_sends_progress_then_result(client):
+    """SSE で進捗イベントの後に最終結果が届き、結果は DB に保存される"""
+    import json
+
+    period_id = _setup_optimization_scenario(client)
+    with client.stream("GET", f"/api/schedules/{period_id}/optimize/stream") as response:
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        body = "".join(response.iter_text())
+
+    events = []
+    for chunk in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in chunk.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+
+    assert events[-1][0] == "result"
+    assert events[-1][1]["status"] == "optimal"
+    for name, data in events[:-1]:
+        assert name == "progress"
+        assert set(data) == {"elapsed", "objective", "bound", "gap"}
+
+    saved = client.get(f"/api/schedules/{period_id}").json()["assignments"]
+    assert len(saved) == len(events[-1][1]["assignments"])
+
+
+def test_optimize_stream_unknown_period_returns_404(client):
+    assert client.get("/api/schedules/999/optimize/stream").status_code == 404
+
+
+def test_feasible_result_is_persisted_like_optimal(client, db_session):
+    """時間切れの暫定解（feasible）も保存され、ギャップが応答に含まれる"""
+    from backend.services import ScheduleService
+    from backend.services.schedule import to_optimize_response
+
+    period_id = _setup_optimization_scenario(client)
+    staff = client.get("/api/staff").json()
+    slot_id = client.get("/api/shift-slots").json()[0]["id"]
+    result = {
+        "status": "feasible",
+        "message": "暫定解",
+        "assignments": [
+            {"staff_id": staff[0]["id"], "date": "2026-03-02", "shift_slot_id": slot_id},
+            {"staff_id": staff[1]["id"], "date": "2026-03-02", "shift_slot_id": slot_id},
+        ],
+        "diagnostics": [],
+        "objective": 1.0,
+        "mip_gap": 0.04,
+        "mip_bound": 0.96,
+    }
+    optimized = ScheduleService(db_session).apply_optimization(period_id, result)
+    response = to_optimize_response(optimized)
+    assert response.status == "feasible"
+    assert response.mip_gap == 0.04
+    assert response.mip_bound == 0.96
+    assert len(client.get(f"/api/schedules/{period_id}").json()["assignments"]) == 2
+
+
+def test_optimize_echoes_solver_profile(client):
+    """最適化結果に使用したプロファイルと解決済みのパラメータが含まれる"""
+    period_id = _setup_optimization_scenario(client)
+    client.put("/api/solver-config", json={"solver_profile": "prove_optimal", "random_seed": 3})
+
+    data = client.post(f"/api/schedules/{period_id}/optimize").json()
+    assert data["status"] == "optimal"
+    assert data["solver_params"]["profile"] == "prove_optimal"
+    assert data["solver_params"]["mip_rel_gap"] == 0.0
+    assert data["solver_params"]["random_seed"] == 3
+
+    # 個別に指定したギャップはプロファイルの既定値より優先される
+    client.put("/api/solver-config", json={"solver_profile": "fast_draft", "mip_rel_gap": 0.2})
+    data = client.post(f"/api/schedules/{period_id}/optimize").json()
+    assert data["solver_params"]["profile"] == "fast_draft"
+    assert data["solver_params"]["mip_rel_gap"] == 0.2
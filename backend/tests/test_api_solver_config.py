@@ -37,3 +37,38 @@ def test_reset_solver_config(client):
     assert res.status_code == 200
     data = res.json()
     assert data["max_consecutive_days"] == 6
+
+
+def test_update_solver_params(client):
+    """ソルバーパラメータ（プロファイル・ギャップ・スレッド・シード）を更新できる"""
+    data = client.get("/api/solver-config").json()
+    assert data["solver_profile"] == "balanced"
+    assert data["mip_rel_gap"] is None
+
+    res = client.put(
+        "/api/solver-config",
+        json={
+            "solver_profile": "fast_draft",
+            "mip_rel_gap": 0.02,
+            "solver_threads": 2,
+            "random_seed": 7,
+        },
+    )
+    assert res.status_code == 200
+    data = res.json()
+    assert data["solver_profile"] == "fast_draft"
+    assert data["mip_rel_gap"] == 0.02
+    assert data["solver_threads"] == 2
+    assert data["random_seed"] == 7
+
+
+def test_update_solver_params_rejects_unknown_profile(client):
+    client.get("/api/solver-config")
+    res = client.put("/api/solver-config", json={"solver_profile": "turbo"})
+    assert res.status_code == 422
+    res = client.put("/api/solver-config", json={"mip_rel_gap": 2})
+    assert res.status_code == 422
+    # null を明示できるのはプロファイルの既定値に戻す mip_rel_gap だけ
+    assert client.put("/api/solver-config", json={"time_limit": None}).status_code == 422
+    res = client.put("/api/solver-config", json={"mip_rel_gap": None})
+    assert res.status_code == 200 and res.json()["mip_rel_gap"] is None
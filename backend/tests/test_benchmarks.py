@@ -0,0 +1,54 @@
+import pytest
+
+from backend.benchmarks import (
+    compare_with_baseline,
+    generate_instance,
+    run_benchmarks,
+    toggle_combinations,
+)
+
+
+def test_generator_is_seeded_and_respects_scale():
+    """同じシードなら同じインスタンスになり、指定した規模で作られる"""
+    a = generate_instance(num_staff=50, num_days=14, num_slots=4, request_density=0.1, seed=3)
+    b = generate_instance(num_staff=50, num_days=14, num_slots=4, request_density=0.1, seed=3)
+    assert a == b
+    assert len(a.staff) == 50 and len(a.dates) == 14 and len(a.slots) == 4
+    assert all(t.start_time < t.end_time for t in a.slots)
+    assert 0 < len(a.requests) < 50 * 14
+    assert {r.type for r in a.requests} == {"unavailable", "preferred"}
+    assert generate_instance(seed=4) != generate_instance(seed=3)
+
+    with pytest.raises(ValueError):
+        generate_instance(num_staff=5)
+    with pytest.raises(ValueError):
+        generate_instance(num_slots=9)
+
+
+def test_runner_records_every_combination_and_flags_regressions():
+    """トグルの全組み合わせを記録し、基準より悪い結果を劣化として返す"""
+    assert len(toggle_combinations(["enable_fairness", "enable_shift_interval"])) == 4
+    assert len(toggle_combinations()) == 8
+    with pytest.raises(ValueError):
+        toggle_combinations(["enable_unknown"])
+
+    instance = generate_instance(num_staff=10, num_days=7, num_slots=2)
+    report = run_benchmarks([instance], ["enable_fairness"], time_limit=10)
+    results = report["results"]
+    assert [r["toggles"] for r in results] == [
+        {"enable_fairness": False}, {"enable_fairness": True},
+    ]
+    for r in results:
+        assert r["status"] == "optimal"
+        assert r["rows"] > 0 and r["cols"] > 0 and r["nonzeros"] > 0
+        assert r["build_seconds"] > 0 and r["solve_seconds"] > 0 and r["peak_memory_mb"] > 0
+        assert r["diagnostics_seconds"] == 0.0
+    assert compare_with_baseline(report, report) == []
+
+    # 基準の方が速く、目的値も良かったことにする
+    baseline = {"results": [
+        {**r, "solve_seconds": 0.0, "objective": r["objective"] - 1} for r in results
+    ]}
+    regressions = compare_with_baseline(report, baseline, min_seconds=0.0)
+    assert len(regressions) == 2
+    assert any(reason.startswith("objective") for reason in regressions[0]["reasons"])
@@ -1,5 +1,5 @@
 import pytest
-from datetime import date, time
+from datetime import date, time, timedelta
 from collections import Counter, defaultdict
 
 from backend.domain import (
@@ -337,6 +337,29 @@ def test_shift_interval_disabled():
     assert result["status"] == "optimal"
 
 
+def test_reverse_cycle_rows_are_aggregated_into_cliques():
+    """逆循環の禁止組は枠の組ごとではなく、まとめた1行で禁止する"""
+    from backend.optimizer.solver import _build_model, _conflict_bicliques
+
+    # 夜勤→翌日の早番・日勤、日勤・夜勤→翌日の早番
+    pairs = [(1, 0), (2, 0), (2, 1)]
+    assert _conflict_bicliques(pairs) == [([1, 2], [0]), ([2], [0, 1])]
+
+    staff_list = [Staff(id=i, name=f"S{i}", role="一般", max_days_per_week=5) for i in (1, 2)]
+    slots = [
+        ShiftSlot(id=1, name="早番", start_time=time(7, 0), end_time=time(15, 0)),
+        ShiftSlot(id=2, name="日勤", start_time=time(9, 0), end_time=time(17, 0)),
+        ShiftSlot(id=3, name="夜勤", start_time=time(16, 0), end_time=time(23, 0)),
+    ]
+    dates = [date(2026, 3, 2) + timedelta(days=i) for i in range(4)]
+    config = SolverConfig(
+        id=0, enable_shift_interval=False, enable_reverse_cycle_prohibition=True,
+    )
+    built = _build_model(dates, staff_list, slots, {}, [], config, [], None, None, None)
+    # 禁止組 3 つが (スタッフ 2 人, 日付の境目 3 つ) ごとに 2 行になる
+    assert built.model.family_counts()["revcycle"] == 2 * 3 * 2
+
+
 # === B5: ロール別必要人数 ===
 
 def test_role_staffing_enabled():
@@ -591,6 +614,51 @@ def test_diagnostics_c3_unavailable():
     assert "C3_unavailable" in constraints
 
 
+def test_presolve_checks_daily_totals_and_role_skill_availability():
+    """枠ごとには足りても日の合計で足りない日、ロール・スキル別の不可日による不足を検出する"""
+    from backend.optimizer.solver import _presolve_checks
+
+    staff_list = [
+        Staff(id=1, name="田中", role="リーダー", max_days_per_week=5),
+        Staff(id=2, name="佐藤", role="リーダー", max_days_per_week=5),
+        Staff(id=3, name="鈴木", role="一般", max_days_per_week=5),
+    ]
+    slots = [
+        ShiftSlot(id=1, name="早番", start_time=time(7, 0), end_time=time(15, 0)),
+        ShiftSlot(id=2, name="遅番", start_time=time(13, 0), end_time=time(21, 0)),
+    ]
+    requirements = [
+        StaffingRequirement(id=1, shift_slot_id=1, day_type="weekday", min_count=2),
+        StaffingRequirement(id=2, shift_slot_id=2, day_type="weekday", min_count=1),
+    ]
+    dates = [date(2026, 3, 2), date(2026, 3, 3)]
+    # 3/3 は田中が不可: 利用可能2人 < 合計3人、リーダー1人 < 早番・遅番で2人
+    requests = [StaffRequest(id=1, staff_id=1, date=date(2026, 3, 3), type="unavailable")]
+    role_requirements = [
+        RoleStaffingRequirement(id=1, shift_slot_id=1, day_type="weekday", role="リーダー", min_count=1),
+        RoleStaffingRequirement(id=2, shift_slot_id=2, day_type="weekday", role="リーダー", min_count=1),
+    ]
+    staff_skills = [StaffSkill(id=1, staff_id=1, skill="レジ")]
+    skill_requirements = [
+        SkillRequirement(id=1, shift_slot_id=1, day_type="weekday", skill="レジ", min_count=1),
+    ]
+    config = SolverConfig(id=0, enable_role_staffing=True, enable_skill_staffing=True)
+
+    diagnostics = _presolve_checks(
+        dates, staff_list, slots, requirements, requests, config, role_requirements,
+        staff_skills, skill_requirements,
+    )
+
+    by_constraint = {d.constraint: d for d in diagnostics}
+    # 週の勤務可能日数（2 + 2 + 1 = 5）も必要延べ人日（6）に届かない
+    assert [d.constraint for d in diagnostics] == [
+        "C3_unavailable", "C5_weekly_max", "B5_role_staffing", "B8_skill_staffing",
+    ]
+    assert "2026-03-03" in by_constraint["C3_unavailable"].message
+    assert by_constraint["B5_role_staffing"].details == ["2026-03-03"]
+    assert by_constraint["B8_skill_staffing"].details == ["2026-03-03"]
+
+
 def test_cross_month_consecutive_days_respected():
     """月またぎの連続勤務制限を確認"""
     staff_list = [
@@ -737,3 +805,773 @@ def test_skill_staffing_constraint():
     tanaka_dates = {a["date"] for a in result["assignments"] if a["staff_id"] == 1}
     for d_str in ["2026-03-02", "2026-03-03", "2026-03-04"]:
         assert d_str in tanaka_dates, f"{d_str} に調理師免許保持者が配置されていない"
+
+
+# === 行列モデル（HiGHS 直接 / PuLP フォールバック） ===
+
+def test_matrix_model_highs_and_pulp_agree():
+    """同じ行列モデルを HiGHS 直接呼び出しと PuLP(CBC) で解いて目的値が一致する"""
+    from backend.optimizer.backends import solve_with_highs, solve_with_pulp
+    from backend.optimizer.solver import _build_model
+
+    staff_list = [
+        Staff(id=i, name=f"スタッフ{i}", role="一般", max_days_per_week=5)
+        for i in range(1, 5)
+    ]
+    slots = [
+        ShiftSlot(id=1, name="早番", start_time=time(7, 0), end_time=time(15, 0)),
+        ShiftSlot(id=2, name="遅番", start_time=time(15, 0), end_time=time(23, 0)),
+    ]
+    requirements = [
+        StaffingRequirement(id=1, shift_slot_id=1, day_type="weekday", min_count=1),
+        StaffingRequirement(id=2, shift_slot_id=2, day_type="weekday", min_count=1),
+        StaffingRequirement(id=3, shift_slot_id=1, day_type="weekend", min_count=1),
+    ]
+    dates = [date(2026, 3, 2 + i) for i in range(7)]
+    req_map = {(r.shift_slot_id, r.day_type): r.min_count for r in requirements}
+    requests = [
+        StaffRequest(id=1, staff_id=1, date=date(2026, 3, 3), type="preferred", shift_slot_id=1),
+        StaffRequest(id=2, staff_id=2, date=date(2026, 3, 4), type="unavailable"),
+    ]
+    config = SolverConfig(id=0, enable_shift_interval=True, enable_fairness=True)
+
+    built = _build_model(
+        dates, staff_list, slots, req_map, requests, config, [], None, None, None,
+    )
+    model = built.model
+    assert built.x.shape == (4, 7, 2)
+    assert model.family_counts()["staffing"] == 12
+
+    highs = solve_with_highs(model, 30)
+    cbc = solve_with_pulp(model, 30)
+    assert highs.status == cbc.status == "optimal"
+    assert highs.objective == pytest.approx(cbc.objective, abs=1e-6)
+
+
+def test_sparse_index_skips_unavailable_cells():
+    """不可日・週上限0のスタッフには変数を作らず、削減数が結果に含まれる"""
+    staff_list = [
+        Staff(id=1, name="田中", role="一般", max_days_per_week=5),
+        Staff(id=2, name="佐藤", role="一般", max_days_per_week=5),
+        Staff(id=3, name="鈴木", role="一般", max_days_per_week=0),
+    ]
+    slots = [
+        ShiftSlot(id=1, name="早番", start_time=time(9, 0), end_time=time(17, 0)),
+        ShiftSlot(id=2, name="遅番", start_time=time(13, 0), end_time=time(21, 0)),
+    ]
+    requirements = [StaffingRequirement(id=1, shift_slot_id=1, day_type="weekday", min_count=1)]
+    period = SchedulePeriod(id=1, start_date=date(2026, 3, 2), end_date=date(2026, 3, 4))
+    requests = [
+        StaffRequest(id=1, staff_id=1, date=date(2026, 3, 2), type="unavailable"),
+    ]
+
+    result = solve_schedule(period, staff_list, slots, requirements, requests)
+    assert result["status"] == "optimal"
+    assert not any(a["staff_id"] == 3 for a in result["assignments"])
+    assert not any(
+        a["staff_id"] == 1 and a["date"] == "2026-03-02" for a in result["assignments"]
+    )
+
+    stats = result["model_stats"]
+    # 鈴木の 3日×2枠 + 田中の 3/2 の 2枠
+    assert stats["eliminated_variables"] == 8
+    # x の列 + 勤務日 works の列（田中 2日 + 佐藤 3日）
+    assert stats["variables"] == 3 * 3 * 2 - 8 + 5
+    assert stats["eliminated_rows"] >= 2
+
+
+def test_warm_start_rejected_when_start_violates_constraints():
+    """不可日になったセルを含む初期解は列に対応せず、不足する初期解は受理されない"""
+    from backend.domain import ScheduleAssignment
+
+    period, staff_list, slots, requirements = _setup_basic_scenario()
+    previous = [
+        ScheduleAssignment(id=i, period_id=1, staff_id=s, date=date(2026, 3, d), shift_slot_id=1)
+        for i, (s, d) in enumerate([(1, 2), (2, 2), (1, 3), (3, 3), (2, 4), (3, 4)])
+    ]
+    result = solve_schedule(
+        period, staff_list, slots, requirements, [], initial_assignments=previous,
+    )
+    assert result["status"] == "optimal"
+    assert result["warm_start"]["accepted"] is True
+
+    # 田中が 3/2 不可になると、前回解では 3/2 の必要人数を満たせない
+    requests = [StaffRequest(id=1, staff_id=1, date=date(2026, 3, 2), type="unavailable")]
+    result = solve_schedule(
+        period, staff_list, slots, requirements, requests, initial_assignments=previous,
+    )
+    assert result["status"] == "optimal"
+    assert result["warm_start"]["accepted"] is False
+
+
+def test_fixed_assignments_are_respected():
+    """手動確定したセルは変数を作らず、必要人数・週上限の右辺から差し引かれる"""
+    from backend.domain import ScheduleAssignment
+
+    staff_list = [
+        Staff(id=1, name="田中", role="一般", max_days_per_week=2),
+        Staff(id=2, name="佐藤", role="一般", max_days_per_week=5),
+        Staff(id=3, name="鈴木", role="一般", max_days_per_week=5),
+    ]
+    slots = [ShiftSlot(id=1, name="早番", start_time=time(9, 0), end_time=time(17, 0))]
+    requirements = [StaffingRequirement(id=1, shift_slot_id=1, day_type="weekday", min_count=1)]
+    period = SchedulePeriod(id=1, start_date=date(2026, 3, 2), end_date=date(2026, 3, 4))
+    fixed = [
+        # 田中は 3/2 出勤、佐藤は 3/3 休みで確定
+        ScheduleAssignment(id=1, period_id=1, staff_id=1, date=date(2026, 3, 2), is_manual_edit=True, shift_slot_id=1),
+        ScheduleAssignment(id=2, period_id=1, staff_id=2, date=date(2026, 3, 3), is_manual_edit=True, shift_slot_id=None),
+    ]
+
+    result = solve_schedule(
+        period, staff_list, slots, requirements, [], fixed_assignments=fixed,
+    )
+    assert result["status"] == "optimal"
+    cells = {(a["staff_id"], a["date"]) for a in result["assignments"]}
+    # 確定セルは結果に含めず、二重登録もしない
+    assert (1, "2026-03-02") not in cells
+    assert (2, "2026-03-03") not in cells
+    # 3/2 は田中で必要人数を満たすので追加の割り当ては不要
+    assert not any(d == "2026-03-02" for _, d in cells)
+    # 田中は週上限2のうち1日を確定済み
+    assert sum(1 for s, _ in cells if s == 1) <= 1
+    assert result["model_stats"]["fixed_variables"] == 1
+
+
+def test_manual_edits_alone_causing_infeasibility_are_named():
+    """手動確定だけで週上限を超える場合、確定セルを挙げ、プローブも同じモデルで解く"""
+    from backend.domain import ScheduleAssignment
+    from backend.optimizer.solver import _try_solve_relaxed
+
+    period, staff_list, slots, requirements = _setup_basic_scenario()
+    staff_list[0] = Staff(id=1, name="田中", role="一般", max_days_per_week=2)
+    # 田中を3日とも出勤で確定（確定がなければ佐藤・鈴木と組んで解ける）
+    fixed = [
+        ScheduleAssignment(id=i, period_id=1, staff_id=1, date=date(2026, 3, 2 + i), is_manual_edit=True, shift_slot_id=1)
+        for i in range(3)
+    ]
+    config = SolverConfig(id=0)
+    assert solve_schedule(period, staff_list, slots, requirements, [], config=config)["status"] == "optimal"
+
+    result = solve_schedule(
+        period, staff_list, slots, requirements, [], config=config, fixed_assignments=fixed,
+    )
+    assert result["status"] == "infeasible"
+    manual = [d for d in result["diagnostics"] if d.constraint == "manual_edit"]
+    assert len(manual) == 1
+    assert manual[0].details == [f"田中 2026-03-0{d} 早番" for d in (2, 3, 4)]
+
+    diagnostics, probes = _try_solve_relaxed(
+        period, staff_list, slots, requirements, [], config, [], fixed_assignments=fixed,
+    )
+    by_name = {p["constraint"]: p for p in probes}
+    assert by_name["manual_edit"]["status"] == "optimal"
+    # 必要人数を目標にしても確定は外れないので解けない
+    assert by_name["C2_staffing"]["status"] == "infeasible"
+    assert "manual_edit" in [d.constraint for d in diagnostics]
+
+
+def test_relaxation_probes_run_in_parallel_and_report_timing():
+    """制約緩和テストはプローブごとの所要時間と打ち切り有無を返す"""
+    from backend.optimizer.solver import _try_solve_relaxed
+
+    # 1人で7日間毎日1人必要、連勤制限3日 → 連勤制限を外せば解ける
+    staff_list = [Staff(id=1, name="田中", role="一般", max_days_per_week=7)]
+    slots = [ShiftSlot(id=1, name="早番", start_time=time(9, 0), end_time=time(17, 0))]
+    requirements = [
+        StaffingRequirement(id=1, shift_slot_id=1, day_type="weekday", min_count=1),
+        StaffingRequirement(id=2, shift_slot_id=1, day_type="weekend", min_count=1),
+    ]
+    period = SchedulePeriod(id=1, start_date=date(2026, 3, 2), end_date=date(2026, 3, 8))
+    config = SolverConfig(id=0, max_consecutive_days=3)
+
+    diagnostics, probes = _try_solve_relaxed(
+        period, staff_list, slots, requirements, [], config, [],
+    )
+    assert "C4_consecutive" in [d.constraint for d in diagnostics]
+    by_name = {p["constraint"]: p for p in probes}
+    assert by_name["C4_consecutive"]["status"] == "optimal"
+    assert all(not p["cut_off"] and p["seconds"] is not None for p in probes)
+
+
+def test_diagnostics_share_one_deadline(monkeypatch):
+    """IIS・弾性モデル・制約緩和テストは診断開始時に決めた1つの締め切りを共有する"""
+    import time as time_module
+    from backend.optimizer import solver
+
+    seen = {}
+
+    def slow_iis(*args):
+        seen["iis_started"] = time_module.perf_counter()
+        time_module.sleep(0.3)
+        return []
+
+    def no_elastic(built, staff_list, slots, dates, time_limit):
+        seen["elastic"] = time_limit
+        return []
+
+    def relaxed(*args):
+        seen["deadline"] = args[-1]
+        return [], []
+
+    monkeypatch.setattr(solver, "_presolve_checks", lambda *args: [])
+    monkeypatch.setattr(solver, "_diagnose_with_highs_iis", slow_iis)
+    monkeypatch.setattr(solver, "_diagnose_with_elastic", no_elastic)
+    monkeypatch.setattr(solver, "_try_solve_relaxed", relaxed)
+
+    period, staff_list, slots, _ = _setup_basic_scenario()
+    requirements = [StaffingRequirement(id=1, shift_slot_id=1, day_type="weekday", min_count=4)]
+    config = SolverConfig(id=0, time_limit=5)
+    result = solve_schedule(period, staff_list, slots, requirements, [], config=config)
+    assert result["status"] == "infeasible"
+    assert seen["elastic"] <= 5 - 0.3
+    assert seen["deadline"] <= seen["iis_started"] + 5
+
+    # 締め切りを過ぎていればプローブは起動せず、すべて打ち切りとして報告する
+    monkeypatch.undo()
+    diagnostics, probes = solver._try_solve_relaxed(
+        period, staff_list, slots, requirements, [], config, [],
+        deadline=time_module.perf_counter(),
+    )
+    assert probes and all(p["cut_off"] for p in probes)
+    assert "diagnostics_timeout" in [d.constraint for d in diagnostics]
+
+
+def test_elastic_diagnosis_pinpoints_unavailable_staff_and_dates():
+    """弾性モデルは1回の求解で緩和が必要な制約ファミリーと日付・スタッフを返す"""
+    from backend.optimizer.solver import _build_model, _diagnose_with_elastic
+
+    # 2人とも 3/4 が不可日だが 3/4 に1人必要
+    staff_list = [
+        Staff(id=1, name="田中", role="一般", max_days_per_week=5),
+        Staff(id=2, name="鈴木", role="一般", max_days_per_week=5),
+    ]
+    slots = [ShiftSlot(id=1, name="早番", start_time=time(9, 0), end_time=time(17, 0))]
+    dates = [date(2026, 3, 2) + timedelta(days=i) for i in range(5)]
+    requests = [
+        StaffRequest(id=1, staff_id=1, date=date(2026, 3, 4), type="unavailable"),
+        StaffRequest(id=2, staff_id=2, date=date(2026, 3, 4), type="unavailable"),
+    ]
+    config = SolverConfig(id=0, max_consecutive_days=6)
+
+    built = _build_model(
+        dates, staff_list, slots, {(1, "weekday"): 1}, requests, config, [],
+        None, None, None, elastic=True,
+    )
+    assert built.model.family_counts()["unavail"] == 2
+
+    diagnostics = _diagnose_with_elastic(built, staff_list, slots, dates, 10)
+    by_name = {d.constraint: d for d in diagnostics}
+    # 不可日を破るより1人不足とする方が安い（不可日のペナルティが重い）
+    assert set(by_name) == {"C2_staffing"}
+    assert by_name["C2_staffing"].details == ["2026-03-04の早番: 1人不足"]
+
+
+def test_interrupted_solve_returns_incumbent_as_feasible():
+    """中断・時間切れでも暫定解があれば feasible として割り当てを返す"""
+    import threading
+
+    from backend.domain import ScheduleAssignment
+
+    staff_list = [
+        Staff(id=i + 1, name=f"スタッフ{i}", role="一般", max_days_per_week=5) for i in range(6)
+    ]
+    slots = [
+        ShiftSlot(id=1, name="早番", start_time=time(9, 0), end_time=time(17, 0)),
+        ShiftSlot(id=2, name="遅番", start_time=time(13, 0), end_time=time(21, 0)),
+    ]
+    requirements = [
+        StaffingRequirement(id=1, shift_slot_id=1, day_type="weekday", min_count=2),
+        StaffingRequirement(id=2, shift_slot_id=2, day_type="weekday", min_count=2),
+        StaffingRequirement(id=3, shift_slot_id=1, day_type="weekend", min_count=1),
+    ]
+    period = SchedulePeriod(id=1, start_date=date(2026, 3, 2), end_date=date(2026, 3, 8))
+    config = SolverConfig(id=0, enable_preferred_shift=False)
+
+    optimal = solve_schedule(period, staff_list, slots, requirements, [], config=config)
+    assert optimal["status"] == "optimal"
+    assert optimal["mip_gap"] is not None
+
+    # 初期解を与えたうえで即座に中断させる → 初期解が暫定解として返る
+    previous = [
+        ScheduleAssignment(
+            id=i, period_id=1, staff_id=a["staff_id"],
+            date=date.fromisoformat(a["date"]), shift_slot_id=a["shift_slot_id"],
+        )
+        for i, a in enumerate(optimal["assignments"])
+    ]
+    stop = threading.Event()
+    stop.set()
+    result = solve_schedule(
+        period, staff_list, slots, requirements, [], config=config,
+        initial_assignments=previous, stop_event=stop,
+    )
+    assert result["status"] == "feasible"
+    assert len(result["assignments"]) == len(optimal["assignments"])
+    assert result["objective"] is not None
+    assert [d.constraint for d in result["diagnostics"]] == ["timeout"]
+
+
+def test_solver_params_reach_highs_and_cbc(monkeypatch):
+    """プロファイルのギャップ・シード・スレッド数が HiGHS と CBC の両方に渡る"""
+    from backend.optimizer import backends
+    from backend.optimizer.backends import SolverParams, solve_with_highs, solve_with_pulp
+    from backend.optimizer.solver import _build_model, _solver_params
+
+    period, staff_list, slots, requirements = _setup_basic_scenario()
+    dates = [date(2026, 3, 2) + timedelta(days=i) for i in range(3)]
+    config = SolverConfig(id=0, solver_profile="fast_draft", solver_threads=1, random_seed=5)
+    params = _solver_params(config)
+    assert params == SolverParams(
+        profile="fast_draft", mip_rel_gap=0.05, threads=1, random_seed=5, heuristic_effort=0.3,
+    )
+
+    built = _build_model(
+        dates, staff_list, slots, {(1, "weekday"): 2}, [], config, [], None, None, None,
+    )
+    # スレッド数が HiGHS に渡るのは求解用の子プロセスだけ
+    monkeypatch.setattr(backends, "_owns_highs_scheduler", True)
+    monkeypatch.setattr(backends, "_highs_threads", 0)
+    highs = solve_with_highs(built.model, 10, params=params)
+    assert highs.solver_model.getOptionValue("mip_rel_gap")[1] == 0.05
+    assert highs.solver_model.getOptionValue("random_seed")[1] == 5
+    assert highs.solver_model.getOptionValue("threads")[1] == 1
+    cbc = solve_with_pulp(built.model, 10, params=params)
+    assert highs.status == cbc.status == "optimal"
+    assert highs.objective == pytest.approx(cbc.objective)
+
+
+def test_highs_scheduler_is_reset_only_in_solver_processes(monkeypatch):
+    """API のプロセスではスケジューラを作り直さず、求解用の子プロセスでは 0 で既定に戻す"""
+    from backend.optimizer import backends
+
+    resets = []
+
+    class FakeHighs:
+        @staticmethod
+        def resetGlobalScheduler(blocking):
+            resets.append(blocking)
+
+    class FakeHighspy:
+        Highs = FakeHighs
+
+    monkeypatch.setattr(backends, "_owns_highs_scheduler", False)
+    monkeypatch.setattr(backends, "_highs_threads", 0)
+    applied = [backends._configure_highs_threads(FakeHighspy, t) for t in (2, 4, 0)]
+    assert resets == []
+    assert applied == [0, 0, 0]
+
+    backends.own_highs_scheduler()
+    applied = [backends._configure_highs_threads(FakeHighspy, t) for t in (2, 2, 4, 0, 0)]
+    assert len(resets) == 3
+    assert applied == [2, 2, 4, 0, 0]
+    assert backends._highs_threads == 0
+
+
+def test_solver_threads_are_ignored_in_api_process(monkeypatch):
+    """API のプロセスで直接解く場合、スケジューラと異なるスレッド数でも求解できる"""
+    from backend.optimizer import backends
+
+    monkeypatch.setattr(backends, "_owns_highs_scheduler", False)
+    period, staff_list, slots, requirements = _setup_basic_scenario()
+    config = SolverConfig(id=0, solver_threads=2)
+    result = solve_schedule(period, staff_list, slots, requirements, [], config=config)
+
+    assert result["status"] == "optimal"
+    assert result["solver_params"]["threads"] == 2
+
+
+def test_solver_race_reports_every_backend():
+    """レースモードでは使えるソルバーを全部走らせ、勝者と各ソルバーの結果を返す"""
+    from backend.optimizer.backends import available_backends
+
+    period, staff_list, slots, requirements = _setup_basic_scenario()
+    config = SolverConfig(id=0, enable_solver_race=True)
+    result = solve_schedule(period, staff_list, slots, requirements, [], config=config)
+
+    assert result["status"] == "optimal"
+    race = result["race"]
+    assert race["winner"] in available_backends()
+    assert sorted(b["backend"] for b in race["backends"]) == sorted(available_backends())
+    winner = next(b for b in race["backends"] if b["backend"] == race["winner"])
+    assert winner["status"] == "optimal"
+    assert result["objective"] == pytest.approx(winner["objective"])
+
+
+def test_solver_race_all_backends_failing_returns_error(monkeypatch):
+    """レースで全ソルバーが異常終了したら実行不能とせず error を返し、診断は行わない"""
+    from backend.optimizer import backends
+
+    # 子プロセスには monkeypatch が届かないので、存在しないソルバー名で全員を失敗させる
+    monkeypatch.setattr(backends, "available_backends", lambda: ["broken_a", "broken_b"])
+    period, staff_list, slots, requirements = _setup_basic_scenario()
+    config = SolverConfig(id=0, enable_solver_race=True)
+    result = solve_schedule(period, staff_list, slots, requirements, [], config=config)
+
+    assert result["status"] == "error"
+    assert result["diagnostics"] == []
+    assert "diagnostic_probes" not in result
+    assert [b["status"] for b in result["race"]["backends"]] == ["error", "error"]
+
+
+def test_draft_schedule_respects_hard_constraints():
+    """貪欲法の下書きは不可日・週上限・連勤・インターバル・逆循環・ロールを破らない"""
+    from backend.optimizer.draft import draft_schedule
+
+    staff_list = [
+        Staff(id=i, name=f"S{i}", role="リーダー" if i <= 3 else "一般", max_days_per_week=5)
+        for i in range(1, 13)
+    ]
+    slots = [
+        ShiftSlot(id=1, name="早番", start_time=time(7, 0), end_time=time(15, 0)),
+        ShiftSlot(id=2, name="遅番", start_time=time(15, 0), end_time=time(23, 0)),
+    ]
+    requirements = [
+        StaffingRequirement(id=1, shift_slot_id=1, day_type="weekday", min_count=3),
+        StaffingRequirement(id=2, shift_slot_id=2, day_type="weekday", min_count=2),
+        StaffingRequirement(id=3, shift_slot_id=1, day_type="weekend", min_count=2),
+        StaffingRequirement(id=4, shift_slot_id=2, day_type="weekend", min_count=1),
+    ]
+    role_reqs = [
+        RoleStaffingRequirement(id=1, shift_slot_id=1, day_type="weekday", role="リーダー", min_count=1),
+    ]
+    period = SchedulePeriod(id=1, start_date=date(2026, 3, 2), end_date=date(2026, 3, 15))
+    requests = [
+        StaffRequest(id=1, staff_id=4, date=date(2026, 3, 3), type="unavailable"),
+        StaffRequest(id=2, staff_id=5, date=date(2026, 3, 3), type="unavailable"),
+    ]
+    config = SolverConfig(
+        id=0, max_consecutive_days=4, enable_shift_interval=True,
+        min_shift_interval_hours=11, enable_reverse_cycle_prohibition=True,
+        enable_role_staffing=True,
+    )
+    result = draft_schedule(
+        period, staff_list, slots, requirements, requests,
+        config=config, role_requirements=role_reqs,
+    )
+    assert result["status"] == "draft"
+    assert result["uncovered"] == []
+
+    by_staff = defaultdict(dict)
+    for a in result["assignments"]:
+        by_staff[a["staff_id"]][date.fromisoformat(a["date"])] = a["shift_slot_id"]
+    assert date(2026, 3, 3) not in by_staff[4] and date(2026, 3, 3) not in by_staff[5]
+    for days in by_staff.values():
+        for week_start in (date(2026, 3, 2), date(2026, 3, 9)):
+            assert sum(week_start <= d < week_start + timedelta(days=7) for d in days) <= 5
+        for d in days:
+            run = [d + timedelta(days=k) in days for k in range(5)]
+            assert not all(run)
+            # 遅番の翌日に早番は入らない（インターバル・逆循環の両方で禁止）
+            assert not (days[d] == 2 and days.get(d + timedelta(days=1)) == 1)
+    counts = Counter((a["date"], a["shift_slot_id"]) for a in result["assignments"])
+    for i in range(14):
+        d = date(2026, 3, 2) + timedelta(days=i)
+        weekday = d.weekday() < 5
+        assert counts[(d.isoformat(), 1)] >= (3 if weekday else 2)
+        assert counts[(d.isoformat(), 2)] >= (2 if weekday else 1)
+        if weekday:
+            assert any(
+                by_staff[s].get(d) == 1 for s in (1, 2, 3)
+            ), f"{d} の早番にリーダーがいない"
+
+
+def test_draft_schedule_reports_uncovered_demand():
+    """埋められない需要は失敗にせず uncovered と警告で返す"""
+    from backend.optimizer.draft import draft_schedule
+
+    period, staff_list, slots, requirements = _setup_basic_scenario()
+    requests = [
+        StaffRequest(id=1, staff_id=1, date=date(2026, 3, 3), type="unavailable"),
+        StaffRequest(id=2, staff_id=2, date=date(2026, 3, 3), type="unavailable"),
+    ]
+    result = draft_schedule(period, staff_list, slots, requirements, requests)
+
+    assert result["status"] == "draft"
+    assert result["uncovered"] == [{
+        "date": "2026-03-03", "shift_slot_id": 1, "constraint": "C2_staffing",
+        "label": None, "required": 2, "assigned": 1,
+    }]
+    assert len(result["assignments"]) == 5
+    assert [d.constraint for d in result["diagnostics"]] == ["C2_staffing"]
+
+
+def test_lns_improves_draft_to_exact_objective():
+    """LNS は下書きから始めて改善し、目的値は厳密解と同じモデルで比較できる"""
+    from backend.optimizer.lns import improve_schedule
+
+    staff_list = [
+        Staff(id=i, name=f"S{i}", role="リーダー" if i <= 2 else "一般", max_days_per_week=5)
+        for i in range(1, 9)
+    ]
+    slots = [
+        ShiftSlot(id=1, name="早番", start_time=time(7, 0), end_time=time(15, 0)),
+        ShiftSlot(id=2, name="遅番", start_time=time(15, 0), end_time=time(23, 0)),
+    ]
+    requirements = [
+        StaffingRequirement(id=1, shift_slot_id=t, day_type=dt, min_count=2)
+        for t in (1, 2) for dt in ("weekday", "weekend")
+    ]
+    requests = [
+        StaffRequest(
+            id=i, staff_id=1 + i % 8, date=date(2026, 3, 2) + timedelta(days=i % 14),
+            type="preferred", shift_slot_id=1 + i % 2,
+        )
+        for i in range(20)
+    ]
+    period = SchedulePeriod(id=1, start_date=date(2026, 3, 2), end_date=date(2026, 3, 15))
+    config = SolverConfig(
+        id=0, enable_preferred_shift=True, enable_fairness=True, time_limit=20,
+    )
+
+    result = improve_schedule(
+        period, staff_list, slots, requirements, requests, config=config, max_iterations=6,
+    )
+    assert result["status"] == "feasible"
+    lns = result["lns"]
+    assert lns["start"] == "draft"
+    assert lns["iterations"] == 6
+    assert [h["neighborhood"].split(":")[0] for h in lns["history"][1:4]] == ["week", "role", "staff"]
+    objectives = [h["objective"] for h in lns["history"]]
+    assert objectives == sorted(objectives, reverse=True)
+    assert result["objective"] == objectives[-1] <= lns["initial_objective"]
+
+    exact = solve_schedule(period, staff_list, slots, requirements, requests, config=config)
+    assert exact["objective"] <= result["objective"] + 1e-6
+
+
+def test_rolling_horizon_carries_constraints_across_windows():
+    """ウィンドウ境界をまたいでも連勤上限・週勤務上限・手動確定を守ってつなぐ"""
+    from backend.domain import ScheduleAssignment
+    from backend.optimizer.rolling import solve_rolling_horizon
+
+    staff_list = [
+        Staff(id=i, name=f"S{i}", role="一般", max_days_per_week=4) for i in range(1, 6)
+    ]
+    slots = [ShiftSlot(id=1, name="日勤", start_time=time(9, 0), end_time=time(17, 0))]
+    requirements = [
+        StaffingRequirement(id=1, shift_slot_id=1, day_type=dt, min_count=2)
+        for dt in ("weekday", "weekend")
+    ]
+    # 水曜始まりの 4 週間。ウィンドウ 7 日・確定 3 日で週の途中の境界を作る
+    period = SchedulePeriod(id=1, start_date=date(2026, 3, 4), end_date=date(2026, 3, 31))
+    fixed = [
+        ScheduleAssignment(id=1, period_id=1, staff_id=1, date=date(2026, 3, 10),
+                           shift_slot_id=1, is_manual_edit=True),
+        ScheduleAssignment(id=2, period_id=1, staff_id=2, date=date(2026, 3, 10),
+                           shift_slot_id=None, is_manual_edit=True),
+    ]
+    config = SolverConfig(id=0, max_consecutive_days=3)
+    result = solve_rolling_horizon(
+        period, staff_list, slots, requirements, [], config=config,
+        prefix_assignments={3: [date(2026, 3, 1), date(2026, 3, 2), date(2026, 3, 3)]},
+        fixed_assignments=fixed, window_days=7, commit_days=3,
+    )
+
+    assert result["status"] == "feasible"
+    windows = result["rolling"]["windows"]
+    assert len(windows) > 5
+    assert windows[2]["start"] == "2026-03-09"  # 週の月曜まで遡って週上限を数える
+    assert windows[-1]["commit_end"] == "2026-03-31"
+    # 全体の制限時間を残りのウィンドウで分ける（早く解けた分は後のウィンドウに回る）
+    assert windows[0]["time_limit"] == int(config.time_limit / len(windows) * 10) / 10
+    assert all(w["time_limit"] < config.time_limit for w in windows)
+
+    worked = defaultdict(set)
+    for a in result["assignments"]:
+        worked[a["staff_id"]].add(date.fromisoformat(a["date"]))
+    assert date(2026, 3, 10) not in worked[1] | worked[2]  # 手動確定セルは返さない
+    worked[1].add(date(2026, 3, 10))
+    worked[3] |= {date(2026, 3, 1), date(2026, 3, 2), date(2026, 3, 3)}
+    assert date(2026, 3, 4) not in worked[3]  # 前期間からの連勤を引き継ぐ
+    for days in worked.values():
+        for d in days:
+            assert not all(d + timedelta(days=k) in days for k in range(4))
+            monday = d - timedelta(days=d.weekday())
+            if monday >= period.start_date:
+                assert sum(monday <= x < monday + timedelta(days=7) for x in days) <= 4
+    per_day = Counter(a["date"] for a in result["assignments"])
+    per_day["2026-03-10"] += 1
+    for i in range(28):
+        assert per_day[(period.start_date + timedelta(days=i)).isoformat()] >= 2
+
+
+def test_rolling_horizon_boundary_tight_against_consecutive_limit():
+    """境界で連勤がちょうど上限に届く組み合わせでも、境界のせいで解けなくならない"""
+    from backend.optimizer.rolling import solve_rolling_horizon
+
+    # 4 人中 3 人が毎日必要で連勤上限 3 日: 全員が「3 勤 1 休」をずらして回すしかない
+    staff_list = [
+        Staff(id=i, name=f"S{i}", role="一般", max_days_per_week=7) for i in range(1, 5)
+    ]
+    slots = [ShiftSlot(id=1, name="日勤", start_time=time(9, 0), end_time=time(17, 0))]
+    requirements = [
+        StaffingRequirement(id=1, shift_slot_id=1, day_type=dt, min_count=3)
+        for dt in ("weekday", "weekend")
+    ]
+    period = SchedulePeriod(id=1, start_date=date(2026, 3, 2), end_date=date(2026, 3, 29))
+    # 前期間の末尾の連勤は 3・2・1・0 日
+    prefix = {
+        1: [date(2026, 2, 27), date(2026, 2, 28), date(2026, 3, 1)],
+        2: [date(2026, 2, 28), date(2026, 3, 1)],
+        3: [date(2026, 3, 1)],
+    }
+    config = SolverConfig(id=0, max_consecutive_days=3)
+    result = solve_rolling_horizon(
+        period, staff_list, slots, requirements, [], config=config,
+        prefix_assignments=prefix, window_days=7, commit_days=3,
+    )
+
+    assert result["status"] == "feasible"
+    assert all(w["status"] == "optimal" for w in result["rolling"]["windows"])
+    worked = defaultdict(set)
+    for sid, days in prefix.items():
+        worked[sid].update(days)
+    for a in result["assignments"]:
+        worked[a["staff_id"]].add(date.fromisoformat(a["date"]))
+    for days in worked.values():
+        assert not any(all(d + timedelta(days=k) in days for k in range(4)) for d in days)
+    per_day = Counter(a["date"] for a in result["assignments"])
+    assert all(per_day[(period.start_date + timedelta(days=i)).isoformat()] == 3 for i in range(28))
+
+
+def test_independent_weeks_are_solved_as_separate_components(monkeypatch):
+    """連勤・インターバルで週がつながらない場合は週ごとの部分問題に分けて並列に解く"""
+    from backend.optimizer import solver
+
+    staff_list = [
+        Staff(id=i, name=f"S{i}", role="一般", max_days_per_week=4) for i in range(1, 7)
+    ]
+    slots = [ShiftSlot(id=1, name="日勤", start_time=time(9, 0), end_time=time(17, 0))]
+    requirements = [
+        StaffingRequirement(id=1, shift_slot_id=1, day_type=dt, min_count=2)
+        for dt in ("weekday", "weekend")
+    ]
+    period = SchedulePeriod(id=1, start_date=date(2026, 3, 2), end_date=date(2026, 3, 15))
+    requests = [
+        StaffRequest(id=1, staff_id=1, date=date(2026, 3, 3), type="preferred", shift_slot_id=1),
+        StaffRequest(id=2, staff_id=2, date=date(2026, 3, 10), type="preferred"),
+    ]
+    config = SolverConfig(
+        id=0, max_consecutive_days=14, enable_shift_interval=False,
+        enable_fairness=False, enable_weekend_fairness=False,
+    )
+    exact = solve_schedule(period, staff_list, slots, requirements, requests, config=config)
+    assert exact["decomposition"] is None
+
+    # 既定では分割しない
+    monkeypatch.setattr(solver, "_DECOMPOSE_MIN_COLUMNS", 0)
+    monkeypatch.setattr(solver, "_DECOMPOSE_MIN_COMPONENT_COLUMNS", 0)
+    assert solve_schedule(
+        period, staff_list, slots, requirements, requests, config=config,
+    )["decomposition"] is None
+
+    config.enable_decomposition = True
+    result = solve_schedule(period, staff_list, slots, requirements, requests, config=config)
+    assert result["status"] == "optimal"
+    assert result["decomposition"] == {
+        "components": 2, "component_columns": [42, 42],
+        "statuses": ["optimal", "optimal"], "coupled_terms": [],
+    }
+    assert result["objective"] == pytest.approx(exact["objective"])
+
+    # 公平性は週ごとに最適化されるので、最適とは言わずに警告で知らせる
+    config.enable_fairness = True
+    coupled = solve_schedule(period, staff_list, slots, requirements, requests, config=config)
+    assert coupled["status"] == "feasible"
+    assert coupled["decomposition"]["coupled_terms"] == ["fairness"]
+    assert [d.constraint for d in coupled["diagnostics"]] == ["decomposition"]
+    per_day = Counter(a["date"] for a in coupled["assignments"])
+    assert len(per_day) == 14 and min(per_day.values()) >= 2
+
+
+def test_small_components_are_packed_before_decomposing(monkeypatch):
+    """必要人数の行がなくスタッフごとに成分が分かれても、小さな成分はまとめて解く"""
+    import numpy as np
+    from backend.optimizer import solver
+
+    labels = np.array([0, 0, 1, 2, 2, 2, -1, 3, 4])
+    packed, n = solver._pack_components(labels, 5, 3)
+    assert n == 2
+    assert packed.tolist() == [0, 0, 0, 1, 1, 1, -1, 1, 1]
+    packed, n = solver._pack_components(labels, 5, 100)
+    assert n == 1 and packed.tolist() == [0, 0, 0, 0, 0, 0, -1, 0, 0]
+
+    period, staff_list, slots, _ = _setup_basic_scenario()
+    config = SolverConfig(id=0, enable_decomposition=True)
+    monkeypatch.setattr(solver, "_DECOMPOSE_MIN_COLUMNS", 0)
+    result = solve_schedule(period, staff_list, slots, [], [], config=config)
+    assert result["status"] == "optimal"
+    assert result["decomposition"] is None
+
+
+def test_symmetry_breaking_orders_interchangeable_staff():
+    """入れ替え可能なスタッフはクラスにまとめ、順序制約を入れても目的値は変わらない"""
+    staff_list = [
+        Staff(id=i, name=f"S{i}", role="一般", max_days_per_week=4) for i in range(1, 7)
+    ] + [Staff(id=7, name="S7", role="リーダー", max_days_per_week=5)]
+    slots = [
+        ShiftSlot(id=1, name="早番", start_time=time(7, 0), end_time=time(15, 0)),
+        ShiftSlot(id=2, name="遅番", start_time=time(13, 0), end_time=time(21, 0)),
+    ]
+    requirements = [
+        StaffingRequirement(id=i, shift_slot_id=t, day_type=dt, min_count=2)
+        for i, (t, dt) in enumerate(
+            [(1, "weekday"), (2, "weekday"), (1, "weekend"), (2, "weekend")], start=1
+        )
+    ]
+    period = SchedulePeriod(id=1, start_date=date(2026, 3, 2), end_date=date(2026, 3, 15))
+    # 希望を出したスタッフ 6 は他と入れ替えられない
+    requests = [StaffRequest(id=1, staff_id=6, date=date(2026, 3, 4), type="unavailable")]
+    config = SolverConfig(id=0)
+    plain = solve_schedule(period, staff_list, slots, requirements, requests, config=config)
+    assert plain["model_stats"]["symmetry_classes"] == 1
+    assert plain["model_stats"]["symmetric_staff"] == 5
+
+    config.enable_symmetry_breaking = True
+    ordered = solve_schedule(period, staff_list, slots, requirements, requests, config=config)
+    assert ordered["status"] == plain["status"] == "optimal"
+    assert ordered["objective"] == pytest.approx(plain["objective"])
+    worked = Counter(a["staff_id"] for a in ordered["assignments"])
+    assert [worked[i] for i in range(1, 6)] == sorted(
+        (worked[i] for i in range(1, 6)), reverse=True
+    )
+
+
+def test_lazy_constraints_add_only_violated_interval_rows():
+    """遅延追加モードは違反したインターバル行だけを足し、通常と同じ目的値に着く"""
+    staff_list = [
+        Staff(id=i, name=f"S{i}", role="一般", max_days_per_week=5) for i in range(1, 5)
+    ]
+    slots = [
+        ShiftSlot(id=1, name="早番", start_time=time(7, 0), end_time=time(15, 0)),
+        ShiftSlot(id=2, name="遅番", start_time=time(15, 0), end_time=time(23, 0)),
+    ]
+    requirements = [
+        StaffingRequirement(id=i, shift_slot_id=t, day_type=dt, min_count=1)
+        for i, (t, dt) in enumerate(
+            [(1, "weekday"), (2, "weekday"), (1, "weekend"), (2, "weekend")], start=1
+        )
+    ]
+    period = SchedulePeriod(id=1, start_date=date(2026, 3, 2), end_date=date(2026, 3, 15))
+    # 遅番を希望させて、インターバル行なしでは遅番→翌日早番が選ばれやすくする
+    requests = [
+        StaffRequest(id=i, staff_id=1 + i % 2, date=date(2026, 3, 2 + i), type="preferred")
+        for i in range(10)
+    ]
+    config = SolverConfig(id=0, enable_reverse_cycle_prohibition=True)
+    full = solve_schedule(period, staff_list, slots, requirements, requests, config=config)
+    assert full["lazy"] is None
+
+    config.enable_lazy_constraints = True
+    lazy = solve_schedule(period, staff_list, slots, requirements, requests, config=config)
+    assert lazy["status"] == full["status"] == "optimal"
+    assert lazy["objective"] == pytest.approx(full["objective"])
+    report = lazy["lazy"]
+    assert report["rounds"] >= 1
+    assert report["rows_added"] < report["lazy_rows"]
+    assert report["model_rows"] == full["model_stats"]["constraints"]
+
+    worked = {(a["staff_id"], a["date"]): a["shift_slot_id"] for a in lazy["assignments"]}
+    for (staff_id, day), slot_id in worked.items():
+        following = (date.fromisoformat(day) + timedelta(days=1)).isoformat()
+        assert not (slot_id == 2 and worked.get((staff_id, following)) == 1)
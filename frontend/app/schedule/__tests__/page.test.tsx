@@ -15,6 +15,7 @@ import SchedulePage from "@/app/schedule/page";
 vi.mock("sonner", () => ({
   toast: {
     success: vi.fn(),
+    warning: vi.fn(),
     error: vi.fn(),
   },
 }));
@@ -186,6 +186,11 @@ export default function SchedulePage() {
         toast.success(`最適化が完了しました: ${result.message}`);
         setAssignments(result.assignments);
         setDiagnostics([]);
+      } else if (result.status === "feasible" || result.status === "draft") {
+        // 時間切れの暫定解・下書き: 割り当ては保存済みなので表示し、警告を出す
+        toast.warning(`暫定解で完了しました: ${result.message}`);
+        setAssignments(result.assignments);
+        setDiagnostics(result.diagnostics || []);
       } else {
         toast.error(`最適化に失敗しました: ${result.message}`);
         setDiagnostics(result.diagnostics || []);
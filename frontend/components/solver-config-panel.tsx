@@ -4,11 +4,18 @@ import { useState, useEffect, useCallback } from "react";
 import { RotateCcw } from "lucide-react";
 import { toast } from "sonner";
 import { apiFetch } from "@/lib/api";
-import type { SolverConfig } from "@/lib/types";
+import type { SolverConfig, SolverProfile } from "@/lib/types";
 import { Button } from "@/components/ui/button";
 import { Input } from "@/components/ui/input";
 import { Switch } from "@/components/ui/switch";
 import { Slider } from "@/components/ui/slider";
+import {
+  Select,
+  SelectContent,
+  SelectItem,
+  SelectTrigger,
+  SelectValue,
+} from "@/components/ui/select";
 import { ConfirmDialog } from "@/components/confirm-dialog";
 
 // --- 型安全なキー制約 (#5) ---
@@ -33,6 +40,12 @@ const BASIC_SETTINGS: BasicSetting[] = [
   { key: "min_shift_interval_hours", label: "連続シフト間の最低休憩時間（時間）", min: 0, max: 24 },
 ];
 
+const SOLVER_PROFILES: { value: SolverProfile; label: string }[] = [
+  { value: "fast_draft", label: "速さ優先（数%の差を許容）" },
+  { value: "balanced", label: "標準" },
+  { value: "prove_optimal", label: "最適性を証明するまで探索" },
+];
+
 interface OptimizationFeature {
   enableKey: BooleanKeys<SolverConfig>;
   weightKey: NumberKeys<SolverConfig>;
@@ -116,6 +129,15 @@ const TOGGLE_CONSTRAINTS: ToggleConstraint[] = [
   },
 ];
 
+// 結果の最適性に影響しうる求解方法の切り替え
+const SOLVER_STRATEGIES: ToggleConstraint[] = [
+  {
+    key: "enable_decomposition",
+    label: "独立な部分問題に分けて並列に解く",
+    description: "週などで互いに影響しない部分に分かれる大きな問題を並列に解きます。公平性は部分ごとの最適化になります",
+  },
+];
+
 export function SolverConfigPanel() {
   const [config, setConfig] = useState<SolverConfig | null>(null);
   const [loading, setLoading] = useState(true);
@@ -217,6 +239,24 @@ export function SolverConfigPanel() {
               />
             </div>
           ))}
+          <div className="space-y-1.5">
+            <label className="text-sm font-medium">探索の方針</label>
+            <Select
+              value={config.solver_profile}
+              onValueChange={(v) => updateConfig({ solver_profile: v as SolverProfile })}
+            >
+              <SelectTrigger className="w-full" aria-label="探索の方針">
+                <SelectValue />
+              </SelectTrigger>
+              <SelectContent>
+                {SOLVER_PROFILES.map((p) => (
+                  <SelectItem key={p.value} value={p.value}>
+                    {p.label}
+                  </SelectItem>
+                ))}
+              </SelectContent>
+            </Select>
+          </div>
         </div>
       </div>
 
@@ -312,6 +352,38 @@ export function SolverConfigPanel() {
         </div>
       </div>
 
+      {/* 求解方法 */}
+      <div className="space-y-4">
+        <div>
+          <h3 className="text-sm font-semibold text-muted-foreground uppercase tracking-wider">
+            求解方法
+          </h3>
+          <p className="text-xs text-muted-foreground mt-0.5">大きな問題を速く解くための設定です。通常はオフのままで構いません。</p>
+        </div>
+        <div className="space-y-3">
+          {SOLVER_STRATEGIES.map((strategy) => (
+            <div
+              key={strategy.key}
+              className="flex items-center justify-between rounded-lg border p-4"
+            >
+              <div>
+                <div className="text-sm font-medium">{strategy.label}</div>
+                <div className="text-xs text-muted-foreground">
+                  {strategy.description}
+                </div>
+              </div>
+              <Switch
+                checked={config[strategy.key]}
+                onCheckedChange={(checked) =>
+                  updateConfig({ [strategy.key]: checked })
+                }
+                aria-label={strategy.label}
+              />
+            </div>
+          ))}
+        </div>
+      </div>
+
       {/* リセット */}
       <div className="flex justify-end">
         <Button
@@ -61,6 +61,134 @@ export interface OptimizeResponse {
   message: string;
   assignments: ScheduleAssignment[];
   diagnostics: DiagnosticItem[];
+  objective?: number | null;
+  mip_gap?: number | null;
+  mip_bound?: number | null;
+  race?: RaceReport | null;
+  uncovered?: UncoveredDemand[];
+  lns?: LnsReport | null;
+  rolling?: RollingReport | null;
+  decomposition?: DecompositionReport | null;
+  model_stats?: ModelStats | null;
+  lazy?: LazyRowsReport | null;
+  metrics?: Metrics | null;
+  cached?: boolean;
+}
+
+export interface ScenarioResult {
+  name: string;
+  status: string;
+  message: string;
+  objective: number | null;
+  shortfall: number | null;
+  fairness_spread: number | null;
+  preferences_satisfied: number | null;
+  solve_seconds: number | null;
+}
+
+export interface ScenarioComparison {
+  scenarios: ScenarioResult[];
+}
+
+export interface WeightSweepPoint {
+  weights: Record<string, number>;
+  status: string;
+  message: string;
+  objective: number | null;
+  shortfall: number | null;
+  fairness_spread: number | null;
+  preferences_satisfied: number | null;
+  solve_seconds: number | null;
+  warm_started: boolean;
+  pareto: boolean;
+}
+
+export interface WeightSweepResponse {
+  points: WeightSweepPoint[];
+}
+
+export interface MetricsSpan {
+  name: string;
+  seconds: number;
+  count: number;
+}
+
+export interface Metrics {
+  total_seconds: number;
+  spans: MetricsSpan[];
+  model?: ModelStats | null;
+}
+
+export interface LazyRowsReport {
+  rounds: number;
+  rows_added: number;
+  lazy_rows: number;
+  model_rows: number;
+}
+
+export interface ModelStats {
+  variables: number;
+  constraints: number;
+  nonzeros: number;
+  eliminated_variables: number;
+  fixed_variables: number;
+  eliminated_rows: number;
+  symmetry_classes: number;
+  symmetric_staff: number;
+  family_rows: Record<string, number>;
+}
+
+export interface DecompositionReport {
+  components: number;
+  component_columns: number[];
+  statuses: string[];
+  coupled_terms: string[];
+}
+
+export interface RollingReport {
+  window_days: number;
+  commit_days: number;
+  windows: {
+    start: string;
+    end: string;
+    commit_end: string;
+    status: string;
+    objective: number | null;
+    time_limit: number | null;
+  }[];
+  solve_seconds: number;
+}
+
+export interface LnsReport {
+  start: string;
+  iterations: number;
+  improvements: number;
+  initial_objective: number;
+  history: {
+    elapsed: number;
+    objective: number;
+    neighborhood: string;
+    improved: boolean;
+  }[];
+}
+
+export interface UncoveredDemand {
+  date: string;
+  shift_slot_id: number;
+  constraint: string;
+  label: string | null;
+  required: number;
+  assigned: number;
+}
+
+export interface RaceReport {
+  winner: string | null;
+  backends: {
+    backend: string;
+    status: string;
+    seconds: number;
+    objective: number | null;
+  }[];
 }
 
 export interface SolverConfig {
@@ -81,8 +209,18 @@ export interface SolverConfig {
   weight_fairness: number;
   weight_weekend_fairness: number;
   weight_soft_staffing: number;
+  solver_profile: SolverProfile;
+  mip_rel_gap: number | null;
+  solver_threads: number;
+  random_seed: number;
+  enable_solver_race: boolean;
+  enable_symmetry_breaking: boolean;
+  enable_lazy_constraints: boolean;
+  enable_decomposition: boolean;
 }
 
+export type SolverProfile = "fast_draft" | "balanced" | "prove_optimal";
+
 export interface StaffSkill {
   id: number;
   staff_id: number;
@@ -106,6 +106,14 @@ export function makeSolverConfig(
     weight_fairness: 2.0,
     weight_weekend_fairness: 2.0,
     weight_soft_staffing: 10.0,
+    solver_profile: "balanced",
+    mip_rel_gap: null,
+    solver_threads: 0,
+    random_seed: 0,
+    enable_solver_race: false,
+    enable_symmetry_breaking: false,
+    enable_lazy_constraints: false,
+    enable_decomposition: false,
     ...overrides,
   };
 }